@@ -0,0 +1,199 @@
+"""Benchmark proxy_lambda forwarding: urlopen per request vs the keep-alive pool.
+
+Starts a local stub of the CRUD API (HTTP/1.1 keep-alive, optional TLS) and
+forwards the same requests through proxy_lambda.lambda_handler twice: once with
+a new urllib.request.urlopen connection per call (the old behaviour) and once
+through http_pool.HTTPConnectionPool. Prints per-request latency and the saving.
+Then checks that POSTs still succeed when the server drops every kept-alive
+connection while it is idle (the pool notices and opens a fresh one before
+sending), and that when a reused connection hangs up after the request was
+sent, a GET is retried while a POST fails instead of being sent twice.
+
+Usage: python bench_http_pool.py [--requests 500]
+       python bench_http_pool.py --tls-cert cert.pem --tls-key key.pem   # include TLS handshakes
+"""
+import argparse
+import json
+import os
+import ssl
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# proxy_lambda imports structured_log from the shared Lambda layer
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared_layer", "python"))
+
+import http_pool
+import proxy_lambda
+
+
+class StubCrudAPI(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        body = json.dumps({"product_id": "p-1", "name": "Stub", "price": 9.99}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+class StubIdleClosingAPI(StubCrudAPI):
+    """Closes the connection after each response without saying so, like an idle timeout."""
+
+    def _reply(self):
+        StubCrudAPI._reply(self)
+        self.close_connection = True
+
+    do_GET = do_POST = do_PUT = do_DELETE = _reply
+
+
+class StubHangUpAPI(StubCrudAPI):
+    """Reads a request to /hang-up/... and closes without answering, the first time each path is seen."""
+
+    received = []
+
+    def _reply(self):
+        self.received.append((self.command, self.path))
+        if self.path.startswith("/hang-up/") and self.received.count((self.command, self.path)) == 1:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+            self.close_connection = True
+            return
+        StubCrudAPI._reply(self)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _reply
+
+
+class UrlopenPool:
+    """The pre-pool behaviour: one urlopen (new connection) per request."""
+
+    def __init__(self, ssl_context):
+        self.ssl_context = ssl_context
+
+    def request(self, method, url, body=None, headers=None, idempotent=None):
+        req = urllib.request.Request(url, data=body, method=method, headers=headers or {})
+        with urllib.request.urlopen(req, context=self.ssl_context) as resp:
+            return http_pool.HTTPResponse(resp.getcode(), dict(resp.getheaders()), resp.read())
+
+
+def run(label, pool, args):
+    proxy_lambda.http_pool = pool
+    event = {
+        "path": "/products/p-1",
+        "httpMethod": "GET",
+        "requestContext": {"authorizer": {"jwt": {"claims": {"custom:role": "admin", "sub": "bench"}}}}
+    }
+
+    latencies = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        result = proxy_lambda.lambda_handler(event, None)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert result["statusCode"] == 200, result
+
+    latencies.sort()
+    return {
+        "run": label,
+        "requests": args.requests,
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(latencies[len(latencies) // 2], 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 3)
+    }
+
+
+def check_stale_connections(requests):
+    """POSTs after the server closed the idle connection go out on a fresh one, never on the closed one."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubIdleClosingAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    pool = http_pool.HTTPConnectionPool()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/products"
+        for _ in range(requests):
+            pool.request("POST", url, body=b"{}", headers={"Content-Type": "application/json"})
+            # Idle long enough for the server's close to arrive, like an idle timeout
+            time.sleep(0.01)
+    finally:
+        server.shutdown()
+    # Every request after the first found its pooled connection closed and dropped it
+    assert pool.connections_dropped == requests - 1 and pool.connections_opened == requests, vars(pool)
+    return pool.connections_dropped
+
+
+def check_hang_ups():
+    """A reused connection that hangs up after the request was sent: GET is retried, POST is not."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHangUpAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    pool = http_pool.HTTPConnectionPool()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        pool.request("GET", f"{base}/products/p-1")  # leaves a kept-alive connection in the pool
+        assert pool.request("GET", f"{base}/hang-up/get").status == 200
+        pool.request("GET", f"{base}/products/p-1")
+        try:
+            pool.request("POST", f"{base}/hang-up/post", body=b"{}")
+            raise AssertionError("a POST that may have been applied was sent again")
+        except http_pool.http.client.RemoteDisconnected:
+            pass
+    finally:
+        server.shutdown()
+    assert StubHangUpAPI.received.count(("GET", "/hang-up/get")) == 2
+    assert StubHangUpAPI.received.count(("POST", "/hang-up/post")) == 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--tls-cert", help="serve the stub over HTTPS with this certificate")
+    parser.add_argument("--tls-key")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubCrudAPI)
+    scheme = "http"
+    client_ctx = None
+    if args.tls_cert:
+        server_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        server_ctx.load_cert_chain(args.tls_cert, args.tls_key)
+        server.socket = server_ctx.wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+        # Self-signed stub certificate
+        client_ctx = ssl._create_unverified_context()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    proxy_lambda.CRUD_API_URL = f"{scheme}://127.0.0.1:{server.server_address[1]}"
+
+    import builtins
+    real_print = builtins.print
+    builtins.print = lambda *a, **k: None
+    try:
+        pooled = http_pool.HTTPConnectionPool(ssl_context=client_ctx)
+        results = [run("urlopen-per-request", UrlopenPool(client_ctx), args), run("keep-alive-pool", pooled, args)]
+        stale_drops = check_stale_connections(20)
+        check_hang_ups()
+    finally:
+        builtins.print = real_print
+        server.shutdown()
+
+    for result in results:
+        print(json.dumps(result))
+    print(f"\n⚡ Saved {results[0]['mean_ms'] - results[1]['mean_ms']:.3f} ms per request "
+          f"({pooled.connections_opened} connections opened, {pooled.connections_reused} reused)")
+    print(f"🔁 {stale_drops} server-closed keep-alive connections dropped before a POST was sent on them, none failed; "
+          f"a hang-up after sending retries a GET but not a POST")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Benchmark crud_lambda response encoding on large product listings.
+
+Serializes listings of 100 / 1,000 / 10,000 products (DynamoDB-style items
+with Decimal numbers) with the previous json.dumps(default=decimal_fix), with
+json_codec on the stdlib backend and on orjson (when installed), then
+compresses the result with gzip and brotli (when installed). Finally runs a
+10,000-item admin listing (GET /products?segments=4&limit=500, every page)
+through crud_lambda.lambda_handler with Accept-Encoding: gzip and checks that
+the decoded pages match the items.
+
+Usage: python bench_json_codec.py [--sizes 100,1000,10000] [--repeat 5]
+"""
+import argparse
+import base64
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+# Shared layer modules are on the path in Lambda, add them for local runs
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared_layer", "python"))
+
+import crud_lambda
+import json_codec
+
+
+class ListingTable:
+    """Product table stand-in for segmented scans, paged by Limit."""
+
+    def __init__(self, items):
+        self.items = items
+
+    def scan(self, Segment=0, TotalSegments=1, Limit=None, ExclusiveStartKey=None, **kwargs):
+        segment = self.items[Segment::TotalSegments]
+        start = 0
+        if ExclusiveStartKey:
+            start = 1 + next(i for i, item in enumerate(segment)
+                             if item["product_id"] == ExclusiveStartKey["product_id"])
+        page = segment[start:start + Limit] if Limit else segment[start:]
+        data = {"Items": page}
+        if start + len(page) < len(segment):
+            data["LastEvaluatedKey"] = {"product_id": page[-1]["product_id"]}
+        return data
+
+
+def make_products(count, seed=7):
+    rng = random.Random(seed)
+    return [{
+        "product_id": f"prod-{i:06d}",
+        "name": f"Product {i} {rng.choice(['Lamp', 'Chair', 'Desk', 'Mug', 'Shelf'])}",
+        "description": "Lorem ipsum dolor sit amet, consectetur adipiscing elit.",
+        "price": Decimal(f"{rng.uniform(1, 500):.2f}"),
+        "currency": "USD",
+        "stock": Decimal(rng.randint(0, 1000)),
+        "rating": Decimal(f"{rng.uniform(1, 5):.1f}"),
+        "in_stock": rng.random() > 0.1,
+        "tags": rng.sample(["home", "office", "sale", "new", "eco", "gift"], 2),
+        "dimensions": {"w": Decimal(rng.randint(5, 120)), "h": Decimal(rng.randint(5, 120))}
+    } for i in range(count)]
+
+
+def old_dumps(body):
+    """The previous crud_lambda.response serialization."""
+    def decimal_fix(obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        raise TypeError
+    return json.dumps(body, default=decimal_fix)
+
+
+def best_ms(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 3)
+
+
+def run_size(size, args):
+    body = {"items": make_products(size), "count": size, "next_token": None}
+    results = [{"size": size, "encoder": "json+decimal_fix (old)", "ms": best_ms(lambda: old_dumps(body), args.repeat),
+                "bytes": len(old_dumps(body).encode())}]
+
+    backends = ["json"] + (["orjson"] if json_codec.orjson is not None else [])
+    for backend in backends:
+        json_codec.BACKEND = backend
+        results.append({"size": size, "encoder": f"json_codec/{backend}",
+                        "ms": best_ms(lambda: json_codec.dumps(body), args.repeat),
+                        "bytes": len(json_codec.dumps(body).encode())})
+
+    data = json_codec.dumps(body).encode()
+    encodings = ["gzip"] + (["br"] if json_codec.brotli is not None else [])
+    for encoding in encodings:
+        compressed = json_codec.compress(data, encoding)
+        results.append({"size": size, "encoder": f"compress/{encoding}",
+                        "ms": best_ms(lambda: json_codec.compress(data, encoding), args.repeat),
+                        "bytes": len(compressed), "base64_bytes": len(base64.b64encode(compressed))})
+    json_codec.BACKEND = json_codec.resolve_backend()
+    return results
+
+
+def run_export(args):
+    items = make_products(10000)
+    crud_lambda.table = ListingTable(items)
+    def listing():
+        """Every page of the listing: (decoded items, pages, base64 bytes on the wire)."""
+        decoded, pages, wire_bytes, token = [], 0, 0, None
+        while True:
+            resp = crud_lambda.lambda_handler({
+                "httpMethod": "GET",
+                "pathParameters": None,
+                "queryStringParameters": {"segments": "4", "limit": "500", "next_token": token},
+                "headers": {"Accept-Encoding": "gzip, deflate"}
+            }, None)
+            assert resp["isBase64Encoded"] and resp["headers"]["Content-Encoding"] == "gzip"
+            body = json.loads(gzip.decompress(base64.b64decode(resp["body"])))
+            decoded.extend(body["items"])
+            pages += 1
+            wire_bytes += len(resp["body"])
+            token = body["next_token"]
+            if not token:
+                return decoded, pages, wire_bytes
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        decoded, pages, wire_bytes = listing()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    expected = json.loads(old_dumps({"items": items}))["items"]
+    assert sorted(decoded, key=lambda p: p["product_id"]) == expected, "listing pages do not match the items"
+    return {"export_items": len(items), "pages": pages, "backend": json_codec.BACKEND,
+            "best_ms": round(min(timings), 3), "response_bytes": wire_bytes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,10000", help="products per listing")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    # Handler logs would dominate the timings
+    import builtins
+    real_print = builtins.print
+    builtins.print = lambda *a, **k: None
+    try:
+        results = []
+        for size in (int(s) for s in args.sizes.split(",")):
+            results.extend(run_size(size, args))
+        export = run_export(args)
+    finally:
+        builtins.print = real_print
+
+    for result in results:
+        print(json.dumps(result))
+    print(json.dumps(export))
+
+    largest = max(r["size"] for r in results)
+    rows = {r["encoder"]: r for r in results if r["size"] == largest}
+    old, new = rows["json+decimal_fix (old)"], rows[f"json_codec/{json_codec.BACKEND}"]
+    print(f"⚡ {largest} items: {old['ms']} ms -> {new['ms']} ms with json_codec/{json_codec.BACKEND}, "
+          f"{old['bytes']} -> {rows['compress/gzip']['base64_bytes']} bytes on the wire with gzip (base64)")
+    print(f"✅ 10,000-item listing decoded and matched ({export['pages']} pages, {export['best_ms']} ms end to end)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Benchmark local JWT verification in proxy_lambda (microseconds per request).
+
+Generates an RSA key pair and a JWKS fixture locally, signs Cognito-style ID
+tokens with it and measures jwt_verify.TokenVerifier for:
+  - first sight of a token (signature check + claim validation)
+  - repeated requests from the same session (verified-token cache hit)
+  - the whole proxy_lambda.verify_bearer_token path
+
+Usage: python bench_jwt.py [--tokens 200] [--repeats 20] [--key-bits 2048] [--write-jwks jwks.json]
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+
+# proxy_lambda imports structured_log from the shared Lambda layer
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared_layer", "python"))
+
+import jwt_verify
+
+REGION = "us-east-1"
+USER_POOL_ID = "us-east-1_LocalPool"
+CLIENT_ID = "local-client-id"
+
+
+def _is_probable_prime(n, rounds=32):
+    if n < 2:
+        return False
+    for p in (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37):
+        if n % p == 0:
+            return n == p
+    d, r = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        r += 1
+    for _ in range(rounds):
+        x = pow(random.randrange(2, n - 1), d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(r - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _random_prime(bits):
+    while True:
+        candidate = random.getrandbits(bits) | (1 << (bits - 1)) | (1 << (bits - 2)) | 1
+        if _is_probable_prime(candidate):
+            return candidate
+
+
+def generate_rsa_key(bits):
+    e = 65537
+    while True:
+        p, q = _random_prime(bits // 2), _random_prime(bits // 2)
+        phi = (p - 1) * (q - 1)
+        if p != q and phi % e:
+            return p * q, e, pow(e, -1, phi)
+
+
+def b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def uint_b64url(value):
+    return b64url(value.to_bytes((value.bit_length() + 7) // 8, "big"))
+
+
+def sign_rs256(n, d, message):
+    k = (n.bit_length() + 7) // 8
+    t = jwt_verify.SHA256_DIGEST_INFO + hashlib.sha256(message).digest()
+    encoded = b"\x00\x01" + b"\xff" * (k - len(t) - 3) + b"\x00" + t
+    return pow(int.from_bytes(encoded, "big"), d, n).to_bytes(k, "big")
+
+
+def make_token(n, d, kid, sub):
+    header = b64url(json.dumps({"alg": "RS256", "kid": kid}).encode())
+    payload = b64url(json.dumps({
+        "sub": sub,
+        "aud": CLIENT_ID,
+        "iss": jwt_verify.cognito_issuer(REGION, USER_POOL_ID),
+        "token_use": "id",
+        "custom:role": "admin",
+        "exp": int(time.time()) + 3600,
+        "iat": int(time.time())
+    }).encode())
+    signature = b64url(sign_rs256(n, d, f"{header}.{payload}".encode()))
+    return f"{header}.{payload}.{signature}"
+
+
+def timed_us(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=200, help="distinct sessions")
+    parser.add_argument("--repeats", type=int, default=20, help="requests per session")
+    parser.add_argument("--key-bits", type=int, default=2048)
+    parser.add_argument("--write-jwks", help="save the generated JWKS fixture to this file")
+    args = parser.parse_args()
+
+    random.seed(1)
+    print(f"🔑 Generating {args.key_bits}-bit RSA key...")
+    n, e, d = generate_rsa_key(args.key_bits)
+    kid = "local-kid-1"
+    jwks = {"keys": [{"kty": "RSA", "alg": "RS256", "use": "sig", "kid": kid, "n": uint_b64url(n), "e": uint_b64url(e)}]}
+    if args.write_jwks:
+        with open(args.write_jwks, "w") as f:
+            json.dump(jwks, f, indent=2)
+
+    issuer = jwt_verify.cognito_issuer(REGION, USER_POOL_ID)
+    cache = jwt_verify.JWKSCache(f"{issuer}/.well-known/jwks.json", lambda url: jwks)
+    verifier = jwt_verify.TokenVerifier(cache, issuer, CLIENT_ID)
+
+    tokens = [make_token(n, d, kid, f"user-{i}") for i in range(args.tokens)]
+    repeated = [token for token in tokens for _ in range(args.repeats)]
+
+    first_us = timed_us(verifier.verify, tokens)
+    cached_us = timed_us(verifier.verify, repeated)
+
+    # Same cached path through the proxy's header handling
+    import proxy_lambda
+    proxy_lambda.token_verifier = verifier
+    headers = [{"Authorization": f"Bearer {token}"} for token in repeated]
+    proxy_us = timed_us(proxy_lambda.verify_bearer_token, headers)
+
+    print(json.dumps({
+        "key_bits": args.key_bits,
+        "sessions": args.tokens,
+        "cached_requests": len(repeated),
+        "first_verify_us": round(first_us, 2),
+        "cached_verify_us": round(cached_us, 2),
+        "proxy_header_path_us": round(proxy_us, 2),
+        "signature_checks": verifier.signature_checks,
+        "cache_hits": verifier.cache_hits,
+        "jwks_fetches": cache.fetches
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Benchmark GET /products/{product_id} latency with and without the product cache.
+
+Runs crud_lambda.lambda_handler in-process against a local table stand-in that
+adds a fixed per-call latency (like a DynamoDB round trip), with a skewed
+(hot product) access pattern, and prints p50/p99 for both runs.
+
+Usage: python bench_product_cache.py [--requests 5000] [--products 1000] [--ddb-latency-ms 6]
+       python bench_product_cache.py --redis-url redis://localhost:6379/0   # shared backend
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+# Shared layer modules are on the path in Lambda, add them for local runs
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared_layer", "python"))
+
+import crud_lambda
+import product_cache
+
+
+class SlowTable:
+    """Product table stand-in that sleeps like a network round trip."""
+
+    def __init__(self, items, latency):
+        self.items = {item["product_id"]: item for item in items}
+        self.latency = latency
+        self.get_calls = 0
+
+    def get_item(self, Key, **kwargs):
+        self.get_calls += 1
+        time.sleep(self.latency)
+        item = self.items.get(Key["product_id"])
+        return {"Item": item} if item else {}
+
+    def update_item(self, Key, ReturnValues=None, **kwargs):
+        time.sleep(self.latency)
+        return {"Attributes": self.items[Key["product_id"]]}
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(label, args, products, cache_enabled, backend=None):
+    table = SlowTable(products, args.ddb_latency_ms / 1000)
+    crud_lambda.table = table
+    crud_lambda.CACHE_ENABLED = cache_enabled
+    crud_lambda.cache = product_cache.LRUTTLCache(max_items=args.cache_size, ttl=args.ttl, backend=backend)
+
+    rng = random.Random(args.seed)
+    weights = [1 / (rank + 1) ** args.skew for rank in range(len(products))]
+    ids = rng.choices([p["product_id"] for p in products], weights=weights, k=args.requests)
+
+    latencies = []
+    for i, product_id in enumerate(ids):
+        event = {"httpMethod": "GET", "pathParameters": {"product_id": product_id}}
+        start = time.perf_counter()
+        crud_lambda.lambda_handler(event, None)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        # Some writes in between, which refresh the cached copy
+        if args.write_every and i % args.write_every == 0:
+            crud_lambda.lambda_handler({
+                "httpMethod": "PUT",
+                "pathParameters": {"product_id": product_id},
+                "body": json.dumps({"in_stock": True})
+            }, None)
+
+    latencies.sort()
+    result = {
+        "run": label,
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "get_item_calls": table.get_calls
+    }
+    if cache_enabled:
+        result["cache"] = crud_lambda.cache.stats()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--ddb-latency-ms", type=float, default=6.0)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of the access pattern")
+    parser.add_argument("--cache-size", type=int, default=200)
+    parser.add_argument("--ttl", type=float, default=30)
+    parser.add_argument("--write-every", type=int, default=50, help="issue a PUT every N reads (0 = never)")
+    parser.add_argument("--redis-url", default="", help="also run with a shared Redis-compatible backend")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    products = [{
+        "product_id": f"prod-{i:05d}",
+        "name": f"Product {i}",
+        "price": Decimal("19.99"),
+        "currency": "USD",
+        "in_stock": True
+    } for i in range(args.products)]
+
+    # Handler logs would dominate the timings
+    import builtins
+    real_print = builtins.print
+    builtins.print = lambda *a, **k: None
+    try:
+        results = [
+            run("no-cache", args, products, cache_enabled=False),
+            run("lru-ttl-cache", args, products, cache_enabled=True)
+        ]
+        if args.redis_url:
+            results.append(run("lru-ttl-cache+redis", args, products, cache_enabled=True,
+                               backend=product_cache.RedisBackend(args.redis_url)))
+    finally:
+        builtins.print = real_print
+
+    for result in results:
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Exercise proxy_lambda's /auth/exchange and /auth/refresh against a stub OAuth server.
+
+The stub serves POST /oauth2/token with a configurable delay and counts calls.
+The script sends bursts of concurrent exchanges for the same code and bursts of
+refreshes for the same refresh token, and reports how many token endpoint calls
+were made and the request latencies, with and without the cache / single-flight.
+After each burst one more request replays the same code / refresh token: a
+replayed code must reach the token endpoint and be refused (400), a replayed
+refresh within TOKEN_RESPONSE_TTL_SECONDS is answered from the cache.
+
+Usage: python bench_token_exchange.py [--burst 20] [--token-delay-ms 80]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# proxy_lambda imports structured_log from the shared Lambda layer
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared_layer", "python"))
+
+import proxy_lambda
+from token_cache import SingleFlight, TokenResponseCache
+
+
+class StubOAuthServer(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    delay = 0.08
+    calls = 0
+    used_codes = set()
+    lock = threading.Lock()
+
+    def do_POST(self):
+        form = urllib.parse.parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+        with StubOAuthServer.lock:
+            StubOAuthServer.calls += 1
+        time.sleep(self.delay)
+
+        grant = form["grant_type"][0]
+        status, tokens = 200, {"id_token": "id.stub", "access_token": "access.stub", "expires_in": 3600, "token_type": "Bearer"}
+        if grant == "authorization_code":
+            # Like Cognito: a code can only be redeemed once
+            with StubOAuthServer.lock:
+                if form["code"][0] in StubOAuthServer.used_codes:
+                    status, tokens = 400, {"error": "invalid_grant"}
+                StubOAuthServer.used_codes.add(form["code"][0])
+            tokens.setdefault("refresh_token", "refresh.stub")
+
+        body = json.dumps(tokens).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def burst(path, payload, size):
+    event = {"path": path, "httpMethod": "POST", "body": json.dumps(payload)}
+
+    def one(_):
+        start = time.perf_counter()
+        result = proxy_lambda.lambda_handler(event, None)
+        return result["statusCode"], (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=size) as pool:
+        return list(pool.map(one, range(size)))
+
+
+def run(label, args, cached):
+    proxy_lambda.token_responses = TokenResponseCache(max_items=1000 if cached else 0)
+    proxy_lambda.token_flights = SingleFlight()
+    if not cached:
+        # No sharing: every request is its own flight
+        proxy_lambda.token_flights.do = lambda key, fn: fn()
+
+    report = {"run": label}
+    for name, path, payload in (
+        ("exchange", "/auth/exchange", {"code": f"code-{label}"}),
+        ("refresh", "/auth/refresh", {"refresh_token": f"refresh-{label}"}),
+    ):
+        calls_before = StubOAuthServer.calls
+        results = burst(path, payload, args.burst)
+        latencies = sorted(ms for _, ms in results)
+        calls_after_burst = StubOAuthServer.calls
+        replay_status, _ = burst(path, payload, 1)[0]
+        report[name] = {
+            "requests": len(results),
+            "ok": sum(1 for status, _ in results if status == 200),
+            "token_endpoint_calls": calls_after_burst - calls_before,
+            "replay_status": replay_status,
+            "replay_token_endpoint_calls": StubOAuthServer.calls - calls_after_burst,
+            "p50_ms": round(latencies[len(latencies) // 2], 2),
+            "max_ms": round(latencies[-1], 2),
+            "mean_ms": round(statistics.fmean(latencies), 2)
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=20, help="concurrent requests per burst")
+    parser.add_argument("--token-delay-ms", type=float, default=80)
+    args = parser.parse_args()
+
+    StubOAuthServer.delay = args.token_delay_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOAuthServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    proxy_lambda.COGNITO_DOMAIN = f"http://127.0.0.1:{server.server_address[1]}"
+
+    import builtins
+    real_print = builtins.print
+    builtins.print = lambda *a, **k: None
+    try:
+        results = [run("no-cache", args, cached=False), run("cache+single-flight", args, cached=True)]
+    finally:
+        builtins.print = real_print
+        server.shutdown()
+
+    for result in results:
+        print(json.dumps(result))
+    cached = results[1]
+    assert cached["exchange"]["replay_status"] == 400 and cached["exchange"]["replay_token_endpoint_calls"] == 1
+    print(f"🔑 burst of {args.burst}: {cached['exchange']['token_endpoint_calls']} code exchange(s) and "
+          f"{cached['refresh']['token_endpoint_calls']} refresh call(s) to the token endpoint; "
+          f"a replayed code is refused ({cached['exchange']['replay_status']})")
+
+
+if __name__ == "__main__":
+    main()
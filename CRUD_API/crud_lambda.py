@@ -1,135 +1,547 @@
 import json
-import boto3
-from decimal import Decimal
+import os
+import base64
+import time
+from decimal import Decimal, InvalidOperation
+from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import ClientError
+import aws_clients
+from product_cache import build_cache
+from json_codec import compress_response, dumps, loads
+from product_bulk import (DirectorySink, S3Sink, export_products, import_products, iter_rows, iter_text_lines,
+                          resolve_format)
+from product_updates import (KEY_ATTRIBUTE, UpdateError, build_bulk_update, build_create, build_delete, build_update,
+                             etag, explain_conflict, parse_if_match, reserved_id_errors)
+from schema import validate_product, validate_product_update
+from lambda_metrics import Metrics
+from structured_log import get_logger
 
-dynamodb = boto3.resource("dynamodb")
-table = dynamodb.Table("")
+# Built on first use: OPTIONS, validation errors and cache hits never import boto3
+table = aws_clients.lazy_table("")
+s3 = aws_clients.lazy_client("s3")
 
-# Convert DynamoDB Decimals to float for JSON
-def decimal_fix(obj):
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError
+log = get_logger("crud")
+metrics = Metrics("crud")
 
-# Standardized API response
-def response(status, body):
+# Read-through cache for GET /products/{product_id}, kept across warm invocations
+CACHE_ENABLED = os.environ.get("PRODUCT_CACHE_ENABLED", "true").lower() == "true"
+cache = build_cache(log)
+
+# GET /products paging
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Scan pages read per request before returning a short page + next_token
+# (keeps very selective filters from reading the whole table in one call)
+MAX_SCAN_PAGES = 10
+# Parallel segmented scans for admin listings (?segments=N): every segment
+# reads its share of `limit` per request, next_token resumes each segment
+MAX_SCAN_SEGMENTS = 16
+
+# Bulk import / export (product_bulk.py): large imports are read from this
+# bucket (?s3_key=), exports are written to it
+BULK_BUCKET = os.environ.get("PRODUCT_BULK_BUCKET", "")
+# Without a bucket (local runs) exports go to this directory
+EXPORT_DIRECTORY = os.environ.get("PRODUCT_EXPORT_DIRECTORY", "/tmp/product-exports")
+DEFAULT_EXPORT_SEGMENTS = 4
+
+# Standardized API response (json_codec converts DynamoDB Decimals while encoding)
+def response(status, body, headers=None):
+    with metrics.phase("serialize"):
+        payload = dumps(body)
     return {
         "statusCode": status,
         "headers": {
             "Content-Type": "application/json",
             "Access-Control-Allow-Origin": "*",
             "Access-Control-Allow-Methods": "GET,POST,PUT,DELETE,OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type"
+            "Access-Control-Allow-Headers": "Content-Type,If-Match",
+            "Access-Control-Expose-Headers": "ETag",
+            **(headers or {})
         },
-        "body": json.dumps(body, default=decimal_fix)
+        "body": payload
     }
 
-# Type validation helper
+# Type validation helper (schemas are compiled once in the shared layer's schema.py)
 def validate_product_data(data, require_all_fields=True):
-    fields = {
-        "product_id": str,
-        "name": str,
-        "price": (int, float, Decimal),
-        "currency": str,
-        "in_stock": (bool, int)
-    }
-    errors = []
+    if require_all_fields:
+        return validate_product(data) or reserved_id_errors(data[KEY_ATTRIBUTE])
+    return validate_product_update(data)
+
+def matched_route(event):
+    """Route API Gateway matched: the REST API resource, the HTTP API route key, else the path (local runs)."""
+    if event.get("resource"):
+        return event["resource"]
+    route_key = event.get("routeKey") or ""
+    if " " in route_key:
+        return route_key.split(" ", 1)[1]
+    return (event.get("path") or event.get("rawPath") or "").rstrip("/")
+
+# REST APIs pass headers with the client's casing, HTTP APIs lower-cased
+def request_header(event, name):
+    name = name.lower()
+    return next((v for k, v in (event.get("headers") or {}).items() if k.lower() == name), None)
+
+def error_code(error):
+    return error.response.get("Error", {}).get("Code")
+
+# The stored item DynamoDB hands back with a failed condition
+# (ReturnValuesOnConditionCheckFailure=ALL_OLD) comes in the low-level
+# {"S": ...} format, also through the Table resource
+_ATTRIBUTE_TYPES = {"S", "N", "B", "BOOL", "NULL", "M", "L", "SS", "NS", "BS"}
+
+def failed_item(item):
+    if not item:
+        return None
+    if all(isinstance(v, dict) and len(v) == 1 and next(iter(v)) in _ATTRIBUTE_TYPES for v in item.values()):
+        from boto3.dynamodb.types import TypeDeserializer
+        deserializer = TypeDeserializer()
+        return {k: deserializer.deserialize(v) for k, v in item.items()}
+    return item
+
+# ---------------- Update helpers ----------------
+
+def update_product(event, product_id, body):
+    """PUT /products/{product_id}: one conditional UpdateItem, see product_updates."""
+    try:
+        with metrics.phase("validate"):
+            expected_version = parse_if_match(request_header(event, "If-Match"))
+            update = build_update(product_id, body, expected_version)
+    except UpdateError as e:
+        return response(400, {"errors": e.errors})
+
+    try:
+        with metrics.phase("downstream"):
+            result = table.update_item(**update, ReturnValues="ALL_NEW",
+                                       ReturnValuesOnConditionCheckFailure="ALL_OLD")
+    except ClientError as e:
+        if error_code(e) != "ConditionalCheckFailedException":
+            return response(500, {"error": str(e)})
+        current = failed_item(e.response.get("Item"))
+        status, message = explain_conflict(current, body, expected_version)
+        metrics.count("update_conflicts")
+        if CACHE_ENABLED:
+            # The failed write told us what is stored now
+            if current is None:
+                cache.invalidate(product_id)
+            else:
+                cache.set(product_id, current)
+        return response(status, {"error": message}, {"ETag": etag(current)} if current else None)
+
+    product = result["Attributes"]
+    # Refresh the cached copy with the stored item
+    if CACHE_ENABLED:
+        cache.set(product_id, product)
+    return response(200, {"message": "Product updated", "product": product}, {"ETag": etag(product)})
+
+def bulk_update(body):
+    """PUT /products {"updates": [...]}: all updates in one transaction, or none."""
+    if not isinstance(body, dict) or "updates" not in body:
+        return response(400, {"error": "Missing product_id in path (or 'updates' for a bulk update)"})
+    try:
+        with metrics.phase("validate"):
+            updates, transact_items = build_bulk_update(table.name, body["updates"])
+    except UpdateError as e:
+        return response(400, {"errors": e.errors})
+
+    product_ids = [product_id for product_id, _, _ in updates]
+    try:
+        with metrics.phase("downstream"):
+            table.meta.client.transact_write_items(TransactItems=transact_items)
+    except ClientError as e:
+        if error_code(e) != "TransactionCanceledException":
+            return response(500, {"error": str(e)})
+        metrics.count("update_conflicts")
+        failures = []
+        # One reason per action, in request order; "None" for the ones that would have succeeded
+        for (product_id, entry, expected_version), reason in zip(updates, e.response.get("CancellationReasons", [])):
+            code = reason.get("Code")
+            if code == "ConditionalCheckFailed":
+                current = failed_item(reason.get("Item"))
+                status, message = explain_conflict(current, entry, expected_version)
+                if CACHE_ENABLED and current is not None:
+                    cache.set(product_id, current)
+                failures.append({"product_id": product_id, "status": status, "error": message})
+            elif code not in (None, "None"):
+                # TransactionConflict: another write to the item was in flight, retrying is safe
+                failures.append({"product_id": product_id, "status": 409, "error": reason.get("Message") or code})
+        return response(409, {"error": "No products were updated", "failures": failures})
+
+    # TransactWriteItems returns no attributes: drop the cached copies
+    if CACHE_ENABLED:
+        for product_id in product_ids:
+            cache.invalidate(product_id)
+    return response(200, {"message": "Products updated", "count": len(product_ids), "product_ids": product_ids})
+
+# ---------------- Bulk helpers ----------------
+
+def import_request(event):
+    """POST /products/import: NDJSON / CSV rows in the body, or in BULK_BUCKET (?s3_key=) for large catalogs."""
+    params = event.get("queryStringParameters") or {}
+    s3_key = params.get("s3_key")
+    try:
+        fmt = resolve_format(params.get("format"), s3_key)
+    except ValueError as e:
+        return response(400, {"error": str(e)})
+
+    if s3_key:
+        if not BULK_BUCKET:
+            return response(400, {"error": "Imports from S3 need PRODUCT_BULK_BUCKET"})
+        try:
+            source = s3.get_object(Bucket=BULK_BUCKET, Key=s3_key)["Body"]
+        except ClientError as e:
+            status = 404 if error_code(e) in ("NoSuchKey", "404") else 500
+            return response(status, {"error": str(e)})
+    else:
+        source = event.get("body") or ""
+        if event.get("isBase64Encoded"):
+            source = base64.b64decode(source).decode("utf-8")
+
+    started = time.perf_counter()
+
+    def progress(report):
+        elapsed = time.perf_counter() - started
+        log.info("Import progress", rows=report["rows"], imported=report["imported"], failed=report["failed"],
+                 rows_per_s=round(report["rows"] / elapsed) if elapsed else None)
+
+    def written(product_ids):
+        # Imports overwrite products: drop stale cached copies
+        if CACHE_ENABLED:
+            for product_id in product_ids:
+                cache.invalidate(product_id)
+
+    with metrics.phase("downstream"):
+        report = import_products(table, iter_rows(fmt, iter_text_lines(source)),
+                                 on_progress=progress, on_written=written)
+    if not report["rows"]:
+        return response(400, {"error": "No rows to import"})
+
+    metrics.count("products_imported", report["imported"])
+    metrics.count("import_rows_failed", report["failed"])
+    elapsed = time.perf_counter() - started
+    return response(201 if report["failed"] == 0 else 207, dict(
+        report,
+        message=f"{report['imported']} of {report['rows']} products imported",
+        format=fmt,
+        duration_ms=round(elapsed * 1000, 1),
+        rows_per_s=round(report["rows"] / elapsed) if elapsed else None
+    ))
+
+def export_request(event):
+    """GET /products/export: segmented scan streamed into NDJSON / CSV part files; returns the manifest."""
+    params = event.get("queryStringParameters") or {}
+    try:
+        fmt = resolve_format(params.get("format"))
+        scan_kwargs = build_scan_kwargs(params)
+        segments = parse_int_param(params, "segments", DEFAULT_EXPORT_SEGMENTS, 1, MAX_SCAN_SEGMENTS)
+    except ValueError as e:
+        return response(400, {"error": str(e)})
+    columns = [f.strip() for f in params["fields"].split(",") if f.strip()] if params.get("fields") else None
+
+    sink = S3Sink(s3, BULK_BUCKET) if BULK_BUCKET else DirectorySink(EXPORT_DIRECTORY)
+    try:
+        with metrics.phase("downstream"):
+            manifest = export_products(lambda segment, total: iter_products(scan_kwargs, segment, total),
+                                       segments, sink, fmt, columns)
+    except ClientError as e:
+        return response(500, {"error": str(e)})
+    metrics.count("products_exported", manifest["count"])
+    log.info("Export written", export_id=manifest["export_id"], count=manifest["count"],
+             parts=len(manifest["parts"]), bytes=manifest["bytes"])
+    return response(200, manifest)
+
+# ---------------- Scan helpers ----------------
+
+def parse_int_param(params, name, default, minimum, maximum):
+    if params.get(name) in (None, ""):
+        return default
+    try:
+        value = int(params[name])
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer")
+    if not minimum <= value <= maximum:
+        raise ValueError(f"'{name}' must be between {minimum} and {maximum}")
+    return value
+
+def parse_decimal_param(params, name):
+    try:
+        return Decimal(params[name])
+    except InvalidOperation:
+        raise ValueError(f"'{name}' must be a number")
+
+# Opaque cursor: the scan's LastEvaluatedKey, base64 encoded. Segmented
+# listings encode {"segments": N, "keys": {segment: LastEvaluatedKey}} for the
+# segments that are not finished yet
+def encode_next_token(last_key):
+    if not last_key:
+        return None
+    return base64.urlsafe_b64encode(dumps(last_key).encode()).decode()
+
+def _load_token(token):
+    try:
+        return loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid next_token")
 
-    for key, typ in fields.items():
-        if key not in data:
-            if require_all_fields:
-                errors.append(f"Missing '{key}'")
-            continue
-        if not isinstance(data[key], typ):
-            errors.append(f"Invalid type for '{key}', expected {typ}")
+def _is_table_key(key):
+    """A LastEvaluatedKey of the products table holds the key attribute and nothing else."""
+    return type(key) is dict and list(key) == [KEY_ATTRIBUTE] and type(key[KEY_ATTRIBUTE]) is str
 
-    return errors
+def decode_next_token(token):
+    if not token:
+        return None
+    key = _load_token(token)
+    # Anything else would reach the scan as ExclusiveStartKey and fail there with a 500
+    if not _is_table_key(key):
+        raise ValueError("Invalid next_token")
+    return key
 
+def decode_segment_token(token, total_segments):
+    """{segment: start key} still to read; every segment from the start without a token."""
+    if not token:
+        return {segment: None for segment in range(total_segments)}
+    state = _load_token(token)
+    if type(state) is not dict or set(state) != {"segments", "keys"} or type(state["keys"]) is not dict:
+        raise ValueError("Invalid next_token")
+    if state["segments"] != total_segments:
+        raise ValueError("next_token belongs to a listing with a different 'segments'")
+    start_keys = {}
+    for segment, key in state["keys"].items():
+        if not segment.isdigit() or int(segment) >= total_segments or not _is_table_key(key):
+            raise ValueError("Invalid next_token")
+        start_keys[int(segment)] = key
+    if not start_keys:
+        raise ValueError("Invalid next_token")
+    return start_keys
+
+# Projection (?fields=name,price) and filters (?in_stock=, ?min_price=, ?max_price=)
+# are pushed down into the scan so only matching attributes leave DynamoDB
+def build_scan_kwargs(params):
+    kwargs = {}
+
+    if params.get("fields"):
+        fields = [f.strip() for f in params["fields"].split(",") if f.strip()]
+        names = {f"#f{i}": field for i, field in enumerate(fields)}
+        kwargs["ProjectionExpression"] = ", ".join(names)
+        kwargs["ExpressionAttributeNames"] = names
+
+    filters = [name for name in ("in_stock", "min_price", "max_price") if params.get(name) not in (None, "")]
+    if filters:
+        # Only filtered listings need the condition builder (and the boto3 import behind it)
+        from boto3.dynamodb.conditions import Attr
+
+        conditions = []
+        if "in_stock" in filters:
+            flag = params["in_stock"].lower()
+            if flag not in ("true", "false"):
+                raise ValueError("'in_stock' must be true or false")
+            # in_stock may be stored as a bool or as 0/1
+            conditions.append(Attr("in_stock").is_in([True, 1] if flag == "true" else [False, 0]))
+        if "min_price" in filters:
+            conditions.append(Attr("price").gte(parse_decimal_param(params, "min_price")))
+        if "max_price" in filters:
+            conditions.append(Attr("price").lte(parse_decimal_param(params, "max_price")))
+
+        filter_expr = conditions[0]
+        for condition in conditions[1:]:
+            filter_expr = filter_expr & condition
+        kwargs["FilterExpression"] = filter_expr
+
+    return kwargs
+
+def scan_page(scan_kwargs, limit, start_key=None):
+    """Read up to `limit` matching items starting after `start_key`.
+
+    Returns (items, last_key); last_key is None once the table is exhausted.
+    """
+    items = []
+    for _ in range(MAX_SCAN_PAGES):
+        kwargs = dict(scan_kwargs, Limit=limit - len(items))
+        if start_key:
+            kwargs["ExclusiveStartKey"] = start_key
+        data = table.scan(**kwargs)
+        items.extend(data.get("Items", []))
+        start_key = data.get("LastEvaluatedKey")
+        if not start_key or len(items) >= limit:
+            break
+    return items, start_key
+
+def iter_products(scan_kwargs, segment=None, total_segments=None):
+    """Yield matching items page by page without holding the whole table."""
+    kwargs = dict(scan_kwargs)
+    if total_segments:
+        kwargs.update(Segment=segment, TotalSegments=total_segments)
+    while True:
+        data = table.scan(**kwargs)
+        yield from data.get("Items", [])
+        if "LastEvaluatedKey" not in data:
+            return
+        kwargs["ExclusiveStartKey"] = data["LastEvaluatedKey"]
+
+def parallel_scan(scan_kwargs, total_segments, start_keys, limit):
+    """One page from each unfinished segment, in parallel.
+
+    `limit` is shared between the segments so a response stays one page (the
+    Lambda response cap is 6 MB). Returns (items, {segment: last_key}) for the
+    segments that have more to read.
+    """
+    per_segment = max(1, limit // len(start_keys))
+
+    def read(segment):
+        kwargs = dict(scan_kwargs, Segment=segment, TotalSegments=total_segments)
+        return scan_page(kwargs, per_segment, start_keys[segment])
+
+    with ThreadPoolExecutor(max_workers=len(start_keys)) as pool:
+        pages = list(pool.map(read, start_keys))
+    items, next_keys = [], {}
+    for segment, (page_items, last_key) in zip(start_keys, pages):
+        items.extend(page_items)
+        if last_key:
+            next_keys[str(segment)] = last_key
+    return items, next_keys
+
+@metrics.instrument
 def lambda_handler(event, context):
-    print("EVENT:", json.dumps(event))
+    result = handle_request(event, context)
+    # Large listings go out gzip / br compressed when the client accepts it
+    with metrics.phase("compress"):
+        return compress_response(result, event.get("headers"))
+
+def handle_request(event, context):
+    log.start_invocation(event, context)
+    # Serialized only when LOG_LEVEL=DEBUG (and sampled in)
+    log.debug("Incoming event", event=event)
     
     method = event.get("httpMethod")
     path_params = event.get("pathParameters") or {}
     product_id = path_params.get("product_id")
 
+    # Bulk routes take NDJSON / CSV bodies, so they come before the JSON parsing.
+    # Only the exact routes: /products/{product_id} always carries the path parameter
+    route = None if product_id else matched_route(event)
+    if route == "/products/import":
+        return import_request(event) if method == "POST" else response(405, {"error": "Method not allowed"})
+    if route == "/products/export":
+        return export_request(event) if method == "GET" else response(405, {"error": "Method not allowed"})
+
     body = {}
     if event.get("body"):
         try:
-            body = json.loads(event["body"], parse_float=Decimal)
+            with metrics.phase("parse"):
+                body = loads(event["body"])
         except json.JSONDecodeError:
             return response(400, {"error": "Invalid JSON body"})
 
     # ---------------- CREATE ----------------
     if method == "POST":
-        errors = validate_product_data(body, require_all_fields=True)
+        with metrics.phase("validate"):
+            errors = validate_product_data(body, require_all_fields=True)
         if errors:
             return response(400, {"errors": errors})
 
+        # New products start at version 1 (the ETag clients send back in If-Match);
+        # an existing product is changed with PUT, never replaced by POST
+        create = build_create(body)
+        product = create["Item"]
         try:
-            table.put_item(Item=body)
-            return response(201, {"message": "Product created", "product": body})
+            with metrics.phase("downstream"):
+                table.put_item(**create, ReturnValuesOnConditionCheckFailure="ALL_OLD")
         except ClientError as e:
-            return response(500, {"error": str(e)})
+            if error_code(e) != "ConditionalCheckFailedException":
+                return response(500, {"error": str(e)})
+            current = failed_item(e.response.get("Item"))
+            metrics.count("create_conflicts")
+            return response(409, {"error": f"Product '{product['product_id']}' already exists, update it with PUT"},
+                            {"ETag": etag(current)} if current else None)
+        if CACHE_ENABLED:
+            cache.set(product["product_id"], product)
+        return response(201, {"message": "Product created", "product": product}, {"ETag": etag(product)})
 
     # ---------------- READ ALL ----------------
     if method == "GET" and not product_id:
+        params = event.get("queryStringParameters") or {}
         try:
-            data = table.scan()
-            return response(200, data.get("Items", []))
+            scan_kwargs = build_scan_kwargs(params)
+            limit = parse_int_param(params, "limit", DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+            segments = parse_int_param(params, "segments", 0, 1, MAX_SCAN_SEGMENTS)
+            if segments:
+                start_keys = decode_segment_token(params.get("next_token"), segments)
+            else:
+                start_key = decode_next_token(params.get("next_token"))
+        except ValueError as e:
+            return response(400, {"error": str(e)})
+
+        try:
+            # Admin listing: parallel segments, each resumed from its own key
+            if segments:
+                with metrics.phase("downstream"):
+                    items, next_keys = parallel_scan(scan_kwargs, segments, start_keys, limit)
+                return response(200, {
+                    "items": items,
+                    "count": len(items),
+                    "next_token": encode_next_token(next_keys and {"segments": segments, "keys": next_keys})
+                })
+
+            with metrics.phase("downstream"):
+                items, last_key = scan_page(scan_kwargs, limit, start_key)
+            return response(200, {
+                "items": items,
+                "count": len(items),
+                "next_token": encode_next_token(last_key)
+            })
         except ClientError as e:
             return response(500, {"error": str(e)})
 
     # ---------------- READ ONE ----------------
     if method == "GET" and product_id:
+        if CACHE_ENABLED:
+            item = cache.get(product_id)
+            if item is not None:
+                metrics.count("cache_hits")
+                return response(200, item, {"X-Cache": "HIT", "ETag": etag(item)})
+            metrics.count("cache_misses")
+
         try:
-            data = table.get_item(Key={"product_id": product_id})
+            with metrics.phase("downstream"):
+                data = table.get_item(Key={"product_id": product_id})
             if "Item" not in data:
                 return response(404, {"error": "Product not found"})
-            return response(200, data["Item"])
+            if CACHE_ENABLED:
+                cache.set(product_id, data["Item"])
+                log.debug("Cache miss", product_id=product_id, cache_stats=cache.stats)
+            return response(200, data["Item"], {"X-Cache": "MISS", "ETag": etag(data["Item"])})
         except ClientError as e:
             return response(500, {"error": str(e)})
 
     # ---------------- UPDATE ----------------
     if method == "PUT":
+        # PUT /products (no id) is the bulk update
         if not product_id:
-            return response(400, {"error": "Missing product_id in path"})
-
-        if "product_id" in body and body["product_id"] != product_id:
-            return response(400, {"error": "Cannot change product_id"})
-
-        errors = validate_product_data(body, require_all_fields=False)
-        if errors:
-            return response(400, {"errors": errors})
-
-        if not body:
-            return response(400, {"error": "No fields to update"})
-
-        update_expr = []
-        expr_vals = {}
-        for k, v in body.items():
-            update_expr.append(f"{k} = :{k}")
-            expr_vals[f":{k}"] = v
-
-        try:
-            table.update_item(
-                Key={"product_id": product_id},
-                UpdateExpression="SET " + ", ".join(update_expr),
-                ExpressionAttributeValues=expr_vals
-            )
-            return response(200, {"message": "Product updated"})
-        except ClientError as e:
-            return response(500, {"error": str(e)})
+            return bulk_update(body)
+        return update_product(event, product_id, body)
 
     # ---------------- DELETE ----------------
     if method == "DELETE":
         if not product_id:
             return response(400, {"error": "Missing product_id in path"})
         try:
-            table.delete_item(Key={"product_id": product_id})
-            return response(200, {"message": "Product deleted"})
+            expected_version = parse_if_match(request_header(event, "If-Match"))
+        except UpdateError as e:
+            return response(400, {"errors": e.errors})
+        try:
+            with metrics.phase("downstream"):
+                table.delete_item(**build_delete(product_id, expected_version),
+                                  ReturnValuesOnConditionCheckFailure="ALL_OLD")
         except ClientError as e:
-            return response(500, {"error": str(e)})
+            if error_code(e) != "ConditionalCheckFailedException":
+                return response(500, {"error": str(e)})
+            current = failed_item(e.response.get("Item"))
+            if current is None:
+                return response(404, {"error": "Product not found"})
+            return response(412, {"error": f"Product was modified, current ETag is {etag(current)}"},
+                            {"ETag": etag(current)})
+        if CACHE_ENABLED:
+            cache.invalidate(product_id)
+        return response(200, {"message": "Product deleted"})
 
     # ---------------- FALLBACK ----------------
     return response(405, {"error": "Method not allowed"})
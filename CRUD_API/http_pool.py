@@ -0,0 +1,176 @@
+import http.client
+import os
+import select
+import socket
+import ssl
+import threading
+import time
+import urllib.parse
+from structured_log import get_logger
+
+# -------------------------
+# Keep-alive HTTP connection pool for proxy_lambda
+# -------------------------
+# Connections are kept at module level, so warm invocations reuse the TCP
+# connection and TLS session to the CRUD API / Cognito instead of doing a new
+# handshake per call like urllib.request.urlopen.
+
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "10"))
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "2"))
+HTTP_MAX_IDLE_PER_HOST = int(os.environ.get("HTTP_MAX_IDLE_PER_HOST", "10"))
+# Idle connections older than this are dropped instead of reused; servers and
+# load balancers close idle keep-alive connections after a while (and a frozen
+# Lambda container does not notice)
+HTTP_IDLE_TIMEOUT = float(os.environ.get("HTTP_IDLE_TIMEOUT", "50"))
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# Errors that mean the request never got a usable response on this connection
+RETRYABLE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionError,
+    socket.timeout,
+)
+
+
+def never_answered(error, sent):
+    """True when the request could not be sent at all (broken pipe / reset).
+
+    Once the request is written the server may have applied it, even if it
+    hung up without answering (RemoteDisconnected), so that case is not
+    covered here.
+    """
+    return not sent and isinstance(error, ConnectionError)
+
+
+def peer_closed(conn):
+    """True when an idle connection is readable: the server closed it (or sent
+    something unexpected), so it must not carry another request."""
+    try:
+        readable, _, _ = select.select([conn.sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    return bool(readable)
+
+
+class HTTPResponse:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def text(self):
+        return self.body.decode()
+
+
+class HTTPConnectionPool:
+    def __init__(self, connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT,
+                 max_retries=HTTP_MAX_RETRIES, max_idle_per_host=HTTP_MAX_IDLE_PER_HOST,
+                 idle_timeout=HTTP_IDLE_TIMEOUT, ssl_context=None, log=None):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_timeout = idle_timeout
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        # Pass the Lambda's logger so retries carry its correlation_id
+        self.log = log or get_logger("http-pool")
+        # (scheme, host, port) -> [(connection, last_used)]
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.connections_dropped = 0
+
+    def request(self, method, url, body=None, headers=None, idempotent=None):
+        """`idempotent` overrides the method's default (e.g. False for a PUT that increments)."""
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        parts = urllib.parse.urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+
+        retries, stale_retried = 0, False
+        while True:
+            conn, reused, sent = None, False, False
+            try:
+                conn, reused = self._acquire(key)
+                conn.request(method, target, body=body, headers=headers or {})
+                sent = True
+                resp = conn.getresponse()
+                data = resp.read()
+            except RETRYABLE_ERRORS as e:
+                if conn is not None:
+                    conn.close()
+                # A stale reused connection is retried once, right away, on a fresh one:
+                # any request that was never sent, an idempotent one even after sending.
+                # A POST (or a PUT with $inc) that was sent may have been applied, so it raises
+                if reused and not stale_retried and (never_answered(e, sent) or idempotent):
+                    stale_retried = True
+                    self.log.warning("Stale keep-alive connection, retrying on a new one",
+                                     method=method, url=url, error=type(e).__name__)
+                    continue
+                # Otherwise only idempotent methods are retried (a POST may already have been applied)
+                if not idempotent or retries >= self.max_retries:
+                    raise
+                self.log.warning("HTTP request failed, retrying", method=method, url=url,
+                                 error=type(e).__name__, attempt=retries + 1)
+                time.sleep(0.05 * (2 ** retries))
+                retries += 1
+                continue
+            except Exception:
+                if conn is not None:
+                    conn.close()
+                raise
+
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            return HTTPResponse(resp.status, dict(resp.getheaders()), data)
+
+    def _acquire(self, key):
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                conn, last_used = idle.pop()
+                # Connections the server already closed are dropped before anything is sent on them
+                if now - last_used < self.idle_timeout and not peer_closed(conn):
+                    self.connections_reused += 1
+                    return conn, True
+                self.connections_dropped += 1
+                conn.close()
+            self.connections_opened += 1
+
+        scheme, host, port = key
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(host, port, timeout=self.connect_timeout, context=self.ssl_context)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=self.connect_timeout)
+        conn.connect()
+        # Headers and body go out as separate writes; without TCP_NODELAY the
+        # second one waits for the server's delayed ACK on a kept-alive connection
+        conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn.sock.settimeout(self.read_timeout)
+        return conn, False
+
+    def _release(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            for idle in self._idle.values():
+                for conn, _ in idle:
+                    conn.close()
+            self._idle.clear()
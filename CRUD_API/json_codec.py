@@ -0,0 +1,130 @@
+import base64
+import gzip
+import json
+import os
+from decimal import Decimal
+
+try:
+    import orjson  # optional dependency, several times faster than json.dumps on large listings
+except ImportError:
+    orjson = None
+
+try:
+    import brotli  # optional dependency, only needed for Content-Encoding: br
+except ImportError:
+    brotli = None
+
+# -------------------------
+# JSON encoding and response compression for crud_lambda
+# -------------------------
+# dumps() uses orjson when it is installed and the stdlib json module
+# otherwise; both write the same compact JSON. DynamoDB numbers (Decimal) and
+# sets are converted in the encoder's default hook, which the C encoders only
+# call for those values: no Python work per item, key or string. (A Python
+# pass converting every item up front measured slower than this with both
+# backends.)
+#
+# compress_response() compresses bodies of RESPONSE_COMPRESSION_MIN_BYTES or
+# more with brotli or gzip, whichever the client's Accept-Encoding allows
+# first. Compressed bodies are returned base64-encoded (isBase64Encoded); on a
+# REST API, add "*/*" to the binary media types so API Gateway decodes them.
+
+JSON_BACKEND = os.environ.get("JSON_BACKEND", "auto")  # auto | orjson | json
+# Encodings in order of preference; empty turns compression off
+RESPONSE_COMPRESSION = [e.strip() for e in os.environ.get("RESPONSE_COMPRESSION", "br,gzip").split(",") if e.strip()]
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.environ.get("RESPONSE_COMPRESSION_MIN_BYTES", "4096"))
+GZIP_LEVEL = int(os.environ.get("RESPONSE_GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.environ.get("RESPONSE_BROTLI_QUALITY", "4"))
+
+
+def resolve_backend(name=JSON_BACKEND):
+    if name == "auto":
+        return "orjson" if orjson is not None else "json"
+    if name == "orjson" and orjson is None:
+        raise RuntimeError("JSON_BACKEND=orjson needs the orjson package")
+    if name not in ("orjson", "json"):
+        raise ValueError(f"Unknown JSON_BACKEND {name!r}")
+    return name
+
+
+BACKEND = resolve_backend()
+
+
+def _default(obj):
+    if type(obj) is Decimal or isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        # DynamoDB string / number sets
+        return sorted(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(value):
+    """Compact JSON text; Decimals are written as numbers."""
+    if BACKEND == "orjson":
+        return orjson.dumps(value, default=_default).decode("utf-8")
+    return json.dumps(value, default=_default, separators=(",", ":"))
+
+
+def loads(text):
+    """Request bodies: fractions become Decimal, which is what DynamoDB accepts.
+
+    Stays on the stdlib parser: parse_float keeps the exact digits, and it is
+    faster than orjson followed by a float -> Decimal pass.
+    """
+    return json.loads(text, parse_float=Decimal)
+
+
+def accepted_encodings(header):
+    """{encoding: q} from an Accept-Encoding header ("gzip, br;q=0.5")."""
+    accepted = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header):
+    accepted = accepted_encodings(header)
+    for encoding in RESPONSE_COMPRESSION:
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def compress_response(resp, request_headers=None):
+    """Compress a Lambda proxy response for the client when it is large enough; returns the response to send."""
+    body = resp.get("body")
+    if not RESPONSE_COMPRESSION or not body or resp.get("isBase64Encoded"):
+        return resp
+    data = body.encode("utf-8")
+    if len(data) < RESPONSE_COMPRESSION_MIN_BYTES:
+        return resp
+
+    # Caches must not hand a compressed copy to a client that did not ask for it
+    headers = dict(resp.get("headers") or {}, Vary="Accept-Encoding")
+    accept = next((v for k, v in (request_headers or {}).items() if k.lower() == "accept-encoding"), "")
+    encoding = choose_encoding(accept)
+    if encoding is None:
+        return dict(resp, headers=headers)
+
+    compressed = compress(data, encoding)
+    headers["Content-Encoding"] = encoding
+    return dict(resp, headers=headers, body=base64.b64encode(compressed).decode("ascii"), isBase64Encoded=True)
@@ -0,0 +1,189 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# -------------------------
+# Local Cognito JWT verification for proxy_lambda
+# -------------------------
+# RS256 signatures are checked with plain modular exponentiation (no extra
+# packages needed in the Lambda zip). Two caches keep the hot path cheap:
+#   - JWKS keys, refreshed every JWKS_REFRESH_SECONDS (or when an unknown kid shows up)
+#   - verified claims keyed by the token's SHA-256, kept until the token's exp
+
+COGNITO_REGION = os.environ.get("COGNITO_REGION", "")
+COGNITO_USER_POOL_ID = os.environ.get("COGNITO_USER_POOL_ID", "")
+COGNITO_APP_CLIENT_ID = os.environ.get("COGNITO_APP_CLIENT_ID", "")
+JWKS_REFRESH_SECONDS = float(os.environ.get("JWKS_REFRESH_SECONDS", "3600"))
+# Minimum gap between refreshes triggered by an unknown kid (stops a flood of
+# forged kids from hammering the JWKS endpoint)
+JWKS_MIN_REFRESH_INTERVAL = float(os.environ.get("JWKS_MIN_REFRESH_INTERVAL", "60"))
+TOKEN_CACHE_MAX = int(os.environ.get("TOKEN_CACHE_MAX", "10000"))
+CLOCK_SKEW_SECONDS = 30
+
+# ASN.1 DigestInfo prefix for SHA-256 (PKCS#1 v1.5 signatures)
+SHA256_DIGEST_INFO = bytes.fromhex("3031300d060960864801650304020105000420")
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class KeysUnavailable(InvalidToken):
+    """The JWKS could not be fetched or parsed (the token itself may be fine)."""
+
+
+def b64url_decode(data):
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def b64url_uint(data):
+    return int.from_bytes(b64url_decode(data), "big")
+
+
+def rsa_sha256_verify(n, e, message, signature):
+    """PKCS#1 v1.5 RS256 signature check."""
+    k = (n.bit_length() + 7) // 8
+    if len(signature) != k:
+        return False
+    s = int.from_bytes(signature, "big")
+    if s >= n:
+        return False
+    encoded = pow(s, e, n).to_bytes(k, "big")
+    t = SHA256_DIGEST_INFO + hashlib.sha256(message).digest()
+    expected = b"\x00\x01" + b"\xff" * (k - len(t) - 3) + b"\x00" + t
+    return hmac.compare_digest(encoded, expected)
+
+
+class JWKSCache:
+    def __init__(self, url, fetch, refresh_seconds=JWKS_REFRESH_SECONDS,
+                 min_refresh_interval=JWKS_MIN_REFRESH_INTERVAL):
+        self.url = url
+        self.fetch = fetch  # url -> parsed JWKS document
+        self.refresh_seconds = refresh_seconds
+        self.min_refresh_interval = min_refresh_interval
+        self.keys = {}
+        self.fetched_at = None
+        self.fetches = 0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        jwks = self.fetch(self.url)
+        self.keys = {
+            key["kid"]: (b64url_uint(key["n"]), b64url_uint(key["e"]))
+            for key in jwks.get("keys", [])
+            if key.get("kty") == "RSA"
+        }
+        self.fetched_at = time.monotonic()
+        self.fetches += 1
+
+    def _try_refresh(self, now):
+        try:
+            self._refresh()
+        except Exception as e:
+            if not self.keys:
+                raise KeysUnavailable(f"JWKS unavailable: {e}")
+            # Keep verifying with the keys we have, try again after min_refresh_interval
+            self.fetched_at = now - self.refresh_seconds + self.min_refresh_interval
+
+    def get_key(self, kid):
+        now = time.monotonic()
+        with self._lock:
+            if self.fetched_at is None or now - self.fetched_at > self.refresh_seconds:
+                self._try_refresh(now)
+            elif kid not in self.keys and now - self.fetched_at > self.min_refresh_interval:
+                # Cognito rotated its keys
+                self._try_refresh(now)
+            return self.keys.get(kid)
+
+
+class TokenVerifier:
+    def __init__(self, jwks, issuer, client_id, cache_max=TOKEN_CACHE_MAX):
+        self.jwks = jwks
+        self.issuer = issuer
+        self.client_id = client_id
+        self.cache_max = cache_max
+        # sha256(token) -> (claims, exp)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.signature_checks = 0
+
+    def verify(self, token):
+        """Return the token's claims, or raise InvalidToken."""
+        now = time.time()
+        token_hash = hashlib.sha256(token.encode()).digest()
+
+        with self._lock:
+            cached = self._cache.get(token_hash)
+            if cached is not None:
+                claims, exp = cached
+                if exp > now - CLOCK_SKEW_SECONDS:
+                    self._cache.move_to_end(token_hash)
+                    self.cache_hits += 1
+                    return claims
+                del self._cache[token_hash]
+
+        claims = self._verify_uncached(token, now)
+
+        with self._lock:
+            self._cache[token_hash] = (claims, claims["exp"])
+            while len(self._cache) > self.cache_max:
+                self._cache.popitem(last=False)
+        return claims
+
+    def _verify_uncached(self, token, now):
+        try:
+            header_b64, payload_b64, signature_b64 = token.split(".")
+            header = json.loads(b64url_decode(header_b64))
+            claims = json.loads(b64url_decode(payload_b64))
+            signature = b64url_decode(signature_b64)
+        except (ValueError, TypeError):
+            raise InvalidToken("Malformed token")
+        if not isinstance(header, dict) or not isinstance(claims, dict):
+            raise InvalidToken("Malformed token")
+
+        if header.get("alg") != "RS256":
+            raise InvalidToken("Unsupported token algorithm")
+        if not isinstance(header.get("kid"), str):
+            raise InvalidToken("Unknown signing key")
+
+        key = self.jwks.get_key(header["kid"])
+        if key is None:
+            raise InvalidToken("Unknown signing key")
+
+        self.signature_checks += 1
+        if not rsa_sha256_verify(key[0], key[1], f"{header_b64}.{payload_b64}".encode(), signature):
+            raise InvalidToken("Invalid signature")
+
+        if not isinstance(claims.get("exp"), (int, float)) or claims["exp"] < now - CLOCK_SKEW_SECONDS:
+            raise InvalidToken("Token expired")
+        if claims.get("iss") != self.issuer:
+            raise InvalidToken("Invalid issuer")
+
+        # ID tokens carry the app client in aud, access tokens in client_id
+        token_use = claims.get("token_use")
+        if token_use == "id":
+            audience = claims.get("aud")
+        elif token_use == "access":
+            audience = claims.get("client_id")
+        else:
+            raise InvalidToken("Invalid token_use")
+        if self.client_id and audience != self.client_id:
+            raise InvalidToken("Invalid audience")
+
+        return claims
+
+
+def cognito_issuer(region=COGNITO_REGION, user_pool_id=COGNITO_USER_POOL_ID):
+    return f"https://cognito-idp.{region}.amazonaws.com/{user_pool_id}"
+
+
+def build_cognito_verifier(fetch):
+    issuer = cognito_issuer()
+    jwks = JWKSCache(f"{issuer}/.well-known/jwks.json", fetch)
+    return TokenVerifier(jwks, issuer, COGNITO_APP_CLIENT_ID)
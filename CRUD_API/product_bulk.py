@@ -0,0 +1,353 @@
+import csv
+import io
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from decimal import Decimal
+from json_codec import dumps, loads
+from product_updates import KEY_ATTRIBUTE, VERSION_ATTRIBUTE, reserved_id_errors
+from schema import PRODUCT_FIELDS, validate_product
+
+# -------------------------
+# Bulk product import / export for crud_lambda
+# -------------------------
+# Import (POST /products/import) reads NDJSON or CSV line by line, validates
+# every row with the product schema and writes the valid ones in 25-item
+# BatchWriteItem chunks from a small thread pool. At most IMPORT_WORKERS * 2
+# chunks are waiting at any time, so rows are not held in memory; only the
+# product_ids seen so far are (to report duplicates), about 130 bytes each,
+# which is why a single import is capped at IMPORT_MAX_ROWS rows.
+# Rows that fail validation or stay unprocessed after the retries are
+# reported with their line number; the others are written.
+#
+# BatchWriteItem takes no conditions, so each chunk first reads the stored
+# versions of its keys (one BatchGetItem) and writes stored version + 1: an
+# imported product never goes back to an ETag a client may still hold. A
+# write that lands between that read and the batch write is overwritten, as
+# with any bulk load.
+#
+# Export (GET /products/export) runs a parallel segmented scan. Each segment
+# streams its items into part files of up to EXPORT_PART_BYTES, written to S3
+# (or a local directory) as soon as they fill, and a manifest.json listing
+# the parts is written last. Only one part per segment is ever held in
+# memory.
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+IMPORT_BATCH_SIZE = 25  # BatchWriteItem limit
+IMPORT_WORKERS = int(os.environ.get("PRODUCT_IMPORT_WORKERS", "8"))
+IMPORT_MAX_RETRIES = int(os.environ.get("PRODUCT_IMPORT_MAX_RETRIES", "5"))
+IMPORT_BASE_DELAY = float(os.environ.get("PRODUCT_IMPORT_BASE_DELAY", "0.05"))
+# Row errors listed in the response (the counts always cover every row)
+IMPORT_MAX_ERRORS = int(os.environ.get("PRODUCT_IMPORT_MAX_ERRORS", "1000"))
+IMPORT_PROGRESS_ROWS = int(os.environ.get("PRODUCT_IMPORT_PROGRESS_ROWS", "10000"))
+# Rows per import (bounds the product_id set kept for duplicate detection);
+# larger catalogs are imported as several files
+IMPORT_MAX_ROWS = int(os.environ.get("PRODUCT_IMPORT_MAX_ROWS", "1000000"))
+EXPORT_PART_BYTES = int(os.environ.get("PRODUCT_EXPORT_PART_BYTES", str(8 * 1024 * 1024)))
+# CSV export columns when ?fields= is not given
+EXPORT_COLUMNS = list(PRODUCT_FIELDS) + [VERSION_ATTRIBUTE]
+
+_INTEGER = re.compile(r"^-?\d+$")
+_DECIMAL = re.compile(r"^-?\d+(\.\d+)?([eE][+-]?\d+)?$")
+
+
+# ----------------- Helper Functions -----------------
+
+def resolve_format(name, key=None):
+    """?format= wins; otherwise the S3 key's extension; NDJSON by default."""
+    if not name and key:
+        name = "csv" if key.lower().endswith(".csv") else "ndjson"
+    name = (name or "ndjson").lower()
+    if name not in FORMATS:
+        raise ValueError(f"'format' must be one of {', '.join(FORMATS)}")
+    return name
+
+
+def iter_text_lines(stream):
+    """Lines (with their line ends) of a text string or a binary stream such as an S3 Body."""
+    if isinstance(stream, str):
+        yield from io.StringIO(stream.lstrip("\ufeff"))
+        return
+    lines = stream.iter_lines(keepends=True) if hasattr(stream, "iter_lines") else stream
+    for index, line in enumerate(lines):
+        yield line.decode("utf-8-sig" if index == 0 else "utf-8")
+
+
+def csv_value(field, text):
+    """Typed value of a CSV cell; empty cells are left out of the row.
+
+    Schema string fields stay text; JSON arrays / objects (how the export
+    writes lists and maps) are parsed; other numeric-looking cells become
+    numbers, true / false become booleans.
+    """
+    spec_type = PRODUCT_FIELDS.get(field, {}).get("type")
+    types = spec_type if isinstance(spec_type, tuple) else (spec_type,)
+    if "string" in types:
+        return text
+    if text[:1] in ("[", "{"):
+        return loads(text)
+    if _INTEGER.match(text):
+        return int(text)
+    if _DECIMAL.match(text):
+        return Decimal(text)
+    if text.lower() in ("true", "false"):
+        return text.lower() == "true"
+    return text
+
+
+def iter_rows(fmt, lines):
+    """(line, item, errors) for every non-empty row; item is None when the row cannot be parsed."""
+    if fmt == "ndjson":
+        for line_no, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, loads(line), None
+            except ValueError as e:
+                yield line_no, None, [f"Invalid JSON: {e}"]
+        return
+
+    reader = csv.DictReader(lines)
+    for row in reader:
+        if None in row:
+            yield reader.line_num, None, ["More cells than header columns"]
+            continue
+        try:
+            item = {field: csv_value(field, text) for field, text in row.items() if text not in (None, "")}
+        except ValueError as e:
+            yield reader.line_num, None, [f"Invalid JSON cell: {e}"]
+            continue
+        yield reader.line_num, item, None
+
+
+def backoff(attempt):
+    time.sleep(IMPORT_BASE_DELAY * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+
+
+def stored_versions(table, product_ids):
+    """Versions of the products that already exist (BatchGetItem, unprocessed keys retried).
+
+    Returns (round_trips, {product_id: version}, error); error is set when
+    some keys could not be read.
+    """
+    request = {
+        "Keys": [{KEY_ATTRIBUTE: product_id} for product_id in product_ids],
+        "ProjectionExpression": "#key, #version",
+        "ExpressionAttributeNames": {"#key": KEY_ATTRIBUTE, "#version": VERSION_ATTRIBUTE}
+    }
+    versions, round_trips, error = {}, 0, None
+    for attempt in range(IMPORT_MAX_RETRIES + 1):
+        if attempt:
+            backoff(attempt)
+        try:
+            round_trips += 1
+            resp = table.meta.client.batch_get_item(RequestItems={table.name: request})
+        except Exception as e:
+            error = e
+            continue
+        error = None
+        for item in resp.get("Responses", {}).get(table.name, []):
+            # Products stored before versioning are version 0
+            versions[item[KEY_ATTRIBUTE]] = int(item.get(VERSION_ATTRIBUTE, 0))
+        request = resp.get("UnprocessedKeys", {}).get(table.name)
+        if not request:
+            break
+    if error is None and request:
+        error = "stored versions left unprocessed by BatchGetItem"
+    return round_trips, versions, error
+
+
+def write_chunk(table, items):
+    """BatchWriteItem one chunk, retrying UnprocessedItems with backoff.
+
+    Returns (round_trips, product_ids left unwritten, last error).
+    """
+    requests = [{"PutRequest": {"Item": item}} for item in items]
+    round_trips, error = 0, None
+    for attempt in range(IMPORT_MAX_RETRIES + 1):
+        if attempt:
+            backoff(attempt)
+        try:
+            round_trips += 1
+            resp = table.meta.client.batch_write_item(RequestItems={table.name: requests})
+        except Exception as e:
+            error = e
+            continue
+        error = None
+        requests = resp.get("UnprocessedItems", {}).get(table.name, [])
+        if not requests:
+            break
+    return round_trips, {req["PutRequest"]["Item"][KEY_ATTRIBUTE] for req in requests}, error
+
+
+def import_products(table, rows, workers=IMPORT_WORKERS, on_progress=None, on_written=None):
+    """Validate and write (line, item, errors) rows; returns the import report.
+
+    on_progress(report) is called every IMPORT_PROGRESS_ROWS rows and
+    on_written(product_ids) after each chunk is stored (from pool threads).
+    """
+    report = {"rows": 0, "imported": 0, "failed": 0, "round_trips": 0, "errors": []}
+    lock = threading.Lock()
+    # product_id -> line, a later row would silently overwrite an earlier one
+    first_seen = {}
+
+    def fail(line, errors):
+        with lock:
+            report["failed"] += 1
+            if len(report["errors"]) < IMPORT_MAX_ERRORS:
+                report["errors"].append({"line": line, "errors": errors})
+
+    def store(chunk):
+        lookups, versions, error = stored_versions(table, [item[KEY_ATTRIBUTE] for _, item in chunk])
+        if error is not None:
+            # Writing without the stored versions could reset them, skip the chunk
+            with lock:
+                report["round_trips"] += lookups
+            for line, _ in chunk:
+                fail(line, [f"Not written: could not read the stored version: {error}"])
+            return
+        items = [dict(item, **{VERSION_ATTRIBUTE: versions.get(item[KEY_ATTRIBUTE], 0) + 1}) for _, item in chunk]
+        round_trips, unwritten, error = write_chunk(table, items)
+        with lock:
+            report["round_trips"] += lookups + round_trips
+            report["imported"] += len(chunk) - len(unwritten)
+        for line, item in chunk:
+            if item[KEY_ATTRIBUTE] in unwritten:
+                fail(line, [f"Not written: {error or 'left unprocessed by BatchWriteItem'}"])
+        if on_written is not None:
+            on_written([item[KEY_ATTRIBUTE] for _, item in chunk if item[KEY_ATTRIBUTE] not in unwritten])
+
+    chunk, pending = [], set()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for line, item, errors in rows:
+            if report["rows"] == IMPORT_MAX_ROWS:
+                report["rows"] += 1
+                report["truncated"] = True
+                fail(line, [f"Import stopped: more than {IMPORT_MAX_ROWS} rows, split the file"])
+                break
+            report["rows"] += 1
+            if errors is None:
+                errors = validate_product(item) or reserved_id_errors(item[KEY_ATTRIBUTE])
+            if not errors and item[KEY_ATTRIBUTE] in first_seen:
+                errors = [f"Duplicate product_id '{item[KEY_ATTRIBUTE]}', first on line {first_seen[item[KEY_ATTRIBUTE]]}"]
+            if errors:
+                fail(line, errors)
+            else:
+                first_seen[item[KEY_ATTRIBUTE]] = line
+                chunk.append((line, item))
+
+            if len(chunk) == IMPORT_BATCH_SIZE:
+                pending.add(pool.submit(store, chunk))
+                chunk = []
+                # Backpressure: stop reading while the writers are behind
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+            if on_progress is not None and report["rows"] % IMPORT_PROGRESS_ROWS == 0:
+                on_progress(report)
+
+        if chunk:
+            pending.add(pool.submit(store, chunk))
+        for future in pending:
+            future.result()
+
+    report["errors"].sort(key=lambda e: e["line"])
+    if on_progress is not None:
+        on_progress(report)
+    return report
+
+
+class S3Sink:
+    """Export parts as objects in an S3 bucket."""
+
+    def __init__(self, client, bucket):
+        self.client = client
+        self.bucket = bucket
+
+    def write(self, key, data, content_type):
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data, ContentType=content_type)
+        return f"s3://{self.bucket}/{key}"
+
+
+class DirectorySink:
+    """Export parts as files under a local directory (local runs, no bucket)."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def write(self, key, data, content_type):
+        path = os.path.join(self.directory, *key.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+
+def csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, dict, set)):
+        return dumps(value)
+    return str(value)
+
+
+def export_products(iter_segment, total_segments, sink, fmt="ndjson", columns=None, export_id=None):
+    """Stream every item from iter_segment(segment, total_segments) into part files; returns the manifest."""
+    export_id = export_id or time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()) + "-" + uuid.uuid4().hex[:8]
+    prefix = f"exports/{export_id}"
+    columns = columns or EXPORT_COLUMNS
+    content_type = FORMATS[fmt]
+
+    def header():
+        if fmt != "csv":
+            return b""
+        out = io.StringIO()
+        csv.writer(out).writerow(columns)
+        return out.getvalue().encode("utf-8")
+
+    def encode(item):
+        if fmt == "ndjson":
+            return (dumps(item) + "\n").encode("utf-8")
+        out = io.StringIO()
+        csv.writer(out).writerow([csv_cell(item.get(column)) for column in columns])
+        return out.getvalue().encode("utf-8")
+
+    def export_segment(segment):
+        parts, buffer, count = [], bytearray(header()), 0
+
+        def flush():
+            key = f"{prefix}/part-{segment:02d}-{len(parts):04d}.{fmt}"
+            location = sink.write(key, buffer, content_type)
+            parts.append({"key": key, "location": location, "count": count, "bytes": len(buffer)})
+
+        for item in iter_segment(segment, total_segments):
+            buffer += encode(item)
+            count += 1
+            if len(buffer) >= EXPORT_PART_BYTES:
+                flush()
+                buffer, count = bytearray(header()), 0
+        if count:
+            flush()
+        return parts
+
+    with ThreadPoolExecutor(max_workers=total_segments) as pool:
+        parts = [part for segment_parts in pool.map(export_segment, range(total_segments)) for part in segment_parts]
+
+    manifest = {
+        "export_id": export_id,
+        "format": fmt,
+        "columns": columns if fmt == "csv" else None,
+        "count": sum(p["count"] for p in parts),
+        "bytes": sum(p["bytes"] for p in parts),
+        "parts": parts
+    }
+    # Written last: readers can treat the manifest as the "export complete" marker
+    manifest["manifest"] = sink.write(f"{prefix}/manifest.json", dumps(manifest).encode("utf-8"), "application/json")
+    return manifest
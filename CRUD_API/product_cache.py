@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from structured_log import get_logger
+
+# -------------------------
+# Read-through product cache for crud_lambda
+# -------------------------
+# Lives at module level so it survives across warm invocations of the same
+# container. An optional shared backend (Redis-compatible) lets containers
+# see each other's writes.
+
+CACHE_MAX_ITEMS = int(os.environ.get("PRODUCT_CACHE_MAX_ITEMS", "1000"))
+CACHE_TTL_SECONDS = float(os.environ.get("PRODUCT_CACHE_TTL_SECONDS", "30"))
+CACHE_REDIS_URL = os.environ.get("PRODUCT_CACHE_REDIS_URL", "")
+
+
+class LRUTTLCache:
+    """In-process LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, max_items=CACHE_MAX_ITEMS, ttl=CACHE_TTL_SECONDS, backend=None):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.backend_hits = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+
+        if self.backend is not None:
+            value = self.backend.get(key)
+            if value is not None:
+                self.backend_hits += 1
+                self.hits += 1
+                self._store(key, value)
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        self._store(key, value)
+        if self.backend is not None:
+            self.backend.set(key, value, self.ttl)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.backend is not None:
+            self.backend.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "backend_hits": self.backend_hits
+        }
+
+
+class RedisBackend:
+    """Shared cache backend for any Redis-compatible server (Redis, Valkey, ElastiCache)."""
+
+    def __init__(self, url, prefix="product:", log=None):
+        import redis  # optional dependency, only needed when a shared backend is configured
+        self.client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self.prefix = prefix
+        # Pass the Lambda's logger so backend errors carry its correlation_id
+        self.log = log or get_logger("product-cache")
+
+    def get(self, key):
+        try:
+            raw = self.client.get(self.prefix + key)
+        except Exception as e:
+            # A cache outage must never fail the request, fall back to DynamoDB
+            self.log.warning("Cache backend get failed", key=key, error=str(e))
+            return None
+        return json.loads(raw, parse_float=Decimal) if raw else None
+
+    def set(self, key, value, ttl):
+        try:
+            self.client.set(self.prefix + key, json.dumps(value, default=_decimal_default), ex=max(1, int(ttl)))
+        except Exception as e:
+            self.log.warning("Cache backend set failed", key=key, error=str(e))
+
+    def delete(self, key):
+        try:
+            self.client.delete(self.prefix + key)
+        except Exception as e:
+            self.log.warning("Cache backend delete failed", key=key, error=str(e))
+
+
+def _decimal_default(obj):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError
+
+
+def build_cache(log=None):
+    backend = RedisBackend(CACHE_REDIS_URL, log=log) if CACHE_REDIS_URL else None
+    return LRUTTLCache(backend=backend)
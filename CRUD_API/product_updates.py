@@ -0,0 +1,287 @@
+from decimal import Decimal
+from schema import PRODUCT_FIELDS, validate_product_update
+
+# -------------------------
+# Conditional / atomic updates for PUT /products
+# -------------------------
+# PUT bodies are turned into one UpdateItem call, so a change never needs a
+# read first. Plain fields are SET as before; operators run on the server:
+#
+#   {"price": 19.99,                 SET price
+#    "$inc": {"stock": -2},          stock = stock - 2 (refused below zero)
+#    "$append": {"tags": ["sale"]},  tags = tags + ["sale"]
+#    "$remove": ["discount"]}        REMOVE discount
+#
+# Every attribute name goes through a #placeholder and every value through a
+# :placeholder, so user keys never become expression syntax (and reserved
+# words like "name" just work).
+#
+# Each write also bumps a server-managed `version` attribute, exposed as the
+# ETag header ("3"). A client that sends If-Match: "3" gets the update only
+# if nobody wrote the product since it read version 3 (optimistic
+# concurrency); otherwise DynamoDB rejects the condition and the caller
+# answers 412 with the current ETag.
+
+OPERATORS = ("$inc", "$append", "$remove")
+VERSION_ATTRIBUTE = "version"
+KEY_ATTRIBUTE = "product_id"
+# Literal routes next to /products/{product_id}: API Gateway matches them
+# first, so a product with one of these ids could never be read or updated
+RESERVED_PRODUCT_IDS = ("import", "export")
+# TransactWriteItems accepts up to 100 actions
+MAX_BULK_UPDATES = 100
+
+# Required product fields cannot be removed, string / bool fields cannot be incremented
+_NUMERIC_FIELDS = {name for name, spec in PRODUCT_FIELDS.items() if spec.get("type") in ("number", "integer")}
+_REQUIRED_FIELDS = {name for name, spec in PRODUCT_FIELDS.items() if spec.get("required")}
+
+
+class UpdateError(ValueError):
+    """The update body is invalid; `errors` lists every problem found."""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+# ----------------- Helper Functions -----------------
+
+def etag(item):
+    """ETag of a stored product; items written before versioning are version 0."""
+    return f'"{int((item or {}).get(VERSION_ATTRIBUTE, 0))}"'
+
+
+def parse_if_match(header):
+    """Expected version from an If-Match header: None (absent or *), else an int."""
+    if header is None:
+        return None
+    value = header.strip()
+    if value in ("", "*"):
+        return None
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise UpdateError([f"Invalid If-Match header {header!r}, expected an ETag like \"3\""])
+
+
+class _Expression:
+    """Collects #name / :value placeholders while clauses are written."""
+
+    def __init__(self):
+        self.names = {}
+        self.values = {}
+        self._name_refs = {}
+
+    def name(self, attribute):
+        ref = self._name_refs.get(attribute)
+        if ref is None:
+            ref = self._name_refs[attribute] = f"#n{len(self._name_refs)}"
+            self.names[ref] = attribute
+        return ref
+
+    def value(self, value):
+        ref = f":v{len(self.values)}"
+        self.values[ref] = value
+        return ref
+
+
+def _is_number(value):
+    return type(value) in (int, float, Decimal)
+
+
+def _check_field(field, errors, seen):
+    if not isinstance(field, str) or not field:
+        errors.append(f"Invalid field name {field!r}")
+        return False
+    if field == KEY_ATTRIBUTE:
+        errors.append("Cannot change product_id")
+        return False
+    if field == VERSION_ATTRIBUTE:
+        errors.append(f"'{VERSION_ATTRIBUTE}' is managed by the server, send If-Match instead")
+        return False
+    if field in seen:
+        errors.append(f"'{field}' is updated more than once")
+        return False
+    seen.add(field)
+    return True
+
+
+def build_update(product_id, body, expected_version=None):
+    """UpdateItem arguments (Key, expressions, condition) for a PUT body.
+
+    Raises UpdateError with every problem in the body. The condition always
+    requires the product to exist (PUT no longer creates half products), plus
+    the If-Match version and enough stock for each decrement.
+    """
+    if not isinstance(body, dict):
+        raise UpdateError(["Payload must be an object"])
+
+    fields = {k: v for k, v in body.items() if k not in OPERATORS}
+    errors = []
+    if fields.get(KEY_ATTRIBUTE, product_id) != product_id:
+        errors.append("Cannot change product_id")
+    fields.pop(KEY_ATTRIBUTE, None)
+    errors.extend(validate_product_update(fields))
+
+    expr = _Expression()
+    seen = set()
+    sets, removes, conditions = [], [], [f"attribute_exists({expr.name(KEY_ATTRIBUTE)})"]
+
+    for field, value in fields.items():
+        if _check_field(field, errors, seen):
+            sets.append(f"{expr.name(field)} = {expr.value(value)}")
+
+    increments = body.get("$inc", {})
+    if not isinstance(increments, dict):
+        errors.append("'$inc' must be an object of field: amount")
+        increments = {}
+    for field, amount in increments.items():
+        if not _check_field(field, errors, seen):
+            continue
+        if not _is_number(amount):
+            errors.append(f"Invalid type for '$inc.{field}', expected number")
+            continue
+        if field in PRODUCT_FIELDS and field not in _NUMERIC_FIELDS:
+            errors.append(f"'{field}' is not numeric and cannot be incremented")
+            continue
+        ref = expr.name(field)
+        sets.append(f"{ref} = if_not_exists({ref}, {expr.value(0)}) + {expr.value(amount)}")
+        if amount < 0:
+            # Decrements never take a counter (stock) below zero
+            conditions.append(f"{ref} >= {expr.value(-amount)}")
+
+    appends = body.get("$append", {})
+    if not isinstance(appends, dict):
+        errors.append("'$append' must be an object of field: [values]")
+        appends = {}
+    for field, items in appends.items():
+        if not _check_field(field, errors, seen):
+            continue
+        if not isinstance(items, list) or not items:
+            errors.append(f"'$append.{field}' must be a non-empty array")
+            continue
+        ref = expr.name(field)
+        sets.append(f"{ref} = list_append(if_not_exists({ref}, {expr.value([])}), {expr.value(items)})")
+
+    removals = body.get("$remove", [])
+    if not isinstance(removals, list):
+        errors.append("'$remove' must be an array of field names")
+        removals = []
+    for field in removals:
+        if not _check_field(field, errors, seen):
+            continue
+        if field in _REQUIRED_FIELDS:
+            errors.append(f"'{field}' is required and cannot be removed")
+            continue
+        removes.append(expr.name(field))
+
+    if not errors and not seen:
+        errors.append("No fields to update")
+    if errors:
+        raise UpdateError(errors)
+
+    version = expr.name(VERSION_ATTRIBUTE)
+    sets.append(f"{version} = if_not_exists({version}, {expr.value(0)}) + {expr.value(1)}")
+    if expected_version is not None:
+        # Items from before versioning have no attribute and count as version 0
+        conditions.append(f"attribute_not_exists({version})" if expected_version == 0
+                          else f"{version} = {expr.value(expected_version)}")
+
+    update_expression = "SET " + ", ".join(sets)
+    if removes:
+        update_expression += " REMOVE " + ", ".join(removes)
+    return {
+        "Key": {KEY_ATTRIBUTE: product_id},
+        "UpdateExpression": update_expression,
+        "ConditionExpression": " AND ".join(conditions),
+        "ExpressionAttributeNames": expr.names,
+        "ExpressionAttributeValues": expr.values
+    }
+
+
+def reserved_id_errors(product_id):
+    """Error list for a new product whose id is taken by a route."""
+    if product_id in RESERVED_PRODUCT_IDS:
+        return [f"'{product_id}' is reserved, choose another product_id"]
+    return []
+
+
+def build_create(body):
+    """PutItem arguments for POST: the product starts at version 1 and must not exist yet.
+
+    Overwriting an existing product would reset its version to 1, and a client
+    still holding an old If-Match "1" would then win against newer writes.
+    """
+    return {
+        "Item": dict(body, **{VERSION_ATTRIBUTE: 1}),
+        "ConditionExpression": "attribute_not_exists(#key)",
+        "ExpressionAttributeNames": {"#key": KEY_ATTRIBUTE}
+    }
+
+
+def build_delete(product_id, expected_version=None):
+    """DeleteItem arguments; with If-Match the delete only happens at that version."""
+    kwargs = {"Key": {KEY_ATTRIBUTE: product_id}}
+    if expected_version is not None:
+        if expected_version == 0:
+            kwargs["ConditionExpression"] = "attribute_exists(#key) AND attribute_not_exists(#version)"
+            kwargs["ExpressionAttributeNames"] = {"#key": KEY_ATTRIBUTE, "#version": VERSION_ATTRIBUTE}
+        else:
+            kwargs["ConditionExpression"] = "#version = :expected"
+            kwargs["ExpressionAttributeNames"] = {"#version": VERSION_ATTRIBUTE}
+            kwargs["ExpressionAttributeValues"] = {":expected": expected_version}
+    return kwargs
+
+
+def build_bulk_update(table_name, updates):
+    """TransactWriteItems actions for PUT /products ({"updates": [...]}).
+
+    Each entry is a PUT body plus "product_id" and an optional "if_match"
+    ETag. Returns ([(product_id, body, expected_version)], transact_items);
+    raises UpdateError with the problems of every entry, prefixed with its index.
+    """
+    if not isinstance(updates, list) or not updates:
+        raise UpdateError(["'updates' must be a non-empty array"])
+    if len(updates) > MAX_BULK_UPDATES:
+        raise UpdateError([f"At most {MAX_BULK_UPDATES} updates per request"])
+
+    errors, planned, transact_items = [], [], []
+    product_ids = set()
+    for index, entry in enumerate(updates):
+        if not isinstance(entry, dict) or not isinstance(entry.get(KEY_ATTRIBUTE), str):
+            errors.append(f"updates[{index}]: missing 'product_id'")
+            continue
+        entry = dict(entry)
+        product_id = entry.pop(KEY_ATTRIBUTE)
+        if product_id in product_ids:
+            errors.append(f"updates[{index}]: '{product_id}' appears more than once")
+            continue
+        product_ids.add(product_id)
+        try:
+            if_match = entry.pop("if_match", None)
+            expected_version = parse_if_match(None if if_match is None else str(if_match))
+            update = build_update(product_id, entry, expected_version)
+        except UpdateError as e:
+            errors.extend(f"updates[{index}]: {error}" for error in e.errors)
+            continue
+        planned.append((product_id, entry, expected_version))
+        transact_items.append({"Update": dict(
+            update, TableName=table_name, ReturnValuesOnConditionCheckFailure="ALL_OLD")})
+    if errors:
+        raise UpdateError(errors)
+    return planned, transact_items
+
+
+def explain_conflict(current, body, expected_version=None):
+    """(status, message) for an update whose condition failed, given the stored item (or None)."""
+    if current is None:
+        return 404, "Product not found"
+    if expected_version is not None and int(current.get(VERSION_ATTRIBUTE, 0)) != expected_version:
+        return 412, f"Product was modified, current ETag is {etag(current)}"
+    for field, amount in (body.get("$inc") or {}).items():
+        have = current.get(field, 0)
+        if amount < 0 and (not _is_number(have) or have < -amount):
+            return 409, f"Not enough '{field}': has {have}, needs {-amount}"
+    return 409, "Update condition failed"
@@ -1,8 +1,12 @@
 import json
 import urllib.parse
-import urllib.request
 import base64
 import os
+from http_pool import HTTPConnectionPool
+from jwt_verify import COGNITO_USER_POOL_ID, InvalidToken, KeysUnavailable, build_cognito_verifier
+from token_cache import SingleFlight, TokenResponseCache, cache_key
+from lambda_metrics import Metrics
+from structured_log import get_logger
 
 # -------------------------
 # Environment variables
@@ -15,11 +19,38 @@ COGNITO_CLIENT_SECRET = ""
 COGNITO_REDIRECT_URI = ""
 ALLOWED_ORIGIN = "*"
 
+log = get_logger("proxy")
+metrics = Metrics("proxy")
+authorizer_metrics = Metrics("proxy-authorizer")
+
+# Keep-alive connections to the CRUD API and Cognito, reused across warm invocations
+http_pool = HTTPConnectionPool(log=log)
+
+# Verify bearer tokens in this Lambda (JWKS + verified-token caches live across
+# warm invocations) instead of trusting requestContext claims.
+# Needs COGNITO_REGION, COGNITO_USER_POOL_ID and COGNITO_APP_CLIENT_ID.
+VERIFY_JWT = bool(COGNITO_USER_POOL_ID)
+
+def fetch_jwks(url):
+    resp = http_pool.request("GET", url)
+    if resp.status != 200:
+        raise RuntimeError(f"JWKS fetch failed with status {resp.status}")
+    return json.loads(resp.body)
+
+token_verifier = build_cognito_verifier(fetch_jwks)
+
+# Token endpoint calls shared by concurrent auth requests; refresh responses
+# are also reused for a few seconds (codes are single use and never cached)
+token_responses = TokenResponseCache()
+token_flights = SingleFlight()
+
 # -------------------------
 # Lambda handler
 # -------------------------
+@metrics.instrument
 def lambda_handler(event, context):
-    print("DEBUG: Incoming event:", json.dumps(event))
+    log.start_invocation(event, context)
+    log.debug("Incoming event", event=event)
 
     path = event.get("rawPath") or event.get("path")
     method = event.get("httpMethod", "")
@@ -29,7 +60,7 @@ def lambda_handler(event, context):
     # 0️⃣ Handle CORS preflight
     # -------------------------
     if method.upper() == "OPTIONS":
-        print("DEBUG: Handling CORS preflight")
+        log.debug("Handling CORS preflight")
         return {
             "statusCode": 200,
             "headers": cors_headers(),
@@ -37,70 +68,138 @@ def lambda_handler(event, context):
         }
 
     # -------------------------
-    # 1️⃣ Handle /auth/exchange
+    # 1️⃣ Handle /auth/exchange and /auth/refresh
     # -------------------------
     if path == "/auth/exchange" and method.upper() == "POST":
         return handle_auth_exchange(body)
 
+    # Renew ID / access tokens with the refresh token
+    if path == "/auth/refresh" and method.upper() == "POST":
+        return handle_auth_refresh(body)
+
     # -------------------------
     # 2️⃣ Extract user info
     # -------------------------
-    claims = event.get("requestContext", {}).get("authorizer", {}).get("jwt", {}).get("claims", {})
+    if VERIFY_JWT:
+        try:
+            with metrics.phase("auth"):
+                claims = verify_bearer_token(event.get("headers") or {})
+        except KeysUnavailable as e:
+            # Cannot check any token right now: not the client's fault
+            log.error("Token verification unavailable", reason=str(e))
+            metrics.count("jwks_unavailable")
+            return {
+                "statusCode": 503,
+                "headers": cors_headers(),
+                "body": json.dumps({"error": "Authentication temporarily unavailable"})
+            }
+        except InvalidToken as e:
+            log.warning("Rejected token", reason=str(e))
+            metrics.count("rejected_tokens")
+            return {
+                "statusCode": 401,
+                "headers": cors_headers(),
+                "body": json.dumps({"error": "Unauthorized"})
+            }
+    else:
+        claims = event.get("requestContext", {}).get("authorizer", {}).get("jwt", {}).get("claims", {})
     user_role = claims.get("custom:role", "user")
     user_sub = claims.get("sub", "unknown")
-    print(f"DEBUG: User role={user_role}, sub={user_sub}")
+    log.bind(user_sub=user_sub)
+    log.debug("User claims", role=user_role)
 
     # -------------------------
     # 3️⃣ Authorization logic
     # -------------------------
     # Only GET /products restricted to admin
     if method.upper() == "GET" and path == "/products" and user_role != "admin":
-        print("WARN: Non-admin attempted to view all products")
+        log.warning("Non-admin attempted to view all products", role=user_role)
         return {
             "statusCode": 403,
             "headers": cors_headers(),
             "body": json.dumps({"error": "You are not authorized to view all products"})
         }
 
+    # Bulk import / export of the whole catalog is admin only as well
+    if path in ("/products/import", "/products/export") and user_role != "admin":
+        log.warning("Non-admin attempted a bulk import / export", role=user_role, path=path)
+        return {
+            "statusCode": 403,
+            "headers": cors_headers(),
+            "body": json.dumps({"error": "You are not authorized to import or export products"})
+        }
+
     # -------------------------
     # 4️⃣ Forward request to CRUD API
     # -------------------------
     try:
         data_bytes = body.encode("utf-8") if body else None
         req_url = f"{CRUD_API_URL}{path}"
-        print(f"DEBUG: Forwarding {method} request to CRUD API at {req_url}")
-        print("DEBUG: Request body:", body)
+        # Keep paging / filter parameters (limit, next_token, fields, ...)
+        query = event.get("rawQueryString") or urllib.parse.urlencode(event.get("queryStringParameters") or {})
+        if query:
+            req_url = f"{req_url}?{query}"
+        log.debug("Forwarding request to CRUD API", method=method, url=req_url, body=body)
 
-        req = urllib.request.Request(
-            url=req_url,
-            data=data_bytes,
-            method=method
-        )
-        req.add_header("x-api-key", CRUD_API_KEY)
-        req.add_header("Content-Type", "application/json")
+        req_headers = {
+            "x-api-key": CRUD_API_KEY,
+            "Content-Type": "application/json",
+            # Lets the CRUD Lambda's logs be joined with this request's
+            "X-Correlation-Id": log.correlation_id
+        }
 
         # Forward Authorization header if exists
         headers = event.get("headers") or {}
         auth_header = headers.get("Authorization") or headers.get("authorization")
         if auth_header:
-            req.add_header("Authorization", auth_header)
-            print("DEBUG: Forwarding Authorization header")
+            req_headers["Authorization"] = auth_header
+            log.debug("Forwarding Authorization header")
+        # Optimistic concurrency: the CRUD API answers 412 when the product changed since this ETag
+        if_match = headers.get("If-Match") or headers.get("if-match")
+        if if_match:
+            req_headers["If-Match"] = if_match
+        # Large listings come back gzip / br compressed and are passed through as they are
+        accept_encoding = headers.get("Accept-Encoding") or headers.get("accept-encoding")
+        if accept_encoding:
+            req_headers["Accept-Encoding"] = accept_encoding
 
-        with urllib.request.urlopen(req) as resp:
-            resp_body = resp.read().decode()
-            resp_status = resp.getcode()
-            print(f"DEBUG: CRUD API response status={resp_status}, body={resp_body}")
+        # Atomic update operators apply again when a PUT is retried, so those are sent once
+        idempotent = method.upper() != "PUT" or not any(op in (body or "") for op in ('"$inc"', '"$append"'))
+
+        with metrics.phase("downstream"):
+            resp = http_pool.request(method, req_url, body=data_bytes, headers=req_headers, idempotent=idempotent)
+        resp_status = resp.status
+        upstream = {k.lower(): v for k, v in resp.headers.items()}
+        resp_headers = dict(cors_headers(), **{name: upstream[name.lower()] for name in ("ETag", "Vary")
+                                               if name.lower() in upstream})
+
+        # A compressed body is only re-encoded for API Gateway (base64), never decompressed
+        if upstream.get("content-encoding"):
+            resp_headers["Content-Encoding"] = upstream["content-encoding"]
+            log.debug("CRUD API response", status=resp_status, encoding=upstream["content-encoding"],
+                      compressed_bytes=len(resp.body))
+            if resp_status >= 400:
+                log.error("CRUD API returned an error", status=resp_status)
+            return {
+                "statusCode": resp_status,
+                "headers": resp_headers,
+                "body": base64.b64encode(resp.body).decode("ascii"),
+                "isBase64Encoded": True
+            }
+
+        resp_body = resp.text()
+        log.debug("CRUD API response", status=resp_status, body=resp_body)
+
+        if resp_status >= 400:
+            log.error("CRUD API returned an error", status=resp_status, body=resp_body)
+            return {
+                "statusCode": resp_status,
+                "headers": resp_headers,
+                "body": json.dumps({"error": resp_body})
+            }
 
-    except urllib.error.HTTPError as e:
-        error_body = e.read().decode()
-        print(f"ERROR: HTTPError {e.code} - {error_body}")
-        return {
-            "statusCode": e.code,
-            "headers": cors_headers(),
-            "body": json.dumps({"error": error_body})
-        }
     except Exception as e:
-        print(f"ERROR: Exception forwarding request: {str(e)}")
+        log.exception("Exception forwarding request", e)
         return {
             "statusCode": 500,
             "headers": cors_headers(),
@@ -112,10 +211,44 @@ def lambda_handler(event, context):
     # -------------------------
     return {
         "statusCode": resp_status,
-        "headers": cors_headers(),
+        "headers": resp_headers,
         "body": resp_body
     }
 
+# -------------------------
+# Token verification
+# -------------------------
+def verify_bearer_token(headers):
+    auth_header = headers.get("Authorization") or headers.get("authorization") or ""
+    scheme, _, token = auth_header.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise InvalidToken("Missing bearer token")
+    return token_verifier.verify(token.strip())
+
+# Standalone Lambda authorizer (HTTP API, simple responses)
+@authorizer_metrics.instrument
+def authorizer_handler(event, context):
+    log.start_invocation(event, context)
+    try:
+        with authorizer_metrics.phase("auth"):
+            claims = verify_bearer_token(event.get("headers") or {})
+    except KeysUnavailable as e:
+        authorizer_metrics.count("jwks_unavailable")
+        log.error("Authorizer cannot verify tokens", reason=str(e))
+        return {"isAuthorized": False}
+    except InvalidToken as e:
+        authorizer_metrics.count("rejected_tokens")
+        log.warning("Authorizer rejected token", reason=str(e))
+        return {"isAuthorized": False}
+
+    return {
+        "isAuthorized": True,
+        "context": {
+            "sub": claims.get("sub", "unknown"),
+            "role": claims.get("custom:role", "user")
+        }
+    }
+
 # -------------------------
 # Handle /auth/exchange
 # -------------------------
@@ -123,7 +256,7 @@ def handle_auth_exchange(body):
     try:
         data = json.loads(body)
         code = data.get("code")
-        print("DEBUG: Authorization code:", code)
+        log.debug("Exchanging authorization code", code_present=bool(code))
 
         if not code:
             return {
@@ -132,24 +265,57 @@ def handle_auth_exchange(body):
                 "body": json.dumps({"error": "Authorization code is required"})
             }
 
-        token_url = f"{COGNITO_DOMAIN}/oauth2/token"
-        post_data = urllib.parse.urlencode({
+        tokens = request_tokens("authorization_code", code, {
             "grant_type": "authorization_code",
             "code": code,
             "redirect_uri": COGNITO_REDIRECT_URI
-        }).encode("utf-8")
+        })
 
-        auth_string = f"{COGNITO_CLIENT_ID}:{COGNITO_CLIENT_SECRET}"
-        auth_header = base64.b64encode(auth_string.encode()).decode()
+        return {
+            "statusCode": 200,
+            "headers": cors_headers(),
+            "body": json.dumps({
+                "id_token": tokens.get("id_token"),
+                "access_token": tokens.get("access_token"),
+                "refresh_token": tokens.get("refresh_token"),
+                "expires_in": tokens.get("expires_in")
+            })
+        }
 
-        req = urllib.request.Request(token_url, data=post_data)
-        req.add_header("Content-Type", "application/x-www-form-urlencoded")
-        req.add_header("Authorization", f"Basic {auth_header}")
+    except TokenEndpointError as e:
+        log.error("Token endpoint error", grant_type="authorization_code", status=e.status, body=e.body)
+        return {
+            "statusCode": e.status,
+            "headers": cors_headers(),
+            "body": json.dumps({"error": e.body})
+        }
+    except Exception as e:
+        log.exception("Failed to exchange code", e)
+        return {
+            "statusCode": 500,
+            "headers": cors_headers(),
+            "body": json.dumps({"error": f"Failed to exchange code: {str(e)}"})
+        }
 
-        with urllib.request.urlopen(req) as response:
-            resp_body = response.read().decode()
-            print("DEBUG: Cognito response body:", resp_body)
-            tokens = json.loads(resp_body)
+# -------------------------
+# Handle /auth/refresh
+# -------------------------
+def handle_auth_refresh(body):
+    try:
+        data = json.loads(body)
+        refresh_token = data.get("refresh_token")
+
+        if not refresh_token:
+            return {
+                "statusCode": 400,
+                "headers": cors_headers(),
+                "body": json.dumps({"error": "Refresh token is required"})
+            }
+
+        tokens = request_tokens("refresh_token", refresh_token, {
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token
+        })
 
         return {
             "statusCode": 200,
@@ -157,33 +323,85 @@ def handle_auth_exchange(body):
             "body": json.dumps({
                 "id_token": tokens.get("id_token"),
                 "access_token": tokens.get("access_token"),
-                "refresh_token": tokens.get("refresh_token")
+                # Cognito does not rotate refresh tokens, keep using the same one
+                "refresh_token": tokens.get("refresh_token") or refresh_token,
+                "expires_in": tokens.get("expires_in")
             })
         }
 
-    except urllib.error.HTTPError as e:
-        error_body = e.read().decode()
-        print("ERROR HTTP:", e.code, error_body)
+    except TokenEndpointError as e:
+        log.error("Token endpoint error", grant_type="refresh_token", status=e.status, body=e.body)
         return {
-            "statusCode": e.code,
+            "statusCode": e.status,
             "headers": cors_headers(),
-            "body": json.dumps({"error": error_body})
+            "body": json.dumps({"error": e.body})
         }
     except Exception as e:
-        print("ERROR: Failed to exchange code:", str(e))
+        log.exception("Failed to refresh tokens", e)
         return {
             "statusCode": 500,
             "headers": cors_headers(),
-            "body": json.dumps({"error": f"Failed to exchange code: {str(e)}"})
+            "body": json.dumps({"error": f"Failed to refresh tokens: {str(e)}"})
         }
 
+# -------------------------
+# Cognito token endpoint
+# -------------------------
+class TokenEndpointError(Exception):
+    def __init__(self, status, body):
+        super().__init__(f"Token endpoint returned {status}")
+        self.status = status
+        self.body = body
+
+def request_tokens(grant_type, secret, params):
+    """POST to {COGNITO_DOMAIN}/oauth2/token, de-duplicated per code / refresh token.
+
+    Only refresh responses go through the (seconds-long) response cache: an
+    authorization code is shared by requests in flight at the same time, but a
+    later exchange of the same code always reaches Cognito, which refuses it.
+    """
+    key = cache_key(grant_type, secret)
+    cacheable = grant_type == "refresh_token"
+
+    cached = token_responses.get(key) if cacheable else None
+    if cached is not None:
+        tokens, seconds_left = cached
+        metrics.count("token_cache_hits")
+        log.debug("Token response cache hit", grant_type=grant_type)
+        return dict(tokens, expires_in=seconds_left)
+
+    def call_token_endpoint():
+        auth_string = f"{COGNITO_CLIENT_ID}:{COGNITO_CLIENT_SECRET}"
+        auth_header = base64.b64encode(auth_string.encode()).decode()
+
+        with metrics.phase("downstream"):
+            resp = http_pool.request("POST", f"{COGNITO_DOMAIN}/oauth2/token",
+                                     body=urllib.parse.urlencode(params).encode("utf-8"), headers={
+                "Content-Type": "application/x-www-form-urlencoded",
+                "Authorization": f"Basic {auth_header}"
+            })
+            resp_body = resp.text()
+        log.debug("Cognito response", status=resp.status)
+
+        if resp.status >= 400:
+            raise TokenEndpointError(resp.status, resp_body)
+
+        tokens = json.loads(resp_body)
+        if cacheable:
+            token_responses.set(key, tokens)
+        return tokens
+
+    # Concurrent requests for the same code / refresh token share one call
+    return token_flights.do(key, call_token_endpoint)
+
 # -------------------------
 # CORS helper
 # -------------------------
 def cors_headers():
     return {
         "Access-Control-Allow-Origin": ALLOWED_ORIGIN,
-        "Access-Control-Allow-Headers": "Content-Type,Authorization",
+        "Access-Control-Allow-Headers": "Content-Type,Authorization,If-Match",
+        "Access-Control-Expose-Headers": "ETag",
         "Access-Control-Allow-Methods": "POST,GET,OPTIONS,PUT,DELETE",
         "Content-Type": "application/json"
     }
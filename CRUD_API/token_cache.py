@@ -0,0 +1,99 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# -------------------------
+# Token endpoint de-duplication for proxy_lambda
+# -------------------------
+# - SingleFlight: concurrent exchanges of the same code / refresh token share
+#   one call to the Cognito token endpoint
+# - TokenResponseCache: refresh responses are served from memory for a few
+#   seconds (a burst of refreshes from one session does not go back to
+#   Cognito). The window is short so a revoked refresh token stops working
+#   almost at once. Authorization codes are never cached: a code is single
+#   use, and a replayed code must reach Cognito and be refused.
+
+TOKEN_RESPONSE_CACHE_MAX = int(os.environ.get("TOKEN_RESPONSE_CACHE_MAX", "1000"))
+# Cached tokens are handed out only while they still have this long to live
+TOKEN_EXPIRY_SKEW_SECONDS = int(os.environ.get("TOKEN_EXPIRY_SKEW_SECONDS", "120"))
+# How long one refresh response is reused
+TOKEN_RESPONSE_TTL_SECONDS = float(os.environ.get("TOKEN_RESPONSE_TTL_SECONDS", "5"))
+
+
+def cache_key(grant_type, secret):
+    """Codes and refresh tokens are secrets, only their hash is kept as a key."""
+    return hashlib.sha256(f"{grant_type}:{secret}".encode()).hexdigest()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"done": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+            else:
+                self.shared += 1
+
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+
+
+class TokenResponseCache:
+    def __init__(self, max_items=TOKEN_RESPONSE_CACHE_MAX, skew=TOKEN_EXPIRY_SKEW_SECONDS,
+                 ttl=TOKEN_RESPONSE_TTL_SECONDS):
+        self.max_items = max_items
+        self.skew = skew
+        self.ttl = ttl
+        # key -> (tokens, expires_at, cached_until)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return (tokens, seconds_left) or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                tokens, expires_at, cached_until = entry
+                if cached_until > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return tokens, int(expires_at - now)
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, tokens):
+        now = time.time()
+        expires_at = now + int(tokens.get("expires_in") or 3600)
+        cached_until = min(now + self.ttl, expires_at - self.skew)
+        with self._lock:
+            self._entries[key] = (tokens, expires_at, cached_until)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
@@ -0,0 +1,39 @@
+# OrderCreated events for the analytics Lambda are buffered in SQS, so it is
+# invoked with large batches (one set of S3 objects per batch) instead of
+# once per event.
+resource "aws_sqs_queue" "analytics_dlq" {
+  name = "analytics-consumer-dlq"
+}
+
+resource "aws_sqs_queue" "analytics_buffer" {
+  name                       = "analytics-buffer"
+  visibility_timeout_seconds = 360
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.analytics_dlq.arn
+    maxReceiveCount     = 3
+  })
+}
+
+resource "aws_sqs_queue_policy" "analytics_buffer" {
+  queue_url = aws_sqs_queue.analytics_buffer.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [{
+      Effect    = "Allow"
+      Principal = { Service = "events.amazonaws.com" }
+      Action    = "sqs:SendMessage"
+      Resource  = aws_sqs_queue.analytics_buffer.arn
+      Condition = { ArnEquals = { "aws:SourceArn" = aws_cloudwatch_event_rule.order_created.arn } }
+    }]
+  })
+}
+
+resource "aws_lambda_event_source_mapping" "analytics_buffer" {
+  event_source_arn                   = aws_sqs_queue.analytics_buffer.arn
+  function_name                      = aws_lambda_function.analytics.arn
+  batch_size                         = 1000
+  maximum_batching_window_in_seconds = 60
+  function_response_types            = ["ReportBatchItemFailures"]
+}
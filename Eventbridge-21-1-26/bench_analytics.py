@@ -0,0 +1,231 @@
+"""Benchmark the analytics consumer: one S3 object per event vs batched files.
+
+Feeds --events OrderCreated events (spread over --minutes, crossing midnight
+so two date partitions are written) through analytics.lambda_handler as SQS
+batches of different sizes, against the in-memory S3 stand-in
+(shared_layer/local_aws.py) with a simulated --put-ms per PutObject.
+The per-event baseline writes every event as its own JSON object, the
+obvious replacement for the old print().
+
+Reports PUT requests and stored bytes per 1,000 events and handler time per
+event, then checks that the files hold every event once and that the
+per-minute rollups add up to the events. The same checks run after flushes
+that fail on one date partition: only that partition's messages may come back
+as batchItemFailures, and redelivered in different batches (as SQS does) they
+must still be stored once.
+
+Usage: python bench_analytics.py [--events 5000] [--batch-sizes 10,100,1000] [--put-ms 10]
+       ANALYTICS_FORMAT=parquet python bench_analytics.py   # needs pyarrow
+"""
+import argparse
+import builtins
+import gzip
+import io
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "shared_layer", "python"))
+sys.path.insert(0, os.path.join(HERE, "lambda-function-codes"))
+sys.path.insert(0, os.path.join(HERE, "..", "shared_layer"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import analytics
+from analytics_sink import read_rollups
+from local_aws import LocalS3
+
+
+class SlowS3(LocalS3):
+    """LocalS3 with a fixed delay per PutObject."""
+
+    def __init__(self, put_ms):
+        super().__init__()
+        self.put_delay = put_ms / 1000
+
+    def put_object(self, **kwargs):
+        time.sleep(self.put_delay)
+        return super().put_object(**kwargs)
+
+
+class FlakyS3(SlowS3):
+    """Fails the first `failures` rollup PUTs under `prefix`."""
+
+    def __init__(self, put_ms, prefix, failures):
+        super().__init__(put_ms)
+        self.prefix = prefix
+        self.failures = failures
+
+    def put_object(self, **kwargs):
+        if self.failures and kwargs["Key"].startswith(self.prefix):
+            self.failures -= 1
+            raise ConnectionError("injected PutObject failure")
+        return super().put_object(**kwargs)
+
+
+def make_events(args):
+    rng = random.Random(args.seed)
+    start = datetime(2026, 10, 16, 23, 30, tzinfo=timezone.utc)
+    events = []
+    for i in range(args.events):
+        created = start + timedelta(seconds=rng.uniform(0, args.minutes * 60))
+        items = [{"sku": f"sku-{rng.randint(1, 500):03d}", "quantity": rng.randint(1, 4),
+                  "price": round(rng.uniform(5, 200), 2)} for _ in range(rng.randint(1, 5))]
+        events.append({
+            "version": "0",
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "detail-type": "OrderCreated",
+            "source": "com.mycompany.orders",
+            "time": created.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "detail": {
+                "eventVersion": "1.0",
+                "order": {
+                    "orderId": f"ord-{i:07d}",
+                    "currency": rng.choice(["USD", "USD", "USD", "EUR"]),
+                    "totalAmount": round(sum(item["quantity"] * item["price"] for item in items), 2),
+                    "items": items
+                },
+                "customer": {"userId": f"usr-{rng.randint(1, 5000)}"},
+                "payment": {"method": "CARD", "status": rng.choice(["PAID"] * 9 + ["FAILED"])},
+                "metadata": {"createdAt": created.isoformat(), "correlationId": str(uuid.uuid4())}
+            }
+        })
+    return events
+
+
+def sqs_batch(events):
+    return {"Records": [{"messageId": event["id"], "body": json.dumps(event)} for event in events]}
+
+
+def run_per_event(args, events):
+    s3 = SlowS3(args.put_ms)
+    start = time.perf_counter()
+    for event in events:
+        s3.put_object(Bucket="analytics", Key=f"events/{event['id']}.json", Body=json.dumps(event),
+                      ContentType="application/json")
+    return summary("per-event", None, args, s3, time.perf_counter() - start)
+
+
+def run_batched(args, events, batch_size):
+    s3 = SlowS3(args.put_ms)
+    analytics.sink.s3 = s3
+    start = time.perf_counter()
+    for i in range(0, len(events), batch_size):
+        analytics.lambda_handler(sqs_batch(events[i:i + batch_size]), SimpleNamespace(aws_request_id=str(uuid.uuid4())))
+    return summary(f"batched-{analytics.sink.format}", batch_size, args, s3, time.perf_counter() - start), s3
+
+
+def summary(name, batch_size, args, s3, elapsed):
+    return {
+        "mode": name,
+        "batch_size": batch_size,
+        "puts_per_1000_events": round(s3.put_calls * 1000 / args.events, 2),
+        "stored_bytes_per_event": round(sum(s3.bytes_stored(b) for b in s3.buckets) / args.events, 1),
+        "handler_ms_per_event": round(elapsed * 1000 / args.events, 3)
+    }
+
+
+def verify(s3, events):
+    """Every event once in the data files, and rollups that add up to the events."""
+    sink = analytics.sink
+    bucket = s3.buckets[sink.bucket]
+
+    # Every event exactly once in the data files
+    seen = []
+    for key, obj in bucket.items():
+        if key.startswith(sink.prefix + "/"):
+            if key.endswith(".ndjson.gz"):
+                seen += [json.loads(line)["event_id"] for line in gzip.decompress(obj["Body"]).splitlines()]
+            else:
+                import pyarrow.parquet
+                seen += pyarrow.parquet.read_table(io.BytesIO(obj["Body"])).column("event_id").to_pylist()
+    assert sorted(seen) == sorted(e["id"] for e in events), "data files do not hold every event once"
+
+    # Rollups add up to the events
+    dates = sorted({key.split("dt=")[1][:10] for key in bucket if key.startswith(sink.rollup_prefix + "/")})
+    rollups = {}
+    for date in dates:
+        rollups.update(read_rollups(s3, date, sink.bucket, sink.rollup_prefix))
+    expected = {}
+    for event in events:
+        order = event["detail"]["order"]
+        total = expected.setdefault((event["time"][:16], order["currency"]), {"orders": 0, "revenue_cents": 0})
+        total["orders"] += 1
+        total["revenue_cents"] += round(order["totalAmount"] * 100)
+    assert {k: (v["orders"], round(v["revenue"] * 100)) for k, v in rollups.items()} == \
+           {k: (v["orders"], v["revenue_cents"]) for k, v in expected.items()}, "rollups do not match the events"
+    return dates, rollups
+
+
+def check_partial_failures(args, events, batch_size):
+    """Flushes fail on the second date; its messages come back regrouped and are stored once."""
+    late_date = max(e["time"][:10] for e in events)
+    s3 = FlakyS3(0, f"{analytics.sink.rollup_prefix}/dt={late_date}/", failures=3)
+    analytics.sink.s3 = s3
+    context = SimpleNamespace(aws_request_id=str(uuid.uuid4()))
+
+    returned = []
+    for i in range(0, len(events), batch_size):
+        result = analytics.lambda_handler(sqs_batch(events[i:i + batch_size]), context)
+        returned += [f["itemIdentifier"] for f in result["batchItemFailures"]]
+    by_id = {e["id"]: e for e in events}
+    assert returned and all(by_id[m]["time"][:10] == late_date for m in returned), \
+        "messages whose rows were stored came back"
+
+    # SQS redelivers them in different batches
+    redelivered = [by_id[m] for m in reversed(returned)]
+    step = max(1, batch_size // 3)
+    for i in range(0, len(redelivered), step):
+        result = analytics.lambda_handler(sqs_batch(redelivered[i:i + step]), context)
+        assert not result["batchItemFailures"], result["batchItemFailures"]
+    verify(s3, events)
+    return len(returned)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--minutes", type=int, default=60, help="time span of the events")
+    parser.add_argument("--batch-sizes", default="10,100,1000", help="SQS batch sizes to compare")
+    parser.add_argument("--put-ms", type=float, default=10.0, help="simulated PutObject latency")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    events = make_events(args)
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+
+    # Handler logs would dominate the timings
+    real_print = builtins.print
+    builtins.print = lambda *a, **k: None
+    try:
+        results = [run_per_event(args, events)]
+        for batch_size in batch_sizes:
+            result, s3 = run_batched(args, events, batch_size)
+            results.append(result)
+    finally:
+        builtins.print = real_print
+
+    for result in results:
+        print(json.dumps(result))
+    baseline, best = results[0], results[-1]
+    print(f"📊 {best['mode']} in batches of {best['batch_size']}: {best['puts_per_1000_events']} PUTs per 1,000 events, "
+          f"{best['stored_bytes_per_event']} bytes per event (one object per event: "
+          f"{baseline['puts_per_1000_events']} PUTs, {baseline['stored_bytes_per_event']} bytes)")
+
+    builtins.print = lambda *a, **k: None
+    try:
+        dates, rollups = verify(s3, events)
+        returned = check_partial_failures(args, events, batch_sizes[-1])
+    finally:
+        builtins.print = real_print
+    print(f"✅ {len(events)} events stored once in {len(dates)} date partition(s), {len(rollups)} per-minute "
+          f"rollups match; after failed flushes {returned} messages came back and were stored once in new batches")
+
+
+if __name__ == "__main__":
+    main()
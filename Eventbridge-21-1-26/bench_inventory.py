@@ -0,0 +1,217 @@
+"""Benchmark inventory lookups and reservations for inventory_consumer.
+
+Runs orders of 1 to 500 line items against the in-memory DynamoDB table of
+shared_layer/local_aws.py with a simulated network round trip per call, and
+compares:
+
+  per-item        GetItem + conditional UpdateItem for every SKU (no atomicity
+                  across the order's items)
+  batch           InventoryStore: BatchGetItem (100 keys per call) and one
+                  conditional TransactWriteItems per 99 SKUs plus the order's
+                  reservation marker, no cache
+  batch+cache     the same with the short-TTL stock cache warm
+  snapshot        stock bulk-loaded once per container, transactions only
+
+Prints round trips and milliseconds per order for each line-item count, then
+checks that a short SKU rejects the whole order, that an order of several
+transactions gives back the earlier ones when a later one is cancelled or
+fails, and that a redelivered order (same order ID) takes its stock once.
+Those checks run against moto.
+
+Usage: python bench_inventory.py [--orders 20] [--rtt-ms 4] [--sizes 1,10,50,100,250,500]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "lambda-function-codes"))
+sys.path.insert(0, os.path.join(HERE, "..", "shared_layer"))
+
+from botocore.exceptions import ClientError
+
+from inventory_store import InventoryStore, StockCache
+from local_aws import dynamodb_table
+
+
+class Network:
+    """Sleeps rtt_ms per call and counts the calls (round trips)."""
+
+    def __init__(self, rtt_ms):
+        self.rtt = rtt_ms / 1000
+        self.calls = 0
+
+    def delayed(self, fn):
+        def call(*args, **kwargs):
+            self.calls += 1
+            time.sleep(self.rtt)
+            return fn(*args, **kwargs)
+        return call
+
+
+def make_table(args, network):
+    """(LocalTable, the same table as the handler sees it across the network)"""
+    table = dynamodb_table("inventory", key="sku", backend="memory")
+    table.load({"sku": f"sku-{i:05d}", "available": 10 ** 9} for i in range(args.skus))
+    client = table.meta.client
+    remote = SimpleNamespace(
+        name=table.name,
+        get_item=network.delayed(table.get_item),
+        update_item=network.delayed(table.update_item),
+        meta=SimpleNamespace(client=SimpleNamespace(
+            batch_get_item=network.delayed(client.batch_get_item),
+            transact_write_items=network.delayed(client.transact_write_items)
+        ))
+    )
+    return table, remote
+
+
+def reserve_per_item(table, items):
+    """The previous shape: one read and one conditional write per SKU."""
+    for item in items:
+        table.get_item(Key={"sku": item["sku"]})
+    for item in items:
+        try:
+            table.update_item(
+                Key={"sku": item["sku"]},
+                UpdateExpression="SET #available = #available - :qty",
+                ConditionExpression="#available >= :qty",
+                ExpressionAttributeNames={"#available": "available"},
+                ExpressionAttributeValues={":qty": item["quantity"]}
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            return False
+    return True
+
+
+def run(name, args, size, hot_skus):
+    network = Network(args.rtt_ms)
+    table, remote = make_table(args, network)
+    rng = random.Random(args.seed)
+    orders = [[{"sku": sku, "quantity": rng.randint(1, 3)} for sku in rng.sample(hot_skus, size)]
+              for _ in range(args.orders)]
+
+    store = None
+    if name != "per-item":
+        cache = StockCache(ttl=0 if name == "batch" else 60, max_items=len(hot_skus))
+        snapshot = {sku: item["available"] for sku, item in table.items.items()} if name == "snapshot" else None
+        store = InventoryStore(remote, cache=cache, snapshot=snapshot)
+        if name == "batch+cache":
+            store.get_stock(hot_skus)
+    network.calls = 0
+
+    timings = []
+    for n, items in enumerate(orders):
+        start = time.perf_counter()
+        reserved = reserve_per_item(remote, items) if store is None else store.reserve(items, f"ord-{n}")[0]
+        timings.append((time.perf_counter() - start) * 1000)
+        assert reserved
+    timings.sort()
+    return {
+        "strategy": name,
+        "line_items": size,
+        "round_trips_per_order": round(network.calls / args.orders, 2),
+        "mean_ms": round(statistics.mean(timings), 2),
+        "p99_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 2)
+    }
+
+
+def set_stock(table, sku, available):
+    table.load([{"sku": sku, "available": available}])
+
+
+def check_all_or_nothing():
+    table = dynamodb_table("inventory", key="sku", backend="moto")
+    table.load({"sku": f"sku-{i:03d}", "available": 5} for i in range(250))
+    store = InventoryStore(table, cache=StockCache(ttl=0))
+    items = [{"sku": sku, "quantity": 1} for sku in sorted(table.items)]
+
+    # One short SKU: nothing is reserved
+    set_stock(table, "sku-007", 0)
+    reserved, shortages = store.reserve(items)
+    assert not reserved and [s["sku"] for s in shortages] == ["sku-007"]
+    assert all(item["available"] == 5 for sku, item in table.items.items() if sku != "sku-007")
+
+    # Stock taken between the read and the last transaction: earlier chunks are given back
+    set_stock(table, "sku-007", 5)
+    real_transact = store._transact
+
+    def racing_transact(skus, wanted, sign, marker=None):
+        if sign < 0 and "sku-240" in skus:
+            set_stock(table, "sku-240", 0)
+        return real_transact(skus, wanted, sign, marker)
+    store._transact = racing_transact
+    reserved, shortages = store.reserve(items, "ord-race")
+    assert not reserved and [s["sku"] for s in shortages] == ["sku-240"]
+    assert all(item["available"] == 5 for sku, item in table.items.items() if sku != "sku-240")
+
+    # Any other failure of a later transaction gives back the earlier ones too
+    set_stock(table, "sku-240", 5)
+
+    def failing_transact(skus, wanted, sign, marker=None):
+        if sign < 0 and "sku-240" in skus:
+            raise ConnectionError("injected TransactWriteItems failure")
+        return real_transact(skus, wanted, sign, marker)
+    store._transact = failing_transact
+    try:
+        store.reserve(items, "ord-fail")
+        raise AssertionError("the failure was swallowed")
+    except ConnectionError:
+        pass
+    stored = table.items
+    stock = {sku: item["available"] for sku, item in stored.items() if sku.startswith("sku-")}
+    assert set(stock.values()) == {5} and not [k for k in stored if k.startswith("reservation#")], stock
+
+    # Redelivered order: its stock is taken once, also when what is left looks short
+    store._transact = real_transact
+    all_five = [{"sku": sku, "quantity": 5} for sku in stock]
+    assert store.reserve(all_five, "ord-1") == (True, [])
+    assert store.reserve(all_five, "ord-1") == (True, [])
+    stored = table.items
+    assert all(stored[sku]["available"] == 0 for sku in stock)
+    assert store.reserve(all_five, "ord-2")[0] is False
+    store.release(all_five, "ord-1")
+    store.release(all_five, "ord-1")
+    stored = table.items
+    assert all(stored[sku]["available"] == 5 for sku in stock)
+    print("✅ Out-of-stock orders reserve nothing; multi-transaction orders are compensated on a cancellation "
+          "or an error; a redelivered order takes (and gives back) its stock once")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=20, help="orders per strategy and size")
+    parser.add_argument("--rtt-ms", type=float, default=4.0, help="simulated DynamoDB round trip")
+    parser.add_argument("--sizes", default="1,10,50,100,250,500", help="line items per order")
+    parser.add_argument("--skus", type=int, default=20000, help="SKUs in the table")
+    parser.add_argument("--hot-skus", type=int, default=1000, help="SKUs the orders draw from")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    hot_skus = [f"sku-{i:05d}" for i in range(min(args.hot_skus, args.skus))]
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        for name in ("per-item", "batch", "batch+cache", "snapshot"):
+            result = run(name, args, size, hot_skus)
+            results.append(result)
+            print(json.dumps(result))
+
+    for size in sorted({r["line_items"] for r in results}):
+        rows = {r["strategy"]: r for r in results if r["line_items"] == size}
+        print(f"📦 {size:>3} line items: per-item {rows['per-item']['mean_ms']} ms "
+              f"({rows['per-item']['round_trips_per_order']} calls) -> batch {rows['batch']['mean_ms']} ms "
+              f"({rows['batch']['round_trips_per_order']} calls), cached {rows['batch+cache']['mean_ms']} ms, "
+              f"snapshot {rows['snapshot']['mean_ms']} ms")
+
+    check_all_or_nothing()
+
+
+if __name__ == "__main__":
+    main()
@@ -29,4 +29,10 @@ resource "aws_cloudwatch_event_target" "refund_target" {
   dead_letter_config {
     arn = aws_sqs_queue.refund_dlq.arn
   }
+}
+
+resource "aws_cloudwatch_event_target" "analytics_target" {
+  rule           = aws_cloudwatch_event_rule.order_created.name
+  event_bus_name = aws_cloudwatch_event_bus.ecommerce.name
+  arn            = aws_sqs_queue.analytics_buffer.arn
 }
\ No newline at end of file
@@ -1,18 +1,77 @@
 import json
+import os
 
+import aws_clients
+from analytics_sink import AnalyticsSink
+from lambda_metrics import Metrics
+
+# Point at MinIO / moto server for local testing, e.g. http://localhost:9000
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL") or None
+
+# Built on first use: batches with only malformed records never import boto3
+s3 = aws_clients.lazy_client("s3", endpoint_url=S3_ENDPOINT_URL)
+metrics = Metrics("analytics")
+sink = AnalyticsSink(s3, metrics=metrics)
+
+
+# ----------------- Helper Functions -----------------
+
+def unpack(event):
+    """(SQS message ID or None, EventBridge event) for an SQS batch or a single EventBridge invocation."""
+    if "Records" in event:
+        for record in event["Records"]:
+            yield record["messageId"], record["body"]
+    else:
+        yield None, event
+
+
+@metrics.instrument
 def lambda_handler(event, context):
     print("Analytics service invoked")
 
-    detail = event["detail"]
+    records = list(unpack(event))
+    failures = []
+    added = []
+    keys = []
+    try:
+        for message_id, bus_event in records:
+            if message_id is None:
+                full = sink.add(bus_event)
+            else:
+                try:
+                    full = sink.add(json.loads(bus_event), message_id)
+                except (ValueError, KeyError, TypeError) as e:
+                    # Malformed message: only this one goes back to the queue (and on to its DLQ)
+                    print(f"⚠️ Skipping analytics record {message_id}: {type(e).__name__}: {e}")
+                    failures.append({"itemIdentifier": message_id})
+                    continue
+            added.append(message_id)
+            if full:
+                with metrics.phase("downstream"):
+                    keys += sink.flush()
 
-    print("Recording analytics event:")
-    print(json.dumps({
-        "eventVersion": detail["eventVersion"],
-        "orderId": detail["order"]["orderId"],
-        "amount": detail["order"]["totalAmount"],
-        "paymentStatus": detail["payment"]["status"]
-    }))
+        # Written before returning, so SQS only deletes messages that are stored
+        with metrics.phase("downstream"):
+            keys += sink.flush()
+    except Exception as e:
+        if "Records" not in event:
+            # EventBridge retries the same event, which gets the same object names
+            sink.discard()
+            raise
+        # SQS regroups redelivered messages into new batches (new object names), so
+        # only the messages whose rows are not stored go back: rows already written
+        # must not be delivered (and counted) again
+        stored = set(added) - sink.unwritten_message_ids()
+        sink.discard()
+        failures = [{"itemIdentifier": message_id} for message_id, _ in records if message_id not in stored]
+        print(f"⚠️ Analytics flush failed ({type(e).__name__}: {e}), returning {len(failures)} message(s) to the queue")
+        metrics.count("analytics_flush_failures")
+        metrics.count("analytics_events", len(stored))
+        return {"status": "analytics partially recorded", "events": len(stored), "objects": keys,
+                "batchItemFailures": failures}
 
-    # Later: S3, DynamoDB, OpenSearch, Redshift
+    recorded = len(added)
+    metrics.count("analytics_events", recorded)
 
-    return {"status": "analytics recorded"}
+    print(f"Recorded {recorded} analytics event(s) in {len(keys)} object(s)")
+    return {"status": "analytics recorded", "events": recorded, "objects": keys, "batchItemFailures": failures}
@@ -0,0 +1,233 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+
+try:
+    # Optional: Parquet output when pyarrow is in the deployment package / a layer
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# -------------------------
+# Batched analytics files for the analytics consumer
+# -------------------------
+# Order events are flattened into rows with a fixed set of columns and
+# buffered per date. flush() writes one object per date partition:
+#
+#   s3://ANALYTICS_BUCKET/orders/dt=2026-10-17/<first minute>-<batch hash>.ndjson.gz   (or .parquet)
+#
+# so Athena / Glue can prune by date. Alongside the rows, per-minute rollups
+# (orders, items, revenue per currency) are kept while buffering and written
+# as one small JSON object per date and flush:
+#
+#   s3://ANALYTICS_BUCKET/rollups/dt=2026-10-17/<first minute>-<batch hash>.json
+#
+# Dashboards sum the rollup objects (read_rollups) instead of scanning every
+# event. Object names hash the event IDs they hold: writing the same events
+# again (an EventBridge retry of one event) replaces the same objects. SQS
+# regroups redelivered messages into new batches, which would get new names,
+# so rows must never be delivered again once written: each buffered row keeps
+# its SQS message ID, and after a failed flush only the messages of the
+# partitions still buffered are handed back (unwritten_message_ids).
+
+ANALYTICS_BUCKET = os.environ.get("ANALYTICS_BUCKET", "ecommerce-analytics-21-1-26")
+ANALYTICS_PREFIX = os.environ.get("ANALYTICS_PREFIX", "orders")
+ANALYTICS_ROLLUP_PREFIX = os.environ.get("ANALYTICS_ROLLUP_PREFIX", "rollups")
+# auto (Parquet when pyarrow is installed), parquet or ndjson
+ANALYTICS_FORMAT = os.environ.get("ANALYTICS_FORMAT", "auto")
+# Flush early when this many events are buffered
+ANALYTICS_MAX_RECORDS = int(os.environ.get("ANALYTICS_MAX_RECORDS", "50000"))
+ANALYTICS_GZIP_LEVEL = int(os.environ.get("ANALYTICS_GZIP_LEVEL", "6"))
+
+COLUMNS = (
+    "event_id", "event_time", "event_version", "order_id", "user_id",
+    "currency", "amount", "item_count", "payment_method", "payment_status"
+)
+
+
+def resolve_format(fmt=ANALYTICS_FORMAT):
+    if fmt == "auto":
+        return "parquet" if pyarrow is not None else "ndjson"
+    if fmt == "parquet" and pyarrow is None:
+        raise RuntimeError("ANALYTICS_FORMAT=parquet needs pyarrow")
+    if fmt not in ("parquet", "ndjson"):
+        raise ValueError(f"Unknown ANALYTICS_FORMAT {fmt!r}")
+    return fmt
+
+
+def parse_time(value):
+    """EventBridge / ISO-8601 time ('2026-10-17T12:34:56Z') as an aware UTC datetime."""
+    if not value:
+        return datetime.now(timezone.utc)
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def event_row(event):
+    """One flat row per OrderCreated event (the EventBridge envelope with its detail)."""
+    detail = event["detail"]
+    order = detail["order"]
+    payment = detail.get("payment", {})
+    created = parse_time(event.get("time") or detail.get("metadata", {}).get("createdAt"))
+    return {
+        "event_id": event.get("id") or detail.get("metadata", {}).get("correlationId") or order["orderId"],
+        "event_time": created.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "event_version": detail.get("eventVersion"),
+        "order_id": order["orderId"],
+        "user_id": detail.get("customer", {}).get("userId"),
+        "currency": order.get("currency", "USD"),
+        "amount": float(order["totalAmount"]),
+        "item_count": sum(int(item.get("quantity", 1)) for item in order.get("items", [])),
+        "payment_method": payment.get("method"),
+        "payment_status": payment.get("status")
+    }
+
+
+def encode_ndjson(rows):
+    lines = "\n".join(json.dumps(row, separators=(",", ":")) for row in rows) + "\n"
+    return gzip.compress(lines.encode("utf-8"), compresslevel=ANALYTICS_GZIP_LEVEL)
+
+
+def encode_parquet(rows):
+    columns = {name: [row[name] for row in rows] for name in COLUMNS}
+    buffer = io.BytesIO()
+    pyarrow.parquet.write_table(pyarrow.table(columns), buffer, compression="snappy")
+    return buffer.getvalue()
+
+
+FORMATS = {
+    # format -> (extension, content type, encoder); the .gz is stored as is (no Content-Encoding),
+    # so Athena and `aws s3 cp` see the compressed file
+    "ndjson": (".ndjson.gz", "application/gzip", encode_ndjson),
+    "parquet": (".parquet", "application/vnd.apache.parquet", encode_parquet)
+}
+
+
+class AnalyticsSink:
+    def __init__(self, s3, bucket=ANALYTICS_BUCKET, prefix=ANALYTICS_PREFIX, rollup_prefix=ANALYTICS_ROLLUP_PREFIX,
+                 fmt=ANALYTICS_FORMAT, max_records=ANALYTICS_MAX_RECORDS, metrics=None):
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = prefix
+        self.rollup_prefix = rollup_prefix
+        self.format = resolve_format(fmt)
+        self.max_records = max_records
+        self.metrics = metrics
+        # date -> rows
+        self._rows = defaultdict(list)
+        # date -> {(minute, currency): {"orders", "items", "revenue_cents"}}
+        self._rollups = defaultdict(dict)
+        # date -> SQS message IDs of the buffered rows
+        self._messages = defaultdict(list)
+        self._buffered = 0
+        self._lock = threading.Lock()
+        self.objects_written = 0
+        self.bytes_written = 0
+
+    def add(self, event, message_id=None):
+        """Buffer one event; returns True once max_records are buffered (time to flush)."""
+        row = event_row(event)
+        with self._lock:
+            date, minute = row["event_time"][:10], row["event_time"][:16]
+            self._rows[date].append(row)
+            if message_id is not None:
+                self._messages[date].append(message_id)
+            rollup = self._rollups[date].get((minute, row["currency"]))
+            if rollup is None:
+                rollup = self._rollups[date][(minute, row["currency"])] = {"orders": 0, "items": 0, "revenue_cents": 0}
+            rollup["orders"] += 1
+            rollup["items"] += row["item_count"]
+            # Whole cents, so summing many rollups does not drift
+            rollup["revenue_cents"] += round(row["amount"] * 100)
+            self._buffered += 1
+            return self._buffered >= self.max_records
+
+    def flush(self):
+        """Write everything buffered; returns the object keys written.
+
+        A date partition leaves the buffer only once both of its objects are
+        stored, so a failed flush can be retried without losing rows. If its
+        rollup cannot be written, its data object is deleted again, so the
+        rows are not stored twice when they come back in another batch.
+        """
+        extension, content_type, encode = FORMATS[self.format]
+        written = []
+        with self._lock:
+            for date in sorted(self._rows):
+                rows = sorted(self._rows[date], key=lambda r: r["event_time"])
+                batch_id = hashlib.sha1("\n".join(sorted(r["event_id"] for r in rows)).encode()).hexdigest()[:16]
+                name = f"{rows[0]['event_time'][11:16].replace(':', '')}-{batch_id}"
+
+                key = f"{self.prefix}/dt={date}/{name}{extension}"
+                body = encode(rows)
+                self.s3.put_object(Bucket=self.bucket, Key=key, Body=body, ContentType=content_type,
+                                   Metadata={"records": str(len(rows))})
+                self.bytes_written += len(body)
+                written.append(key)
+
+                rollup_key = f"{self.rollup_prefix}/dt={date}/{name}.json"
+                rollups = [
+                    dict(minute=minute, currency=currency, **counts)
+                    for (minute, currency), counts in sorted(self._rollups[date].items())
+                ]
+                rollup_body = json.dumps(rollups, separators=(",", ":")).encode("utf-8")
+                try:
+                    self.s3.put_object(Bucket=self.bucket, Key=rollup_key, Body=rollup_body,
+                                       ContentType="application/json")
+                except Exception:
+                    self.s3.delete_object(Bucket=self.bucket, Key=key)
+                    raise
+                self.bytes_written += len(rollup_body)
+                written.append(rollup_key)
+
+                self._buffered -= len(rows)
+                del self._rows[date]
+                del self._rollups[date]
+                self._messages.pop(date, None)
+                self.objects_written += 2
+                if self.metrics is not None:
+                    self.metrics.count("analytics_records_written", len(rows))
+                    self.metrics.count("analytics_objects_written", 2)
+        return written
+
+    def unwritten_message_ids(self):
+        """SQS message IDs whose rows are still buffered (not stored yet)."""
+        with self._lock:
+            return {message_id for ids in self._messages.values() for message_id in ids}
+
+    def discard(self):
+        """Drop what is buffered (the trigger will deliver those events again)."""
+        with self._lock:
+            self._rows.clear()
+            self._rollups.clear()
+            self._messages.clear()
+            self._buffered = 0
+
+
+def read_rollups(s3, date, bucket=ANALYTICS_BUCKET, rollup_prefix=ANALYTICS_ROLLUP_PREFIX):
+    """{(minute, currency): {"orders", "items", "revenue"}} for one day, summed over all rollup objects."""
+    totals = {}
+    token = None
+    while True:
+        kwargs = {"ContinuationToken": token} if token else {}
+        page = s3.list_objects_v2(Bucket=bucket, Prefix=f"{rollup_prefix}/dt={date}/", **kwargs)
+        for obj in page.get("Contents", []):
+            body = s3.get_object(Bucket=bucket, Key=obj["Key"])["Body"].read()
+            for rollup in json.loads(body):
+                total = totals.setdefault((rollup["minute"], rollup["currency"]),
+                                          {"orders": 0, "items": 0, "revenue_cents": 0})
+                for field in total:
+                    total[field] += rollup[field]
+        if not page.get("IsTruncated"):
+            break
+        token = page["NextContinuationToken"]
+    return {
+        key: {"orders": t["orders"], "items": t["items"], "revenue": t["revenue_cents"] / 100}
+        for key, t in sorted(totals.items())
+    }
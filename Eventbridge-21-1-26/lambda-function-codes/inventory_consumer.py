@@ -1,25 +1,37 @@
-import json
-import boto3
+import os
 from datetime import datetime
-
-eventbridge = boto3.client("events")
-
+import aws_clients
+from event_publisher import EventPublisher
+from inventory_store import INVENTORY_SNAPSHOT_PATH, INVENTORY_TABLE_NAME, InventoryStore, load_snapshot
+from lambda_metrics import Metrics
+
+EVENT_BUS_NAME = os.environ.get("EVENT_BUS_NAME", "ecommerce-bus-21-1-26")
+# Point at DynamoDB Local / moto server for local testing, e.g. http://localhost:8000
+DYNAMODB_ENDPOINT_URL = os.environ.get("DYNAMODB_ENDPOINT_URL") or None
+
+eventbridge = aws_clients.lazy_client("events")
+metrics = Metrics("inventory")
+# InventoryOutOfStock events go out when the handler returns
+publisher = EventPublisher(eventbridge, EVENT_BUS_NAME, metrics=metrics)
+# Module level: the stock cache / snapshot stay warm across invocations
+store = InventoryStore(
+    aws_clients.lazy_table(INVENTORY_TABLE_NAME, endpoint_url=DYNAMODB_ENDPOINT_URL),
+    snapshot=load_snapshot(INVENTORY_SNAPSHOT_PATH) if INVENTORY_SNAPSHOT_PATH else None,
+    metrics=metrics
+)
+
+@metrics.instrument
+@publisher.flush_on_exit
 def lambda_handler(event, context):
     detail = event["detail"]
     order = detail["order"]
 
-    out_of_stock_items = []
+    # One lookup for all SKUs, then one conditional transaction per 99 SKUs plus the
+    # order's reservation marker (a redelivered order takes no stock twice)
+    with metrics.phase("downstream"):
+        reserved, out_of_stock_items = store.reserve(order["items"], order_id=order["orderId"])
 
-    for item in order["items"]:
-        available = 5  # simulate out of stock
-        if available < item["quantity"]:
-            out_of_stock_items.append({
-                "sku": item["sku"],
-                "requestedQuantity": item["quantity"],
-                "availableQuantity": available
-            })
-
-    if out_of_stock_items:
+    if not reserved:
         failure_event = {
             "eventVersion": "1.0",
             "order": {
@@ -36,19 +48,11 @@ def lambda_handler(event, context):
             }
         }
 
-        eventbridge.put_events(
-            Entries=[
-                {
-                    "Source": "com.mycompany.inventory",
-                    "DetailType": "InventoryOutOfStock",
-                    "Detail": json.dumps(failure_event),
-                    "EventBusName": "ecommerce-bus-21-1-26"
-                }
-            ]
-        )
-
-        print("InventoryOutOfStock event emitted")
+        publisher.put("com.mycompany.inventory", "InventoryOutOfStock", failure_event)
+        metrics.count("out_of_stock")
+
+        print("InventoryOutOfStock event queued")
         return {"status": "out_of_stock"}
 
-    print("Inventory updated successfully")
+    print(f"Stock reserved for {len(order['items'])} line item(s)")
     return {"status": "inventory_ok"}
@@ -0,0 +1,323 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+# -------------------------
+# Stock lookups and reservations for inventory_consumer
+# -------------------------
+# Inventory table: one item per SKU, {"sku": "sku-abc", "available": 42}.
+#
+# - Lookups fetch every SKU of an order at once: BatchGetItem (100 keys per
+#   call), or a snapshot file bulk-loaded once per container
+#   (INVENTORY_SNAPSHOT_PATH, {"sku": available, ...}) for read-mostly setups
+# - Hot SKUs are kept in a short-TTL cache (INVENTORY_CACHE_TTL_SECONDS), so
+#   popular items are not read again for every order. A shortage seen in the
+#   cache is read again before the order is rejected, and the reservation
+#   itself is always checked by DynamoDB
+# - Reservations decrement stock with TransactWriteItems, each decrement
+#   conditional on `available >= quantity`, so an order is reserved entirely
+#   or not at all. Orders over 100 SKUs take several transactions; when a
+#   later one is cancelled or fails, the earlier ones are given back
+#   (compensation)
+# - With an order ID, each transaction also puts a marker item
+#   ({"sku": "reservation#<orderId>#<n>"}) on condition that it does not
+#   exist yet. A redelivered order finds its markers and takes no stock
+#   twice; a give-back deletes the marker in the same transaction, so it is
+#   not applied twice either. Markers carry `expires_at` (enable TTL on it)
+
+INVENTORY_TABLE_NAME = os.environ.get("INVENTORY_TABLE_NAME", "inventory")
+INVENTORY_SNAPSHOT_PATH = os.environ.get("INVENTORY_SNAPSHOT_PATH", "")
+INVENTORY_CACHE_TTL_SECONDS = float(os.environ.get("INVENTORY_CACHE_TTL_SECONDS", "5"))
+INVENTORY_CACHE_MAX_ITEMS = int(os.environ.get("INVENTORY_CACHE_MAX_ITEMS", "5000"))
+INVENTORY_MAX_RETRIES = int(os.environ.get("INVENTORY_MAX_RETRIES", "3"))
+# How long reservation markers are kept (longer than any redelivery)
+INVENTORY_RESERVATION_TTL_SECONDS = int(os.environ.get("INVENTORY_RESERVATION_TTL_SECONDS", str(7 * 24 * 3600)))
+
+BATCH_GET_SIZE = 100
+TRANSACTION_SIZE = 100
+
+
+def load_snapshot(path):
+    """{sku: available} from a JSON object file or NDJSON lines of {"sku", "available"}."""
+    with open(path) as f:
+        text = f.read()
+    if text.lstrip().startswith("{") and "\n{" not in text.strip():
+        return {sku: int(qty) for sku, qty in json.loads(text).items()}
+    snapshot = {}
+    for line in filter(None, (l.strip() for l in text.splitlines())):
+        row = json.loads(line)
+        snapshot[row["sku"]] = int(row["available"])
+    return snapshot
+
+
+def reservation_marker(order_id, index):
+    return f"reservation#{order_id}#{index}"
+
+
+def quantities(items):
+    """{sku: total quantity}; an order may list the same SKU twice."""
+    wanted = {}
+    for item in items:
+        wanted[item["sku"]] = wanted.get(item["sku"], 0) + int(item["quantity"])
+    return wanted
+
+
+class StockCache:
+    """Short-lived {sku: available} entries for hot SKUs, least recently used evicted first."""
+
+    def __init__(self, ttl=INVENTORY_CACHE_TTL_SECONDS, max_items=INVENTORY_CACHE_MAX_ITEMS):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, skus):
+        """(found {sku: available}, missing [sku])"""
+        now = time.monotonic()
+        found, missing = {}, []
+        with self._lock:
+            for sku in skus:
+                entry = self._entries.get(sku)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(sku)
+                    found[sku] = entry[0]
+                else:
+                    missing.append(sku)
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def set_many(self, stock):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for sku, available in stock.items():
+                self._entries[sku] = (available, expires_at)
+                self._entries.move_to_end(sku)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, skus):
+        with self._lock:
+            for sku in skus:
+                self._entries.pop(sku, None)
+
+
+class InventoryStore:
+    def __init__(self, table, cache=None, snapshot=None, max_retries=INVENTORY_MAX_RETRIES, metrics=None):
+        self.table = table
+        self.cache = cache if cache is not None else StockCache()
+        # {sku: available}; replaces the BatchGetItem lookups when set
+        self.snapshot = snapshot
+        self.max_retries = max_retries
+        self.metrics = metrics
+
+    def _count(self, name, value=1):
+        if self.metrics is not None:
+            self.metrics.count(name, value)
+
+    def get_stock(self, skus):
+        """{sku: available} for every SKU (0 for unknown SKUs)."""
+        return self._lookup(skus)[0]
+
+    def _lookup(self, skus):
+        """(stock, SKUs whose count came from the cache)"""
+        skus = list(dict.fromkeys(skus))
+        if self.snapshot is not None:
+            return {sku: self.snapshot.get(sku, 0) for sku in skus}, set()
+
+        stock, missing = self.cache.get_many(skus)
+        cached = set(stock)
+        self._count("stock_cache_hits", len(stock))
+        if missing:
+            fetched = self._batch_get(missing)
+            self.cache.set_many(fetched)
+            stock.update(fetched)
+        return stock, cached
+
+    def _chunks(self, wanted, order_id):
+        """[(marker key or None, SKUs)] per transaction; one action is left for the marker."""
+        skus = list(wanted)
+        size = TRANSACTION_SIZE - 1 if order_id is not None else TRANSACTION_SIZE
+        return [
+            (reservation_marker(order_id, index) if order_id is not None else None, skus[start:start + size])
+            for index, start in enumerate(range(0, len(skus), size))
+        ]
+
+    def reserve(self, items, order_id=None):
+        """Take the order's quantities out of stock, all or nothing.
+
+        Returns (reserved, shortages); shortages list the SKUs that were short
+        as {"sku", "requestedQuantity", "availableQuantity"}. With an order ID
+        the reservation happens once, however often the order is delivered.
+        """
+        wanted = quantities(items)
+        chunks = self._chunks(wanted, order_id)
+
+        # Cheap early rejection from the cache / snapshot / one BatchGetItem
+        stock, cached = self._lookup(wanted)
+        short = [sku for sku, qty in wanted.items() if stock[sku] < qty]
+        stale = [sku for sku in short if sku in cached]
+        if stale:
+            # Restocked since it was cached?
+            fresh = self._batch_get(stale)
+            self.cache.set_many(fresh)
+            stock.update(fresh)
+            short = [sku for sku, qty in wanted.items() if stock[sku] < qty]
+        # Stock this order already took on an earlier delivery looks short too:
+        # the transactions below sort that out
+        if short and not (order_id is not None and self._existing_markers([m for m, _ in chunks])):
+            return False, [
+                {"sku": sku, "requestedQuantity": wanted[sku], "availableQuantity": stock[sku]}
+                for sku in short
+            ]
+
+        skus = list(wanted)
+        done, failed, redelivered = [], [], False
+        try:
+            for marker, chunk in chunks:
+                applied, failed = self._transact(chunk, wanted, -1, marker)
+                if failed:
+                    break
+                # Not applied: an earlier delivery of this order already took this chunk
+                redelivered = redelivered or not applied
+                done.append((marker, chunk))
+        except Exception:
+            # Throttled / failed: give back what earlier chunks took, then let the delivery be retried
+            self._compensate(done, wanted)
+            self.cache.invalidate(skus)
+            raise
+
+        if failed:
+            # Stock moved since the read: give back what earlier chunks took
+            self._compensate(done, wanted)
+            self.cache.invalidate(skus)
+            fresh = self._batch_get(failed)
+            if self.snapshot is not None:
+                self.snapshot.update(fresh)
+            else:
+                self.cache.set_many(fresh)
+            return False, [
+                {"sku": sku, "requestedQuantity": wanted[sku], "availableQuantity": fresh.get(sku, 0)}
+                for sku in failed
+            ]
+
+        if redelivered:
+            # The counts read above already had this order taken out
+            self._count("reservations_redelivered")
+            self.cache.invalidate(skus)
+            return True, []
+
+        # Keep the cached counts roughly right for the next orders
+        remaining = {sku: stock[sku] - wanted[sku] for sku in skus}
+        if self.snapshot is not None:
+            self.snapshot.update(remaining)
+        else:
+            self.cache.set_many(remaining)
+        self._count("reservations")
+        return True, []
+
+    def release(self, items, order_id=None):
+        """Give an order's quantities back (e.g. after a failed payment).
+
+        With the order ID used to reserve, only reserved chunks are given
+        back, each once.
+        """
+        wanted = quantities(items)
+        self._compensate(self._chunks(wanted, order_id), wanted)
+        self.cache.invalidate(wanted)
+
+    def _compensate(self, chunks, wanted):
+        for marker, chunk in chunks:
+            self._transact(chunk, wanted, 1, marker)
+        self._count("reservations_compensated", int(bool(chunks)))
+
+    def _existing_markers(self, markers):
+        """Reservation markers of `markers` that are stored."""
+        resp = self.table.meta.client.batch_get_item(RequestItems={
+            self.table.name: {"Keys": [{"sku": marker} for marker in markers], "ProjectionExpression": "sku"}
+        })
+        self._count("batch_get_calls")
+        return [item["sku"] for item in resp.get("Responses", {}).get(self.table.name, [])]
+
+    def _batch_get(self, skus):
+        stock = {}
+        client = self.table.meta.client
+        for start in range(0, len(skus), BATCH_GET_SIZE):
+            keys = [{"sku": sku} for sku in skus[start:start + BATCH_GET_SIZE]]
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    time.sleep(0.05 * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+                self._count("batch_get_calls")
+                resp = client.batch_get_item(RequestItems={
+                    self.table.name: {"Keys": keys, "ProjectionExpression": "sku, available"}
+                })
+                for item in resp.get("Responses", {}).get(self.table.name, []):
+                    stock[item["sku"]] = int(item["available"])
+                keys = resp.get("UnprocessedKeys", {}).get(self.table.name, {}).get("Keys", [])
+                if not keys:
+                    break
+            if keys:
+                raise RuntimeError(f"BatchGetItem left {len(keys)} SKUs unprocessed")
+        for sku in skus:
+            stock.setdefault(sku, 0)
+        return stock
+
+    def _transact(self, skus, wanted, sign, marker=None):
+        """One TransactWriteItems of conditional decrements (sign -1) or increments (+1).
+
+        A decrement puts the reservation `marker` (only if absent), an
+        increment deletes it (only if present). Returns (applied, failed
+        SKUs): (True, []) when the transaction went through, (False, []) when
+        the marker says it was already applied (or given back). Cancellations
+        for other reasons (a concurrent transaction on the same SKU,
+        throttling) are retried with backoff.
+        """
+        transact_items = []
+        for sku in skus:
+            update = {
+                "TableName": self.table.name,
+                "Key": {"sku": sku},
+                "UpdateExpression": f"SET #available = #available {'-' if sign < 0 else '+'} :qty",
+                "ExpressionAttributeNames": {"#available": "available"},
+                "ExpressionAttributeValues": {":qty": wanted[sku]}
+            }
+            if sign < 0:
+                update["ConditionExpression"] = "#available >= :qty"
+            transact_items.append({"Update": update})
+        if marker is not None:
+            key = {"TableName": self.table.name, "ExpressionAttributeNames": {"#sku": "sku"}}
+            if sign < 0:
+                now = int(time.time())
+                transact_items.append({"Put": dict(key, ConditionExpression="attribute_not_exists(#sku)", Item={
+                    "sku": marker, "reserved_at": now, "expires_at": now + INVENTORY_RESERVATION_TTL_SECONDS
+                })})
+            else:
+                transact_items.append({"Delete": dict(key, ConditionExpression="attribute_exists(#sku)",
+                                                      Key={"sku": marker})})
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(0.05 * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+            self._count("transact_calls")
+            try:
+                # boto3 adds a ClientRequestToken, so its own retries of this call are not applied twice
+                self.table.meta.client.transact_write_items(TransactItems=transact_items)
+                return True, []
+            except Exception as e:
+                response = getattr(e, "response", None) or {}
+                if response.get("Error", {}).get("Code") != "TransactionCanceledException":
+                    raise
+                reasons = response.get("CancellationReasons", [])
+                if marker is not None and len(reasons) > len(skus) and \
+                        reasons[len(skus)].get("Code") == "ConditionalCheckFailed":
+                    return False, []
+                failed = [sku for sku, reason in zip(skus, reasons) if reason.get("Code") == "ConditionalCheckFailed"]
+                if failed:
+                    return False, failed
+                error = e
+        raise error
@@ -1,5 +1,9 @@
 import json
+from lambda_metrics import Metrics
 
+metrics = Metrics("notification")
+
+@metrics.instrument
 def lambda_handler(event, context):
     print("Notification service invoked")
 
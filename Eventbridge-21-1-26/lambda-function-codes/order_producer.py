@@ -1,12 +1,49 @@
-import json
-import boto3
+import os
 import uuid
 from datetime import datetime
+import aws_clients
+from event_publisher import EventPublisher, PublishError
+from lambda_metrics import Metrics
 
-eventbridge = boto3.client("events")
+EVENT_BUS_NAME = os.environ.get("EVENT_BUS_NAME", "ecommerce-bus-21-1-26")
+# Most orders one invocation may emit ({"count": n} in the event)
+MAX_ORDERS_PER_INVOCATION = int(os.environ.get("MAX_ORDERS_PER_INVOCATION", "500"))
 
+eventbridge = aws_clients.lazy_client("events")
+metrics = Metrics("order-producer")
+# Buffers OrderCreated events, up to 10 per PutEvents call
+publisher = EventPublisher(eventbridge, EVENT_BUS_NAME, metrics=metrics)
+
+@metrics.instrument
+@publisher.flush_on_exit
 def lambda_handler(event, context):
-    detail = {
+    count = min(int((event or {}).get("count", 1)), MAX_ORDERS_PER_INVOCATION)
+    order_ids = []
+    calls_before = publisher.put_events_calls
+
+    for _ in range(count):
+        detail = build_order_detail(context)
+        order_ids.append(detail["order"]["orderId"])
+        publisher.put("com.mycompany.orders", "OrderCreated", detail)
+
+    failed = publisher.flush()
+    if failed:
+        # Re-raised so the caller retries (already published orders go out again)
+        raise PublishError(failed)
+
+    return {
+        "statusCode": 200,
+        "body": {
+            "orderIds": order_ids,
+            "published": len(order_ids),
+            "putEventsCalls": publisher.put_events_calls - calls_before
+        }
+    }
+
+# ----------------- Helper Functions -----------------
+
+def build_order_detail(context):
+    return {
         "eventVersion": "1.0",
         "order": {
             "orderId": f"ord-{uuid.uuid4()}",
@@ -32,19 +69,3 @@ def lambda_handler(event, context):
             "correlationId": context.aws_request_id
         }
     }
-
-    response = eventbridge.put_events(
-        Entries=[
-            {
-                "Source": "com.mycompany.orders",
-                "DetailType": "OrderCreated",
-                "Detail": json.dumps(detail),
-                "EventBusName": "ecommerce-bus-21-1-26"
-            }
-        ]
-    )
-
-    return {
-        "statusCode": 200,
-        "body": response
-    }
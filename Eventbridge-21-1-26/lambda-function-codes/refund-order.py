@@ -1,5 +1,9 @@
 import json
+from lambda_metrics import Metrics
 
+metrics = Metrics("refund")
+
+@metrics.instrument
 def lambda_handler(event, context):
     print("Refund service invoked")
 
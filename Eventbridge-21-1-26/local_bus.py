@@ -0,0 +1,661 @@
+"""In-process EventBridge bus for the consumers in lambda-function-codes/.
+
+Loads the rules and targets from the Terraform in eventbridge/ (the
+jsonencode event patterns, targets and their dead_letter_config) and the DLQ
+names from SQS/*_dlq.tf. Each event pattern is compiled once into a matcher
+function, and every matching event is fanned out to the Python handlers on a
+thread pool. A handler that still fails after --max-attempts (like Lambda's
+async invocation: 1 try + 2 retries) sends the event to its target's DLQ.
+Events the handlers publish themselves (inventory_consumer's
+InventoryOutOfStock) go back onto the bus. SQS targets (analytics-buffer)
+invoke the function of their event source mapping with batches of records.
+
+Benchmark: order_producer publishes --events OrderCreated events through the
+bus. Reports per-rule match cost, per-consumer throughput and latency,
+retries and DLQ depth.
+
+Usage: python local_bus.py [--events 2000] [--concurrency 8] [--fail inventory=0.05]
+                           [--max-attempts 3] [--stock N] [--report-json out.json]
+"""
+import argparse
+import builtins
+import importlib.util
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CODE_DIR = os.path.join(HERE, "lambda-function-codes")
+SHARED_LAYER = os.path.join(HERE, "..", "shared_layer", "python")
+# Local DynamoDB / S3 (shared_layer/local_aws.py) for inventory_consumer's stock
+# table and the analytics sink; LOCAL_AWS_BACKEND=moto runs the table in moto
+LOCAL_AWS = os.path.join(HERE, "..", "shared_layer")
+
+# aws_lambda_function resource name in the Terraform -> handler file
+FUNCTION_FILES = {
+    "inventory": "inventory_consumer.py",
+    "notification": "notification_consumer.py",
+    "analytics": "analytics.py",
+    "refund": "refund-order.py",
+}
+
+
+class InjectedFailure(Exception):
+    pass
+
+
+# ----------------- Terraform -----------------
+
+RESOURCE_RE = re.compile(r'resource\s+"([\w-]+)"\s+"([\w-]+)"\s*\{')
+HCL_TOKEN_RE = re.compile(
+    r'\s*(?:(?P<string>"(?:[^"\\]|\\.)*")'
+    r'|(?P<number>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)'
+    r'|(?P<word>[A-Za-z_$][\w$-]*)'
+    r'|(?P<punct>[{}\[\]=:,()]))'
+)
+
+
+def _closing(text, start, open_char="{", close_char="}"):
+    """Index just past the bracket that closes the one at text[start]."""
+    depth = 0
+    i = start
+    while i < len(text):
+        char = text[i]
+        if char == '"':
+            i += 1
+            while text[i] != '"':
+                i += 2 if text[i] == "\\" else 1
+        elif char == open_char:
+            depth += 1
+        elif char == close_char:
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    raise ValueError("Unbalanced brackets in Terraform file")
+
+
+def terraform_resources(folder):
+    """{(type, name): block body} for every resource in the folder's .tf files."""
+    resources = {}
+    for filename in sorted(os.listdir(folder)):
+        if not filename.endswith(".tf"):
+            continue
+        with open(os.path.join(folder, filename)) as f:
+            text = f.read()
+        for match in RESOURCE_RE.finditer(text):
+            end = _closing(text, match.end() - 1)
+            resources[(match.group(1), match.group(2))] = text[match.end():end - 1]
+    return resources
+
+
+def _attribute(body, name):
+    match = re.search(rf'^\s*{re.escape(name)}\s*=\s*(.+?)\s*$', body, re.MULTILINE)
+    if not match:
+        return None
+    value = match.group(1)
+    return json.loads(value) if value.startswith('"') else value
+
+
+def _reference(value, resource_type):
+    """aws_lambda_function.inventory.arn -> inventory"""
+    match = re.match(rf"{resource_type}\.([\w-]+)\.", value or "")
+    return match.group(1) if match else None
+
+
+def parse_hcl_value(text):
+    """An HCL object / list literal (the argument of jsonencode) as Python data."""
+    tokens = [(m.lastgroup, m.group(m.lastgroup)) for m in HCL_TOKEN_RE.finditer(text)]
+    position = 0
+
+    def value():
+        nonlocal position
+        kind, token = tokens[position]
+        position += 1
+        if token == "{":
+            result = {}
+            while tokens[position][1] != "}":
+                key_kind, key = tokens[position]
+                key = json.loads(key) if key_kind == "string" else key
+                if tokens[position + 1][1] not in ("=", ":"):
+                    raise ValueError(f"Expected '=' after {key!r} in event pattern")
+                position += 2
+                result[key] = value()
+                if tokens[position][1] == ",":
+                    position += 1
+            position += 1
+            return result
+        if token == "[":
+            result = []
+            while tokens[position][1] != "]":
+                result.append(value())
+                if tokens[position][1] == ",":
+                    position += 1
+            position += 1
+            return result
+        if kind == "string":
+            return json.loads(token)
+        if kind == "number":
+            return float(token) if any(c in token for c in ".eE") else int(token)
+        if token in ("true", "false", "null"):
+            return {"true": True, "false": False, "null": None}[token]
+        raise ValueError(f"Unsupported expression in event pattern: {token}")
+
+    return value()
+
+
+def event_pattern(body):
+    """The rule's event_pattern: jsonencode({...}), a heredoc or a JSON string."""
+    match = re.search(r'event_pattern\s*=\s*', body)
+    if not match:
+        return None
+    rest = body[match.end():]
+    if rest.startswith("jsonencode("):
+        start = rest.index("(")
+        return parse_hcl_value(rest[start + 1:_closing(rest, start, "(", ")") - 1])
+    heredoc = re.match(r"<<-?(\w+)\n(.*?)\n\s*\1", rest, re.DOTALL)
+    if heredoc:
+        return json.loads(heredoc.group(2))
+    return json.loads(json.loads(rest.splitlines()[0]))
+
+
+def load_terraform(root=HERE):
+    """Rules with their targets and DLQ queue names, as defined in eventbridge/ and SQS/."""
+    resources = terraform_resources(os.path.join(root, "eventbridge"))
+    queues = terraform_resources(os.path.join(root, "SQS"))
+
+    rules = {}
+    for (kind, name), body in resources.items():
+        if kind == "aws_cloudwatch_event_rule":
+            rules[name] = {"name": _attribute(body, "name") or name, "pattern": event_pattern(body), "targets": []}
+    for (kind, name), body in resources.items():
+        if kind != "aws_cloudwatch_event_target":
+            continue
+        rule = rules[_reference(_attribute(body, "rule"), "aws_cloudwatch_event_rule")]
+        dlq = None
+        dead_letter = re.search(r"dead_letter_config\s*\{([^}]*)\}", body)
+        if dead_letter:
+            queue = _reference(_attribute(dead_letter.group(1), "arn"), "aws_sqs_queue")
+            dlq = _attribute(queues.get(("aws_sqs_queue", queue), ""), "name") or queue
+        target = {"name": name, "function": _reference(_attribute(body, "arn"), "aws_lambda_function"),
+                  "dlq": dlq, "batch_size": None}
+        queue = _reference(_attribute(body, "arn"), "aws_sqs_queue")
+        if queue:
+            # SQS target: drained in batches by the Lambda event source mapping in SQS/*.tf
+            for (other_kind, _), mapping in queues.items():
+                if (other_kind == "aws_lambda_event_source_mapping"
+                        and _reference(_attribute(mapping, "event_source_arn"), "aws_sqs_queue") == queue):
+                    target["function"] = _reference(_attribute(mapping, "function_name"), "aws_lambda_function")
+                    target["batch_size"] = int(_attribute(mapping, "batch_size") or 10)
+            redrive = re.search(r"deadLetterTargetArn\s*=\s*aws_sqs_queue\.([\w-]+)\.", queues.get(("aws_sqs_queue", queue), ""))
+            if redrive:
+                target["dlq"] = _attribute(queues.get(("aws_sqs_queue", redrive.group(1)), ""), "name") or redrive.group(1)
+        if target["function"] is None:
+            continue
+        rule["targets"].append(target)
+    return list(rules.values())
+
+
+# ----------------- Pattern Matching -----------------
+
+MISSING = object()
+
+
+def _literal_key(value):
+    # True == 1 in Python, but not in an event pattern
+    return ("bool", value) if isinstance(value, bool) else value
+
+
+def _field_values(event, path):
+    """Values at path; arrays (of values or objects) are searched element by element."""
+    values = [event]
+    for key in path:
+        found = []
+        for value in values:
+            if isinstance(value, list):
+                found.extend(v[key] for v in value if isinstance(v, dict) and key in v)
+            elif isinstance(value, dict) and key in value:
+                found.append(value[key])
+        if not found:
+            return MISSING
+        values = found
+    flat = []
+    for value in values:
+        flat.extend(value) if isinstance(value, list) else flat.append(value)
+    return flat
+
+
+def _numeric(conditions):
+    ops = {"<": float.__lt__, "<=": float.__le__, "=": float.__eq__, ">": float.__gt__, ">=": float.__ge__}
+    pairs = [(ops[conditions[i]], float(conditions[i + 1])) for i in range(0, len(conditions), 2)]
+    return lambda v: (isinstance(v, (int, float)) and not isinstance(v, bool)
+                      and all(op(float(v), bound) for op, bound in pairs))
+
+
+def _operator(name, arg):
+    if name == "prefix":
+        return lambda v: isinstance(v, str) and v.startswith(arg)
+    if name == "suffix":
+        return lambda v: isinstance(v, str) and v.endswith(arg)
+    if name == "equals-ignore-case":
+        lowered = arg.lower()
+        return lambda v: isinstance(v, str) and v.lower() == lowered
+    if name == "numeric":
+        return _numeric(arg)
+    if name == "wildcard":
+        regex = re.compile(".*".join(re.escape(part) for part in arg.split("*")))
+        return lambda v: isinstance(v, str) and regex.fullmatch(v) is not None
+    if name == "anything-but":
+        if isinstance(arg, dict):
+            inner = _operator(*next(iter(arg.items())))
+            return lambda v: not inner(v)
+        excluded = {_literal_key(a) for a in (arg if isinstance(arg, list) else [arg])}
+        return lambda v: _literal_key(v) not in excluded
+    raise ValueError(f"Unsupported event pattern operator: {name}")
+
+
+def _compile_leaf(path, matchers):
+    literals = set()
+    predicates = []
+    exists = None
+    for matcher in matchers:
+        if isinstance(matcher, dict):
+            (name, arg), = matcher.items()
+            if name == "exists":
+                exists = arg
+            else:
+                predicates.append(_operator(name, arg))
+        else:
+            literals.add(_literal_key(matcher))
+
+    if len(path) == 1 and not predicates and exists is None:
+        # The common case (source, detail-type): one dict lookup and a set lookup
+        key = path[0]
+
+        def test(event):
+            value = event.get(key, MISSING)
+            if isinstance(value, list):
+                return any(_literal_key(v) in literals for v in value)
+            return value is not MISSING and _literal_key(value) in literals
+        return test
+
+    def test(event):
+        values = _field_values(event, path)
+        if values is MISSING:
+            return exists is False
+        if exists is True:
+            return True
+        for value in values:
+            if _literal_key(value) in literals or any(p(value) for p in predicates):
+                return True
+        return False
+    return test
+
+
+def _compile_object(pattern, path, checks):
+    for key, value in pattern.items():
+        if key == "$or":
+            alternatives = [_compile_at(p, path) for p in value]
+            checks.append((3, lambda event, alts=alternatives: any(a(event) for a in alts)))
+        elif isinstance(value, dict):
+            _compile_object(value, path + (key,), checks)
+        elif isinstance(value, list):
+            literal_only = all(not isinstance(m, dict) for m in value)
+            cost = (0 if not path else 1) if literal_only else 2
+            checks.append((cost, _compile_leaf(path + (key,), value)))
+        else:
+            raise ValueError(f"Event pattern values must be arrays or objects: {key}")
+
+
+def _compile_at(pattern, path):
+    checks = []
+    _compile_object(pattern, path, checks)
+    # Cheap exact-value checks on top-level fields first, they reject most events
+    tests = tuple(test for _, test in sorted(checks, key=lambda c: c[0]))
+
+    def match(event):
+        for test in tests:
+            if not test(event):
+                return False
+        return True
+    return match
+
+
+def compile_pattern(pattern):
+    """EventBridge event pattern -> function(event) -> bool, built once per rule."""
+    return _compile_at(pattern, ())
+
+
+# ----------------- Bus -----------------
+
+def load_handler(function):
+    path = os.path.join(CODE_DIR, FUNCTION_FILES[function])
+    for folder in (SHARED_LAYER, CODE_DIR):
+        if folder not in sys.path:
+            sys.path.insert(0, folder)
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    spec = importlib.util.spec_from_file_location(os.path.splitext(FUNCTION_FILES[function])[0].replace("-", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class LocalBus:
+    def __init__(self, rules, concurrency=8, max_attempts=3, failure_rates=None, stock=None):
+        self.max_attempts = max_attempts
+        # {sku: available} for handlers with an inventory store
+        self.stock = stock or {}
+        self.pool = ThreadPoolExecutor(max_workers=concurrency)
+        self.failure_rates = failure_rates or {}
+        self.rules = []
+        # Rules whose pattern pins `source` are only evaluated for those sources
+        self._by_source = defaultdict(list)
+        self._any_source = []
+        self.modules = {}
+        self.dlqs = defaultdict(list)
+        # In-memory S3 for handlers with an analytics sink
+        self.s3 = None
+        self.stats = {"events": 0, "unmatched": 0, "deliveries": 0}
+        self._pending = 0
+        self._lock = threading.Condition()
+
+        for rule in rules:
+            compiled = {
+                "name": rule["name"],
+                "match": compile_pattern(rule["pattern"]),
+                "targets": [],
+                "evaluated": 0,
+                "matched": 0,
+                "match_ns": 0
+            }
+            for target in rule["targets"]:
+                module = self.modules.get(target["function"])
+                if module is None:
+                    module = self.modules[target["function"]] = load_handler(target["function"])
+                    self.attach(module)
+                compiled["targets"].append(dict(target, handler=module.lambda_handler, invocations=0, succeeded=0,
+                                                retries=0, dead_lettered=0, durations_ms=[], queued=[]))
+            self.rules.append(compiled)
+            sources = rule["pattern"].get("source")
+            if isinstance(sources, list) and sources and all(isinstance(s, str) for s in sources):
+                for source in sources:
+                    self._by_source[source].append(compiled)
+            else:
+                self._any_source.append(compiled)
+
+    def attach(self, module):
+        """Point a handler module's EventBridge client (and publisher) at this bus."""
+        if hasattr(module, "eventbridge"):
+            module.eventbridge = self
+        if hasattr(module, "publisher"):
+            module.publisher.client = self
+        if hasattr(module, "store"):
+            sys.path.insert(0, LOCAL_AWS)
+            from local_aws import dynamodb_table
+            table = dynamodb_table(module.store.table.name, key="sku")
+            table.load({"sku": sku, "available": qty} for sku, qty in self.stock.items())
+            module.store.table = table
+        if hasattr(module, "sink"):
+            sys.path.insert(0, LOCAL_AWS)
+            from local_aws import LocalS3
+            self.s3 = self.s3 or LocalS3()
+            module.sink.s3 = self.s3
+
+    # The PutEvents call of the events client
+    def put_events(self, Entries, **kwargs):
+        results = []
+        for entry in Entries:
+            event = {
+                "version": "0",
+                "id": str(uuid.uuid4()),
+                "detail-type": entry["DetailType"],
+                "source": entry["Source"],
+                "account": "000000000000",
+                "time": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "region": os.environ.get("AWS_DEFAULT_REGION", "us-east-1"),
+                "resources": entry.get("Resources", []),
+                "detail": json.loads(entry["Detail"])
+            }
+            self.dispatch(event)
+            results.append({"EventId": event["id"]})
+        return {"FailedEntryCount": 0, "Entries": results}
+
+    def dispatch(self, event):
+        candidates = self._by_source.get(event.get("source"), []) + self._any_source
+        matched = False
+        for rule in candidates:
+            start = time.perf_counter_ns()
+            hit = rule["match"](event)
+            elapsed = time.perf_counter_ns() - start
+            with self._lock:
+                rule["evaluated"] += 1
+                rule["match_ns"] += elapsed
+                rule["matched"] += hit
+            if hit:
+                matched = True
+                for target in rule["targets"]:
+                    if target["batch_size"]:
+                        self._enqueue(target, event)
+                        continue
+                    with self._lock:
+                        self._pending += 1
+                    self.pool.submit(self._deliver, target, event)
+        with self._lock:
+            self.stats["events"] += 1
+            self.stats["unmatched"] += not matched
+
+    def _deliver(self, target, event):
+        error = None
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                context = SimpleNamespace(aws_request_id=str(uuid.uuid4()), function_name=target["function"])
+                start = time.perf_counter()
+                try:
+                    if random.random() < self.failure_rates.get(target["function"], 0):
+                        raise InjectedFailure(f"Injected failure in {target['function']}")
+                    target["handler"](event, context)
+                    error = None
+                except Exception as e:
+                    error = e
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                with self._lock:
+                    target["invocations"] += 1
+                    target["durations_ms"].append(elapsed_ms)
+                    target["retries"] += attempt > 1
+                    if error is None:
+                        target["succeeded"] += 1
+                if error is None:
+                    return
+            with self._lock:
+                target["dead_lettered"] += 1
+                self.dlqs[target["dlq"] or f"{target['name']}-dlq"].append({
+                    "event": event,
+                    "error": f"{type(error).__name__}: {error}",
+                    "attempts": self.max_attempts
+                })
+        finally:
+            with self._lock:
+                self.stats["deliveries"] += 1
+                self._pending -= 1
+                self._lock.notify_all()
+
+    def _enqueue(self, target, event, flush=False):
+        """Queue an event for an SQS target; a full batch goes to the handler."""
+        with self._lock:
+            if event is not None:
+                target["queued"].append(event)
+            if not target["queued"] or (len(target["queued"]) < target["batch_size"] and not flush):
+                return
+            batch, target["queued"] = target["queued"][:target["batch_size"]], target["queued"][target["batch_size"]:]
+            self._pending += 1
+        self.pool.submit(self._deliver_batch, target, batch)
+
+    def _deliver_batch(self, target, events):
+        """One SQS-triggered invocation; records in batchItemFailures are tried again, then sent to the DLQ."""
+        records = {str(uuid.uuid4()): event for event in events}
+        error = None
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                context = SimpleNamespace(aws_request_id=str(uuid.uuid4()), function_name=target["function"])
+                batch = {"Records": [{"messageId": message_id, "body": json.dumps(event), "eventSource": "aws:sqs"}
+                                     for message_id, event in records.items()]}
+                start = time.perf_counter()
+                try:
+                    if random.random() < self.failure_rates.get(target["function"], 0):
+                        raise InjectedFailure(f"Injected failure in {target['function']}")
+                    response = target["handler"](batch, context) or {}
+                    failed = {f["itemIdentifier"] for f in response.get("batchItemFailures", [])}
+                    error = RuntimeError(f"{len(failed)} record(s) reported as failed") if failed else None
+                except Exception as e:
+                    failed, error = set(records), e
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                with self._lock:
+                    target["invocations"] += 1
+                    target["durations_ms"].append(elapsed_ms)
+                    target["retries"] += attempt > 1
+                    target["succeeded"] += len(records) - len(failed)
+                records = {message_id: records[message_id] for message_id in failed}
+                if not records:
+                    return
+            with self._lock:
+                target["dead_lettered"] += len(records)
+                self.dlqs[target["dlq"] or f"{target['name']}-dlq"].extend(
+                    {"event": event, "error": f"{type(error).__name__}: {error}", "attempts": self.max_attempts}
+                    for event in records.values()
+                )
+        finally:
+            with self._lock:
+                self.stats["deliveries"] += len(events)
+                self._pending -= 1
+                self._lock.notify_all()
+
+    def drain(self):
+        """Wait until every delivery (including chained events and partly filled SQS batches) is done."""
+        while True:
+            with self._lock:
+                while self._pending:
+                    self._lock.wait()
+            targets = [t for rule in self.rules for t in rule["targets"] if t["queued"]]
+            if not targets:
+                return
+            for target in targets:
+                self._enqueue(target, None, flush=True)
+
+    def close(self):
+        self.drain()
+        self.pool.shutdown()
+
+    def report(self, elapsed):
+        rules = {}
+        consumers = {}
+        for rule in self.rules:
+            rules[rule["name"]] = {
+                "evaluated": rule["evaluated"],
+                "matched": rule["matched"],
+                "skipped_by_source_index": self.stats["events"] - rule["evaluated"],
+                "mean_match_ns": round(rule["match_ns"] / rule["evaluated"]) if rule["evaluated"] else None
+            }
+            for target in rule["targets"]:
+                durations = sorted(target["durations_ms"])
+                consumers[target["name"]] = {
+                    "function": target["function"],
+                    "batch_size": target["batch_size"],
+                    "rule": rule["name"],
+                    "invocations": target["invocations"],
+                    "succeeded": target["succeeded"],
+                    "retries": target["retries"],
+                    "dead_lettered": target["dead_lettered"],
+                    "events_per_s": round(target["succeeded"] / elapsed, 1) if elapsed else None,
+                    # What one handler instance sustains (events per second of handler time)
+                    "events_per_handler_s": round(target["succeeded"] / (sum(durations) / 1000), 1) if sum(durations) else None,
+                    "mean_ms": round(sum(durations) / len(durations), 3) if durations else None,
+                    "p99_ms": round(durations[min(len(durations) - 1, int(len(durations) * 0.99))], 3) if durations else None
+                }
+        return {
+            "events": self.stats["events"],
+            "unmatched_events": self.stats["unmatched"],
+            "deliveries": self.stats["deliveries"],
+            "duration_s": round(elapsed, 3),
+            "rules": rules,
+            "consumers": consumers,
+            "dlq": {name: len(messages) for name, messages in self.dlqs.items()},
+            "s3": {
+                "put_calls": self.s3.put_calls,
+                "objects": sum(len(objects) for objects in self.s3.buckets.values()),
+                "bytes": sum(self.s3.bytes_stored(bucket) for bucket in self.s3.buckets)
+            } if self.s3 else None
+        }
+
+
+# ----------------- Benchmark -----------------
+
+def parse_failure_rates(values):
+    rates = {}
+    for value in values:
+        function, _, rate = value.partition("=")
+        rates[function] = float(rate)
+    return rates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=2000, help="OrderCreated events to publish")
+    parser.add_argument("--producer-batch", type=int, default=10, help="orders per order_producer invocation")
+    parser.add_argument("--concurrency", type=int, default=8, help="handler invocations running at once")
+    parser.add_argument("--max-attempts", type=int, default=3, help="tries per delivery before the DLQ")
+    parser.add_argument("--stock", type=int, default=None,
+                        help="units of order_producer's SKU in stock (default: enough for every order)")
+    parser.add_argument("--fail", action="append", default=[], help="inject failures, FUNCTION=rate (e.g. inventory=0.05)")
+    parser.add_argument("--report-json", help="save the report to this file")
+    args = parser.parse_args()
+
+    rules = load_terraform()
+    # order_producer orders 2 x sku-abc; with less stock the rest turns into InventoryOutOfStock events
+    stock = {"sku-abc": 2 * args.events if args.stock is None else args.stock}
+    bus = LocalBus(rules, args.concurrency, args.max_attempts, parse_failure_rates(args.fail), stock)
+
+    sys.path.insert(0, SHARED_LAYER)
+    spec = importlib.util.spec_from_file_location("order_producer", os.path.join(CODE_DIR, "order_producer.py"))
+    producer = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(producer)
+    bus.attach(producer)
+
+    # The handlers' own logging would drown the report
+    real_print = builtins.print
+    builtins.print = lambda *a, **k: None
+    start = time.perf_counter()
+    try:
+        published = 0
+        while published < args.events:
+            count = min(args.producer_batch, args.events - published)
+            producer.lambda_handler({"count": count}, SimpleNamespace(aws_request_id=str(uuid.uuid4())))
+            published += count
+        bus.close()
+    finally:
+        builtins.print = real_print
+    elapsed = time.perf_counter() - start
+
+    report = bus.report(elapsed)
+    report["events_per_s"] = round(args.events / elapsed, 1)
+    print(f"🚌 {len(rules)} rule(s) from eventbridge/*.tf, {args.events} OrderCreated events, "
+          f"concurrency {args.concurrency}\n")
+    print(json.dumps(report, indent=2))
+    for name, count in report["dlq"].items():
+        sample = bus.dlqs[name][0]["error"]
+        print(f"⚠️  {count} event(s) in {name}, e.g. {sample}")
+    if args.report_json:
+        with open(args.report_json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
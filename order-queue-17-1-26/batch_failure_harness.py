@@ -0,0 +1,148 @@
+"""Feed synthetic SQS batches with injected failures through worker_lambda.
+
+Runs the same workload against a local table (moto by default, --backend
+memory for the in-memory stand-in):
+  - whole-batch: handler raises, SQS redelivers every message of the batch
+  - partial:     handler returns batchItemFailures, only failed messages return
+and reports how many redundant DynamoDB writes partial-batch reporting avoids.
+Both runs pin IDEMPOTENT_WRITES=false, otherwise the worker would skip the
+redelivered orders and there would be no redundant writes to compare. Both
+modes then run again with IDEMPOTENT_WRITES (the worker's default): no
+redundant writes, at the cost of the BatchGetItem dedup lookups (reported
+separately, and included in write_round_trips).
+
+Usage: python batch_failure_harness.py [--orders 500] [--failure-rate 0.05] [--single-writes] [--backend moto]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from collections import deque
+
+# No real AWS access is needed, the table is swapped for a local one
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("PROCESSING_TIME_MIN", "0")
+os.environ.setdefault("PROCESSING_TIME_MAX", "0")
+os.environ.setdefault("BATCH_WRITE_BASE_DELAY", "0")
+# structured_log comes from the shared Lambda layer
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared_layer", "python"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared_layer"))
+
+import worker_lambda
+from local_aws import dynamodb_table
+
+
+def make_message(i):
+    order = {
+        "order_id": str(uuid.uuid4()),
+        "customer_email": f"user{i}@test.com",
+        "items": [{"sku": "BOOK-001", "qty": 1}],
+        "status": "CREATED",
+        "created_at": int(time.time())
+    }
+    return {"messageId": str(uuid.uuid4()), "body": json.dumps(order), "attributes": {"ApproximateReceiveCount": "0"}}
+
+
+def run(mode, messages, failing, batch_size, max_receive_count, idempotent=False, backend="moto"):
+    table = dynamodb_table(backend=backend)
+    for order_id, times in failing.items():
+        table.inject_failures(order_id, times)
+
+    worker_lambda.table = table
+    worker_lambda.REPORT_BATCH_ITEM_FAILURES = mode == "partial"
+    worker_lambda.IDEMPOTENT_WRITES = idempotent
+    # Both runs use the same order IDs, the second must not start with them cached
+    worker_lambda.recently_seen.clear()
+
+    queue = deque(dict(m, attributes=dict(m["attributes"])) for m in messages)
+    invocations = 0
+    dead_lettered = 0
+    start = time.time()
+
+    while queue:
+        batch = [queue.popleft() for _ in range(min(batch_size, len(queue)))]
+        for message in batch:
+            count = int(message["attributes"]["ApproximateReceiveCount"]) + 1
+            message["attributes"]["ApproximateReceiveCount"] = str(count)
+
+        invocations += 1
+        try:
+            result = worker_lambda.lambda_handler({"Records": batch}, None)
+            failed_ids = {f["itemIdentifier"] for f in result["batchItemFailures"]}
+            returned = [m for m in batch if m["messageId"] in failed_ids]
+        except Exception:
+            returned = batch
+
+        for message in returned:
+            if int(message["attributes"]["ApproximateReceiveCount"]) >= max_receive_count:
+                dead_lettered += 1
+            else:
+                queue.append(message)
+
+    return {
+        "mode": mode + (" + idempotent" if idempotent else ""),
+        "invocations": invocations,
+        "write_round_trips": table.round_trips,
+        "dedup_lookups": table.batch_get_calls,
+        "orders_stored": len(table.items),
+        "redundant_writes": table.redundant_writes,
+        "duplicates_skipped": worker_lambda.recently_seen.hits,
+        "dead_lettered": dead_lettered,
+        "duration_s": round(time.time() - start, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="share of orders whose first writes fail")
+    parser.add_argument("--failures-per-order", type=int, default=10,
+                        help="how many write attempts of a failing order fail (the worker retries writes within an invocation)")
+    parser.add_argument("--single-writes", action="store_true", help="use put_item per order instead of BatchWriteItem")
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--max-receive-count", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--backend", choices=("moto", "memory"), default=os.environ.get("LOCAL_AWS_BACKEND") or "moto",
+                        help="DynamoDB table: moto's mock_aws or the in-memory stand-in")
+    args = parser.parse_args()
+
+    worker_lambda.BATCH_WRITES = not args.single_writes
+    random.seed(args.seed)
+    messages = [make_message(i) for i in range(args.orders)]
+    failing = {
+        json.loads(m["body"])["order_id"]: args.failures_per_order
+        for m in messages if random.random() < args.failure_rate
+    }
+
+    # The per-record logs of the worker would drown the report
+    import builtins
+    real_print = builtins.print
+    builtins.print = lambda *a, **k: None
+    try:
+        whole = run("whole-batch", messages, failing, args.batch_size, args.max_receive_count, backend=args.backend)
+        partial = run("partial", messages, failing, args.batch_size, args.max_receive_count, backend=args.backend)
+        idempotent = [run(mode, messages, failing, args.batch_size, args.max_receive_count, idempotent=True,
+                          backend=args.backend)
+                      for mode in ("whole-batch", "partial")]
+    finally:
+        builtins.print = real_print
+
+    print(f"📦 {args.orders} orders, {len(failing)} with injected failures, batch size {args.batch_size}\n")
+    for result in [whole, partial] + idempotent:
+        print(json.dumps(result))
+
+    avoided = whole["redundant_writes"] - partial["redundant_writes"]
+    print(f"\n✅ Partial batch reporting avoided {avoided} redundant writes "
+          f"and {whole['write_round_trips'] - partial['write_round_trips']} DynamoDB round trips "
+          f"({whole['invocations'] - partial['invocations']} fewer invocations, IDEMPOTENT_WRITES=false)")
+    for plain, result in zip((whole, partial), idempotent):
+        print(f"🔁 {plain['mode']} with IDEMPOTENT_WRITES: {plain['redundant_writes']} -> "
+              f"{result['redundant_writes']} redundant writes, {result['dedup_lookups']} BatchGetItem dedup lookups, "
+              f"{plain['write_round_trips']} -> {result['write_round_trips']} round trips in all")
+
+
+if __name__ == "__main__":
+    main()
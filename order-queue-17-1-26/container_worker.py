@@ -0,0 +1,331 @@
+"""Run the SQS order worker as a long-running process (ECS / Fargate, Kubernetes).
+
+Reuses worker_lambda.lambda_handler. Receiver threads long-poll the queue (up
+to 10 messages per call) and hand each batch to a process pool as an SQS
+event; the messages the handler did not report in batchItemFailures are then
+deleted with DeleteMessageBatch. Failed messages are left alone and come back
+after the visibility timeout, as with the Lambda trigger.
+
+While a batch is being processed, its messages' visibility timeout is
+extended (ChangeMessageVisibilityBatch) before it runs out, so a slow order
+is not handed to another consumer halfway through.
+
+SIGTERM / SIGINT stop the receivers; batches already received are finished
+and deleted before the process exits. Keep the ECS stopTimeout / Kubernetes
+terminationGracePeriodSeconds above WAIT_TIME_SECONDS plus the slowest batch.
+
+Usage:
+  ORDER_QUEUE_URL=https://sqs.../order-queue ORDER_TABLE_NAME=orders python container_worker.py
+  python container_worker.py --processes 4 --receivers 8 --metrics-port 9108
+  python container_worker.py --local-orders 2000 --processing-ms 5,20   # in-memory queue / table
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+# structured_log / lambda_metrics come from the shared Lambda layer, local_aws (--local-orders) sits next to it
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared_layer", "python"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared_layer"))
+
+from structured_log import get_logger
+
+QUEUE_URL = os.environ.get("ORDER_QUEUE_URL", "ORDER_QUEUE_URL")  # Replace with your SQS queue URL or use environment variable
+
+# Worker processes running batches (the handler still runs the records of a
+# batch on WORKER_CONCURRENCY threads)
+PROCESSES = int(os.environ.get("PROCESSES", str(os.cpu_count() or 1)))
+# Receiver threads, each one has at most one batch in flight. Twice the
+# processes keeps the pool busy while the other half polls and deletes.
+RECEIVERS = int(os.environ.get("RECEIVERS", str(2 * PROCESSES)))
+
+WAIT_TIME_SECONDS = int(os.environ.get("WAIT_TIME_SECONDS", "20"))
+VISIBILITY_TIMEOUT = int(os.environ.get("VISIBILITY_TIMEOUT", "30"))
+# Extend a message's visibility once fewer than this many seconds are left
+VISIBILITY_MARGIN = int(os.environ.get("VISIBILITY_MARGIN", "10"))
+
+log = get_logger("container-worker")
+
+
+# ----------------- Worker Processes -----------------
+
+worker_lambda = None
+_last_values = {}
+
+
+def init_process(local=False):
+    """Pool initializer: load the handler once per process."""
+    global worker_lambda
+    # The parent decides when to stop, a process always finishes its batch
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    import worker_lambda as module
+    worker_lambda = module
+    # Messages are deleted one by one, so failures must be reported per message
+    worker_lambda.REPORT_BATCH_ITEM_FAILURES = True
+    worker_lambda.metrics.listeners.append(lambda service, values: _last_values.update(values))
+    if local:
+        from local_aws import dynamodb_table
+        worker_lambda.table = dynamodb_table()
+
+
+def run_batch(records):
+    """Runs in a pool process; returns the failed message IDs and the invocation's metrics."""
+    _last_values.clear()
+    result = worker_lambda.lambda_handler({"Records": records}, None)
+    failed = [f["itemIdentifier"] for f in result["batchItemFailures"]]
+    return failed, dict(_last_values)
+
+
+# ----------------- Consumer -----------------
+
+def to_record(message):
+    """ReceiveMessage entry -> the record format of the Lambda SQS event."""
+    return {
+        "messageId": message["MessageId"],
+        "receiptHandle": message["ReceiptHandle"],
+        "body": message["Body"],
+        "attributes": message.get("Attributes", {}),
+        "messageAttributes": {
+            name: {"stringValue": value.get("StringValue"), "dataType": value["DataType"]}
+            for name, value in message.get("MessageAttributes", {}).items()
+        },
+        "eventSource": "aws:sqs"
+    }
+
+
+class ContainerWorker:
+    def __init__(self, sqs, queue_url=QUEUE_URL, processes=PROCESSES, receivers=RECEIVERS,
+                 wait_time=WAIT_TIME_SECONDS, visibility_timeout=VISIBILITY_TIMEOUT,
+                 visibility_margin=VISIBILITY_MARGIN, local=False, on_batch=None):
+        self.sqs = sqs
+        self.queue_url = queue_url
+        self.receivers = receivers
+        self.wait_time = wait_time
+        self.visibility_timeout = visibility_timeout
+        self.visibility_margin = visibility_margin
+        # Called with the worker's metric values after every batch
+        self.on_batch = on_batch
+        self.pool = ProcessPoolExecutor(max_workers=processes, initializer=init_process, initargs=(local,))
+        self.stopping = threading.Event()
+        # receipt handle -> monotonic time the message turns visible again
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "receive_calls": 0,
+            "empty_receives": 0,
+            "batches": 0,
+            "received": 0,
+            "deleted": 0,
+            "failed": 0,
+            "delete_calls": 0,
+            "visibility_extensions": 0
+        }
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.stats[name] += value
+
+    def stop(self, *_):
+        if not self.stopping.is_set():
+            log.info("Stopping, finishing in-flight batches", in_flight=len(self._in_flight))
+        self.stopping.set()
+
+    def receive_loop(self):
+        while not self.stopping.is_set():
+            try:
+                resp = self.sqs.receive_message(
+                    QueueUrl=self.queue_url,
+                    MaxNumberOfMessages=10,
+                    WaitTimeSeconds=self.wait_time,
+                    VisibilityTimeout=self.visibility_timeout,
+                    AttributeNames=["ApproximateReceiveCount", "SentTimestamp"],
+                    MessageAttributeNames=["All"]
+                )
+            except Exception as e:
+                log.exception("ReceiveMessage failed", e)
+                self.stopping.wait(1)
+                continue
+            self._count("receive_calls")
+            messages = resp.get("Messages", [])
+            if not messages:
+                self._count("empty_receives")
+                continue
+            # Already received: processed even when a stop came in meanwhile
+            self.process(messages)
+
+    def process(self, messages):
+        visible_until = time.monotonic() + self.visibility_timeout
+        with self._lock:
+            for m in messages:
+                self._in_flight[m["ReceiptHandle"]] = visible_until
+            self.stats["batches"] += 1
+            self.stats["received"] += len(messages)
+
+        try:
+            failed, values = self.pool.submit(run_batch, [to_record(m) for m in messages]).result()
+        except Exception as e:
+            # Handler crashed (or the process died): the whole batch comes back later
+            log.exception("Batch failed", e, messages=len(messages))
+            failed, values = [m["MessageId"] for m in messages], None
+
+        failed = set(failed)
+        done = [m for m in messages if m["MessageId"] not in failed]
+        with self._lock:
+            for m in messages:
+                self._in_flight.pop(m["ReceiptHandle"], None)
+            self.stats["failed"] += len(failed)
+        self.delete(done)
+        if values and self.on_batch:
+            self.on_batch(values)
+
+    def delete(self, messages):
+        for start in range(0, len(messages), 10):
+            chunk = messages[start:start + 10]
+            entries = [{"Id": str(i), "ReceiptHandle": m["ReceiptHandle"]} for i, m in enumerate(chunk)]
+            try:
+                resp = self.sqs.delete_message_batch(QueueUrl=self.queue_url, Entries=entries)
+            except Exception as e:
+                # Processed but not deleted: redelivered later, the order write is a put so it is harmless
+                log.exception("DeleteMessageBatch failed", e, messages=len(entries))
+                continue
+            self._count("delete_calls")
+            self._count("deleted", len(resp.get("Successful", [])))
+            if resp.get("Failed"):
+                log.warning("Messages not deleted", failed=resp["Failed"])
+
+    def heartbeat_loop(self):
+        """Push back the visibility timeout of messages still being processed."""
+        while not (self.stopping.is_set() and not self._in_flight):
+            now = time.monotonic()
+            with self._lock:
+                due = [h for h, until in self._in_flight.items() if until - now < self.visibility_margin]
+            for start in range(0, len(due), 10):
+                chunk = due[start:start + 10]
+                entries = [{"Id": str(i), "ReceiptHandle": h, "VisibilityTimeout": self.visibility_timeout}
+                           for i, h in enumerate(chunk)]
+                try:
+                    resp = self.sqs.change_message_visibility_batch(QueueUrl=self.queue_url, Entries=entries)
+                except Exception as e:
+                    log.exception("ChangeMessageVisibilityBatch failed", e, messages=len(entries))
+                    continue
+                extended_until = time.monotonic() + self.visibility_timeout
+                with self._lock:
+                    for ok in resp.get("Successful", []):
+                        handle = chunk[int(ok["Id"])]
+                        # Skip batches that finished in the meantime
+                        if handle in self._in_flight:
+                            self._in_flight[handle] = extended_until
+                    self.stats["visibility_extensions"] += len(resp.get("Successful", []))
+                if resp.get("Failed"):
+                    log.warning("Visibility not extended", failed=resp["Failed"])
+            time.sleep(1)
+
+    def run(self):
+        log.info("Container worker started", queue_url=self.queue_url, receivers=self.receivers,
+                 processes=self.pool._max_workers, wait_time_s=self.wait_time,
+                 visibility_timeout_s=self.visibility_timeout)
+        start = time.monotonic()
+        receivers = [threading.Thread(target=self.receive_loop, name=f"receiver-{i}")
+                     for i in range(self.receivers)]
+        heartbeat = threading.Thread(target=self.heartbeat_loop, name="heartbeat", daemon=True)
+        for thread in receivers:
+            thread.start()
+        heartbeat.start()
+
+        # Signal handlers run on the main thread, so it only waits here
+        while not self.stopping.wait(0.5):
+            pass
+        for thread in receivers:
+            thread.join()
+        heartbeat.join()
+        self.pool.shutdown(wait=True)
+
+        self.stats["elapsed_s"] = round(time.monotonic() - start, 3)
+        log.info("Container worker stopped", **self.stats)
+        return self.stats
+
+
+# ----------------- Local Run -----------------
+
+def seed_local_queue(queue, orders):
+    for n in range(orders):
+        body = {
+            "order_id": f"local-{n}",
+            "customer_email": "local@test.com",
+            "items": [{"sku": "BOOK-001", "qty": 1}],
+            "status": "CREATED",
+            "created_at": int(time.time())
+        }
+        queue.send_message(QueueUrl=QUEUE_URL, MessageBody=json.dumps(body))
+
+
+def stop_when_drained(worker, queue):
+    while not worker.stopping.is_set():
+        if not queue.depth and not queue.in_flight:
+            worker.stop()
+        time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queue-url", default=QUEUE_URL)
+    parser.add_argument("--processes", type=int, default=PROCESSES)
+    parser.add_argument("--receivers", type=int, default=None, help="default: RECEIVERS or 2 x processes")
+    parser.add_argument("--wait-time", type=int, default=WAIT_TIME_SECONDS, help="long-poll seconds")
+    parser.add_argument("--visibility-timeout", type=int, default=VISIBILITY_TIMEOUT)
+    parser.add_argument("--visibility-margin", type=int, default=VISIBILITY_MARGIN)
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus /metrics (metrics_exporter.py)")
+    parser.add_argument("--local-orders", type=int, default=0,
+                        help="run against an in-memory queue seeded with this many orders, exit when drained")
+    parser.add_argument("--processing-ms", default=None, help="local runs: simulated per-order work, min,max")
+    args = parser.parse_args()
+
+    if args.receivers is None:
+        args.receivers = int(os.environ.get("RECEIVERS", str(2 * args.processes)))
+    if args.processing_ms:
+        low, _, high = args.processing_ms.partition(",")
+        # Read by worker_lambda when the pool processes import it
+        os.environ["PROCESSING_TIME_MIN"] = str(float(low) / 1000)
+        os.environ["PROCESSING_TIME_MAX"] = str(float(high or low) / 1000)
+
+    on_batch = None
+    if args.metrics_port:
+        import metrics_exporter
+        metrics_exporter.serve(args.metrics_port)
+        on_batch = lambda values: metrics_exporter.registry.record_invocation("worker", values)
+
+    local = args.local_orders > 0
+    if local:
+        from local_aws import LocalQueue
+        sqs = LocalQueue(visibility_timeout=args.visibility_timeout)
+        seed_local_queue(sqs, args.local_orders)
+        # Receivers must notice the stop quickly once the queue is empty
+        args.wait_time = min(args.wait_time, 1)
+    else:
+        import aws_clients
+        # Long polls hold the connection for up to WaitTimeSeconds
+        sqs = aws_clients.client("sqs", read_timeout=args.wait_time + 10)
+
+    worker = ContainerWorker(sqs, args.queue_url, args.processes, args.receivers, args.wait_time,
+                             args.visibility_timeout, args.visibility_margin, local=local, on_batch=on_batch)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+
+    if local:
+        threading.Thread(target=stop_when_drained, args=(worker, sqs), daemon=True).start()
+    stats = worker.run()
+    if local:
+        stats["orders_per_s"] = round(stats["deleted"] / stats["elapsed_s"], 1) if stats["elapsed_s"] else 0
+        stats["redeliveries"] = sqs.redeliveries
+        print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,64 +1,83 @@
 import json
 import uuid
 import time
-import boto3
 import os
+import aws_clients
+from schema import validate_order
+from lambda_metrics import Metrics
+from structured_log import get_logger
 
-sqs = boto3.client("sqs")
-QUEUE_URL = "ORDER_QUEUE_URL"  # Replace with your SQS queue URL or use environment variable
+# Built on first use, so rejected orders never import boto3
+sqs = aws_clients.lazy_client("sqs")
+QUEUE_URL = os.environ.get("ORDER_QUEUE_URL", "ORDER_QUEUE_URL")  # Replace with your SQS queue URL or use environment variable
+
+log = get_logger("ingest")
+metrics = Metrics("ingest")
+
+# Bulk ingest (POST /order/bulk): SendMessageBatch takes at most 10 messages
+# and 256 KB per call
+MAX_BULK_ORDERS = int(os.environ.get("MAX_BULK_ORDERS", "500"))
+SQS_BATCH_SIZE = 10
+SQS_BATCH_MAX_BYTES = 256 * 1024
 
 # Counters for debugging
 total_requests_received = 0
 total_requests_validated = 0
 total_requests_enqueued = 0
 
+@metrics.instrument
 def lambda_handler(event, context):
     global total_requests_received, total_requests_validated, total_requests_enqueued
     
     total_requests_received += 1
-    print("🔍 Received event keys:", list(event.keys()))
+    log.start_invocation(event, context)
+    metrics.count("orders_received")
+    log.debug("Received event", event_keys=list(event.keys()))
 
     # Parse body
-    if "body" in event:
-        body = json.loads(event["body"])
-    else:
-        body = event
-
-    print("📦 Parsed body:", json.dumps(body, indent=2))
-
-    # Validation
-    validation_error = validate_order(body)
-    if validation_error:
-        return error_response(validation_error)
+    with metrics.phase("parse"):
+        if "body" in event:
+            body = json.loads(event["body"])
+        else:
+            body = event
+
+    log.debug("Parsed body", body=body)
+
+    path = event.get("rawPath") or event.get("path") or ""
+    if path.endswith("/bulk") or isinstance(body, list):
+        return handle_bulk_orders(body)
+
+    # Validation (reports every problem, not just the first)
+    with metrics.phase("validate"):
+        validation_errors = validate_order(body)
+    if validation_errors:
+        log.info("Order rejected", errors=validation_errors)
+        metrics.count("orders_rejected")
+        return error_response(validation_errors[0], validation_errors)
 
     total_requests_validated += 1
+    metrics.count("orders_validated")
 
     # Create order
     try:
-        order_id = str(uuid.uuid4())
-
-        order = {
-            "order_id": order_id,
-            "customer_email": body["email"],
-            "items": body["items"],
-            "status": "CREATED",
-            "created_at": int(time.time())
-        }
+        order = build_order(body)
+        order_id = order["order_id"]
 
-        print("📨 Sending order to SQS:", json.dumps(order, indent=2))
+        log.debug("Sending order to SQS", order=order)
 
-        sqs.send_message(
-            QueueUrl=QUEUE_URL,
-            MessageBody=json.dumps(order)
-        )
+        with metrics.phase("downstream"):
+            sqs.send_message(
+                QueueUrl=QUEUE_URL,
+                MessageBody=json.dumps(order),
+                MessageAttributes=correlation_attributes()
+            )
 
         total_requests_enqueued += 1
-        print(f"✅ Order enqueued successfully: {order_id}")
+        metrics.count("orders_enqueued")
+        log.info("Order enqueued", order_id=order_id)
 
-        return {
-            "statusCode": 201,
-            "headers": cors_headers(),
-            "body": json.dumps({
+        with metrics.phase("serialize"):
+            response_body = json.dumps({
                 "message": "Order accepted",
                 "order_id": order_id,
                 "debug": {
@@ -67,10 +86,14 @@ def lambda_handler(event, context):
                     "total_requests_enqueued": total_requests_enqueued
                 }
             })
+        return {
+            "statusCode": 201,
+            "headers": cors_headers(),
+            "body": response_body
         }
 
     except Exception as e:
-        print("❌ SQS Error:", str(e))
+        log.exception("SQS send failed", e)
         return {
             "statusCode": 500,
             "headers": cors_headers(),
@@ -84,32 +107,127 @@ def lambda_handler(event, context):
             })
         }
 
+# ----------------- Bulk Ingest -----------------
+
+def handle_bulk_orders(body):
+    global total_requests_received, total_requests_validated, total_requests_enqueued
+
+    # A bare array or {"orders": [...]}; any other JSON value (string, number, null) is rejected below
+    orders = None
+    if isinstance(body, list):
+        orders = body
+    elif isinstance(body, dict):
+        orders = body.get("orders")
+    if not isinstance(orders, list) or len(orders) == 0:
+        return error_response("Bulk request must be a non-empty array of orders (or {\"orders\": [...]})")
+    if len(orders) > MAX_BULK_ORDERS:
+        return error_response(f"Bulk request cannot contain more than {MAX_BULK_ORDERS} orders")
+
+    # Each order counts as a request for the debug counters
+    total_requests_received += len(orders) - 1
+    metrics.count("orders_received", len(orders) - 1)
+
+    results = []
+    valid = []
+    with metrics.phase("validate"):
+        for index, order_body in enumerate(orders):
+            validation_errors = validate_order(order_body)
+            if validation_errors:
+                results.append({"index": index, "status": "rejected", "error": validation_errors[0], "errors": validation_errors})
+                continue
+            order = build_order(order_body)
+            results.append({"index": index, "status": "accepted", "order_id": order["order_id"]})
+            valid.append((index, order))
+
+    total_requests_validated += len(valid)
+    metrics.count("orders_validated", len(valid))
+
+    with metrics.phase("downstream"):
+        failures = enqueue_orders_in_batches(valid)
+    for index, error in failures.items():
+        results[index] = {"index": index, "status": "rejected", "error": error}
+
+    accepted = sum(1 for r in results if r["status"] == "accepted")
+    total_requests_enqueued += accepted
+    metrics.count("orders_enqueued", accepted)
+    metrics.count("orders_rejected", len(orders) - accepted)
+    log.info("Bulk request enqueued", orders=len(orders), accepted=accepted)
+
+    with metrics.phase("serialize"):
+        response_body = json.dumps({
+            "message": f"{accepted} of {len(orders)} orders accepted",
+            "accepted": accepted,
+            "rejected": len(orders) - accepted,
+            "results": results,
+            "debug": {
+                "total_requests_received": total_requests_received,
+                "total_requests_validated": total_requests_validated,
+                "total_requests_enqueued": total_requests_enqueued
+            }
+        })
+    return {
+        "statusCode": 201 if accepted == len(orders) else 207,
+        "headers": cors_headers(),
+        "body": response_body
+    }
+
+def enqueue_orders_in_batches(indexed_orders):
+    """Send orders with SendMessageBatch, returning {index: error} for the ones SQS did not take."""
+    failures = {}
+    batch = []
+    batch_bytes = 0
+
+    def flush():
+        if not batch:
+            return
+        attributes = correlation_attributes()
+        entries = [{"Id": str(index), "MessageBody": message, "MessageAttributes": attributes} for index, message in batch]
+        try:
+            resp = sqs.send_message_batch(QueueUrl=QUEUE_URL, Entries=entries)
+            for failed in resp.get("Failed", []):
+                failures[int(failed["Id"])] = f"Failed to enqueue order: {failed.get('Code')} {failed.get('Message', '')}".strip()
+        except Exception as e:
+            log.exception("SQS batch send failed", e, batch_size=len(batch))
+            for index, _ in batch:
+                failures[index] = f"Failed to enqueue order: {str(e)}"
+        batch.clear()
+
+    for index, order in indexed_orders:
+        message = json.dumps(order)
+        size = len(message.encode("utf-8"))
+        if len(batch) == SQS_BATCH_SIZE or batch_bytes + size > SQS_BATCH_MAX_BYTES:
+            flush()
+            batch_bytes = 0
+        batch.append((index, message))
+        batch_bytes += size
+    flush()
+
+    return failures
+
 # ----------------- Helper Functions -----------------
 
-def validate_order(body):
-    if "items" not in body:
-        return "Missing 'items' in order"
-    
-    if "email" not in body:
-        return "Missing 'email' in order"
-    
-    if not isinstance(body["items"], list):
-        return "'items' must be an array"
-    
-    if len(body["items"]) == 0:
-        return "'items' array cannot be empty"
-    
-    for i, item in enumerate(body["items"]):
-        if not isinstance(item, dict):
-            return f"Item at index {i} must be an object"
-        if "sku" not in item:
-            return f"Item at index {i} missing 'sku' field"
-        if "qty" not in item:
-            return f"Item at index {i} missing 'qty' field"
-        if not isinstance(item["qty"], int) or item["qty"] <= 0:
-            return f"Item at index {i} has invalid quantity"
-    
-    return None
+def build_order(body):
+    return {
+        "order_id": str(uuid.uuid4()),
+        "customer_email": body["email"],
+        "items": body["items"],
+        "status": "CREATED",
+        "created_at": int(time.time())
+    }
+
+def correlation_attributes():
+    """Carries the request's correlation ID to the worker's logs."""
+    return {"correlation_id": {"DataType": "String", "StringValue": log.correlation_id}}
+
+def error_response(message, errors=None):
+    body = {"error": message}
+    if errors:
+        body["errors"] = errors
+    return {
+        "statusCode": 400,
+        "headers": cors_headers(),
+        "body": json.dumps(body)
+    }
 
 def cors_headers():
     return {
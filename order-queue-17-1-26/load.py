@@ -1,15 +1,44 @@
+"""Open-loop load generator for the order pipeline, CRUD API and auth proxy.
+
+Requests are sent on a fixed arrival schedule whatever the server does (open
+loop), and each latency is measured from the request's *intended* send time,
+so a slow server shows up as latency instead of silently lowering the rate.
+
+Schedules:
+  constant  --rate R for --duration seconds
+  ramp      linear from --start-rate to --end-rate over --duration
+  step      --start-rate, plus --step-rate every --step-every seconds (capped at --end-rate)
+
+Targets:
+  ingest       POST <url> one order per request
+  ingest-bulk  POST <url>/bulk with --orders-per-request orders
+  crud, proxy  GET/POST/PUT on <url>/products mixed by --crud-mix
+               (seeds --products products first; proxy adds --auth-token)
+
+Examples:
+  python local_shim.py --handler ingest_lambda.py --port 8081 --stub-aws --quiet &
+  python load.py --target ingest --url http://127.0.0.1:8081/order --rate 200 --duration 30
+  python load.py --target crud --url http://127.0.0.1:8082 --schedule ramp \\
+      --start-rate 50 --end-rate 500 --duration 60 --report-json crud.json --report-csv crud.csv
+"""
+import argparse
 import asyncio
-import aiohttp
+import csv
+import json
 import random
 import string
 import time
 
+import aiohttp
+
 API_URL = "LAMBDA_TRIGGER_API_URL_HERE"
 
-TOTAL_REQUESTS = 500
-BATCH_SIZE = 50
-DELAY_BETWEEN_BATCHES = 0  # seconds
-CONCURRENCY = 10
+DEFAULT_RATE = 50             # requests per second
+DEFAULT_DURATION = 30         # seconds
+MAX_IN_FLIGHT = 1000          # requests beyond this are dropped, not queued
+REQUEST_TIMEOUT = 10          # seconds
+ORDERS_PER_REQUEST = 10       # ingest-bulk only
+DEFAULT_CRUD_MIX = "get=80,list=5,create=10,update=5"
 
 
 def random_email():
@@ -28,53 +57,357 @@ def generate_order():
     }
 
 
-async def send_order(session, order_id):
+def generate_product(product_id):
+    return {
+        "product_id": product_id,
+        "name": "Load test product",
+        "price": round(random.uniform(1, 100), 2),
+        "currency": "USD",
+        "in_stock": random.random() < 0.8
+    }
+
+
+# ----------------- Latency Histogram -----------------
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of microsecond latencies.
+
+    Values below 2**SUB_BITS are exact; above that every power of two is split
+    into 2**(SUB_BITS-1) buckets, so any recorded value is within ~1.5% of the
+    reported one whatever its magnitude. Buckets are kept sparse.
+    """
+    SUB_BITS = 7
+    SUB_COUNT = 1 << SUB_BITS
+    HALF_COUNT = SUB_COUNT >> 1
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+
+    def bucket(self, value):
+        if value < self.SUB_COUNT:
+            return value
+        shift = value.bit_length() - self.SUB_BITS
+        return self.SUB_COUNT + (shift - 1) * self.HALF_COUNT + ((value >> shift) - self.HALF_COUNT)
+
+    def bucket_upper(self, index):
+        if index < self.SUB_COUNT:
+            return index
+        shift = (index - self.SUB_COUNT) // self.HALF_COUNT + 1
+        mantissa = (index - self.SUB_COUNT) % self.HALF_COUNT + self.HALF_COUNT
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, micros):
+        value = max(0, int(micros))
+        index = self.bucket(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p):
+        if not self.total:
+            return None
+        rank = max(1, -(-self.total * p // 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self.bucket_upper(index), self.max)
+        return self.max
+
+    def summary_ms(self):
+        if not self.total:
+            return {}
+        ms = lambda us: round(us / 1000, 3)
+        return {
+            "min": ms(self.min),
+            "mean": ms(self.sum / self.total),
+            "p50": ms(self.percentile(50)),
+            "p90": ms(self.percentile(90)),
+            "p99": ms(self.percentile(99)),
+            "p999": ms(self.percentile(99.9)),
+            "max": ms(self.max)
+        }
+
+
+# ----------------- Arrival Schedules -----------------
+
+def rate_at(args, t):
+    if args.schedule == "constant":
+        return args.rate
+    if args.schedule == "ramp":
+        return args.start_rate + (args.end_rate - args.start_rate) * min(t / args.duration, 1.0)
+    rate = args.start_rate + args.step_rate * int(t // args.step_every)
+    return min(rate, args.end_rate) if args.end_rate else rate
+
+
+def arrival_offsets(args):
+    """Intended send times in seconds from the start of the run."""
+    t = 0.0
+    while t < args.duration:
+        rate = rate_at(args, t)
+        if rate <= 0:
+            t += 0.01
+            continue
+        yield t
+        gap = 1.0 / rate
+        t += random.expovariate(1.0 / gap) if args.poisson else gap
+
+
+# ----------------- Request Builders -----------------
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - {"get", "list", "create", "update"}
+    if unknown:
+        raise SystemExit(f"Unknown --crud-mix operations: {', '.join(sorted(unknown))}")
+    return list(mix), list(mix.values())
+
+
+class RequestBuilder:
+    def __init__(self, args):
+        self.target = args.target
+        self.url = args.url.rstrip("/")
+        self.orders_per_request = args.orders_per_request
+        self.ops, self.weights = parse_mix(args.crud_mix)
+        self.product_ids = []
+        self.created = 0
+
+    def new_product_id(self):
+        self.created += 1
+        return f"load-{int(time.time())}-{self.created}"
+
+    def next(self):
+        """Return (operation, method, url, json_body)."""
+        if self.target == "ingest":
+            return "order", "POST", self.url, generate_order()
+        if self.target == "ingest-bulk":
+            orders = [generate_order() for _ in range(self.orders_per_request)]
+            return "bulk", "POST", f"{self.url}/bulk", orders
+
+        op = random.choices(self.ops, self.weights)[0]
+        if op in ("get", "update") and not self.product_ids:
+            op = "create"
+        if op == "list":
+            return op, "GET", f"{self.url}/products?limit=50", None
+        if op == "get":
+            return op, "GET", f"{self.url}/products/{random.choice(self.product_ids)}", None
+        if op == "update":
+            product_id = random.choice(self.product_ids)
+            return op, "PUT", f"{self.url}/products/{product_id}", {"price": round(random.uniform(1, 100), 2)}
+        product_id = self.new_product_id()
+        self.product_ids.append(product_id)
+        return op, "POST", f"{self.url}/products", generate_product(product_id)
+
+
+# ----------------- Load Runner -----------------
+
+class Results:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.by_operation = {}
+        self.timeline = {}
+        self.errors = {}
+        self.scheduled = 0
+        self.completed = 0
+        self.ok = 0
+        self.dropped = 0
+        self.last_completion = 0.0
+
+    def second(self, offset, target_rate):
+        bucket = self.timeline.get(int(offset))
+        if bucket is None:
+            bucket = {"target_rate": target_rate, "sent": 0, "ok": 0, "errors": 0, "latency": LatencyHistogram()}
+            self.timeline[int(offset)] = bucket
+        return bucket
+
+    def error(self, kind):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+
+async def send_request(session, results, request, intended, offset, headers):
+    operation, method, url, payload = request
+    bucket = results.timeline[int(offset)]
+    error = None
     try:
-        async with session.post(API_URL, json=generate_order()) as response:
-            text = await response.text()
-            print(f"✅ [{order_id}] {response.status}")
-    except Exception as e:
-        print(f"❌ [{order_id}] Error: {str(e)}")
+        async with session.request(method, url, json=payload, headers=headers) as response:
+            await response.read()
+            if response.status >= 400:
+                error = f"http_{response.status}"
+    except asyncio.TimeoutError:
+        error = "timeout"
+    except aiohttp.ClientError as e:
+        error = type(e).__name__
 
+    # Latency from the intended send time (no coordinated omission)
+    now = time.perf_counter()
+    micros = (now - intended) * 1e6
+    results.latency.record(micros)
+    bucket["latency"].record(micros)
+    results.by_operation.setdefault(operation, LatencyHistogram()).record(micros)
+    results.completed += 1
+    results.last_completion = now
+    if error:
+        results.error(error)
+        bucket["errors"] += 1
+    else:
+        results.ok += 1
+        bucket["ok"] += 1
 
-async def worker(semaphore, session, order_id):
-    async with semaphore:
-        await send_order(session, order_id)
 
+async def seed_products(session, builder, count, headers):
+    for _ in range(count):
+        product_id = builder.new_product_id()
+        async with session.post(f"{builder.url}/products", json=generate_product(product_id), headers=headers) as response:
+            await response.read()
+            if response.status < 400:
+                builder.product_ids.append(product_id)
+    print(f"🌱 Seeded {len(builder.product_ids)}/{count} products")
 
-async def send_batch(session, semaphore, start_id, end_id):
-    tasks = [
-        worker(semaphore, session, i)
-        for i in range(start_id, end_id)
-    ]
-    await asyncio.gather(*tasks)
 
+async def run_load(args):
+    builder = RequestBuilder(args)
+    results = Results()
+    headers = {"Authorization": f"Bearer {args.auth_token}"} if args.auth_token else None
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    connector = aiohttp.TCPConnector(limit=args.max_in_flight)
+    in_flight = set()
 
-async def main():
-    start = time.time()
-    semaphore = asyncio.Semaphore(CONCURRENCY)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        if args.target in ("crud", "proxy") and args.products:
+            await seed_products(session, builder, args.products, headers)
 
-    async with aiohttp.ClientSession() as session:
-        total_batches = TOTAL_REQUESTS // BATCH_SIZE
+        start = time.perf_counter()
+        for offset in arrival_offsets(args):
+            intended = start + offset
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
 
-        for batch_num in range(total_batches):
-            batch_start = batch_num * BATCH_SIZE
-            batch_end = batch_start + BATCH_SIZE
+            results.scheduled += 1
+            bucket = results.second(offset, round(rate_at(args, offset), 2))
+            bucket["sent"] += 1
+            if len(in_flight) >= args.max_in_flight:
+                # Open loop: never wait for a slot, count the request as lost
+                results.dropped += 1
+                results.error("dropped_client_overload")
+                bucket["errors"] += 1
+                continue
 
-            # print(f"\n➡️ Sending batch {batch_num + 1}/{total_batches} "
-            #       f"({batch_start} - {batch_end - 1})")
+            task = asyncio.create_task(send_request(session, results, builder.next(), intended, offset, headers))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
 
-            await send_batch(session, semaphore, batch_start, batch_end)    
+        if in_flight:
+            await asyncio.gather(*in_flight)
 
-            # Wait before next batch if not the last one
-            # if batch_num < total_batches - 1:
-            #     print(f"⏳ Waiting {DELAY_BETWEEN_BATCHES}s before next batch...\n")
-            #     await asyncio.sleep(DELAY_BETWEEN_BATCHES)
+    elapsed = max(results.last_completion, time.perf_counter()) - start
+    return results, elapsed
 
-    duration = time.time() - start
-    print(f"\n🚀 Sent {TOTAL_REQUESTS} orders in {duration:.2f} seconds")
 
+# ----------------- Reports -----------------
 
-if __name__ == "__main__":
-    asyncio.run(main())
+def build_report(args, results, elapsed):
+    report = {
+        "target": args.target,
+        "url": args.url,
+        "schedule": args.schedule,
+        "duration_s": args.duration,
+        "elapsed_s": round(elapsed, 3),
+        "scheduled": results.scheduled,
+        "completed": results.completed,
+        "ok": results.ok,
+        "dropped": results.dropped,
+        "error_count": sum(results.errors.values()),
+        "errors": dict(sorted(results.errors.items(), key=lambda e: -e[1])),
+        "offered_rps": round(results.scheduled / args.duration, 2),
+        "throughput_rps": round(results.completed / elapsed, 2) if elapsed else 0,
+        "ok_rps": round(results.ok / elapsed, 2) if elapsed else 0,
+        "latency_ms": results.latency.summary_ms(),
+        "latency_ms_by_operation": {op: h.summary_ms() for op, h in sorted(results.by_operation.items())}
+    }
+    if args.target == "ingest-bulk":
+        report["orders_per_request"] = args.orders_per_request
+        report["ok_orders_per_s"] = round(report["ok_rps"] * args.orders_per_request, 2)
+    return report
+
+
+def write_timeline_csv(path, results):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["second", "target_rate", "sent", "ok", "errors", "p50_ms", "p90_ms", "p99_ms", "max_ms"])
+        for second in sorted(results.timeline):
+            bucket = results.timeline[second]
+            latency = bucket["latency"].summary_ms()
+            writer.writerow([
+                second, bucket["target_rate"], bucket["sent"], bucket["ok"], bucket["errors"],
+                latency.get("p50", ""), latency.get("p90", ""), latency.get("p99", ""), latency.get("max", "")
+            ])
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["ingest", "ingest-bulk", "crud", "proxy"], default="ingest")
+    parser.add_argument("--url", default=API_URL, help="ingest endpoint, or the API base URL for crud/proxy")
+    parser.add_argument("--schedule", choices=["constant", "ramp", "step"], default="constant")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="requests/s for the constant schedule")
+    parser.add_argument("--start-rate", type=float, default=10)
+    parser.add_argument("--end-rate", type=float, default=0, help="ramp target / step ceiling (0 = no ceiling)")
+    parser.add_argument("--step-rate", type=float, default=10, help="rate added at every step")
+    parser.add_argument("--step-every", type=float, default=5, help="seconds between steps")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="seconds")
+    parser.add_argument("--poisson", action="store_true", help="exponential inter-arrival times instead of even spacing")
+    parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT)
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT, help="per-request timeout in seconds")
+    parser.add_argument("--orders-per-request", type=int, default=ORDERS_PER_REQUEST)
+    parser.add_argument("--crud-mix", default=DEFAULT_CRUD_MIX, help="operation weights for crud/proxy")
+    parser.add_argument("--products", type=int, default=100, help="products to create before a crud/proxy run")
+    parser.add_argument("--auth-token", help="sent as 'Authorization: Bearer <token>'")
+    parser.add_argument("--report-json", help="write the summary report to this file")
+    parser.add_argument("--report-csv", help="write the per-second timeline to this file")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.schedule == "ramp" and not args.end_rate:
+        parser.error("--schedule ramp needs --end-rate")
+    if args.url == API_URL:
+        parser.error("set --url (or API_URL in load.py)")
+    return args
 
+
+def main():
+    args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    print(f"🚀 {args.target} load, {args.schedule} schedule for {args.duration:g}s -> {args.url}")
+    results, elapsed = asyncio.run(run_load(args))
+    report = build_report(args, results, elapsed)
+
+    if args.report_json:
+        with open(args.report_json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.report_csv:
+        write_timeline_csv(args.report_csv, results)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
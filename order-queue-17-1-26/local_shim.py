@@ -0,0 +1,171 @@
+"""Serve any lambda_handler in this repo over local HTTP, API Gateway style.
+
+Each request becomes an API Gateway (REST proxy) event, the handler's response
+dict becomes the HTTP response. Lets load.py drive the ingest, CRUD and proxy
+handlers without deploying them.
+
+Usage:
+  python local_shim.py --handler ingest_lambda.py --port 8081 --stub-aws
+  python local_shim.py --handler ../CRUD_API/crud_lambda.py --port 8082 --stub-aws \\
+      --route "/products/{product_id}"
+  python local_shim.py --handler ../CRUD_API/proxy_lambda.py --port 8083 \\
+      --set CRUD_API_URL=http://127.0.0.1:8082 --claims custom:role=admin
+
+--stub-aws swaps the handler's module-level `sqs` / `table` / `s3` for the in-memory
+stand-ins in shared_layer/local_aws.py (the table runs in moto with
+LOCAL_AWS_BACKEND=moto). --set overrides module-level constants.
+--metrics-port serves the handler's metrics for Prometheus (metrics_exporter.py).
+"""
+import argparse
+import base64
+import importlib.util
+import json
+import os
+import re
+import sys
+import urllib.parse
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SHARED_LAYER = os.path.join(HERE, "..", "shared_layer", "python")
+LOCAL_AWS = os.path.join(HERE, "..", "shared_layer")
+
+
+def load_handler_module(path):
+    path = os.path.abspath(path)
+    # Same import environment as in Lambda: the function's folder plus the shared layer
+    for folder in (SHARED_LAYER, os.path.dirname(path)):
+        if folder not in sys.path:
+            sys.path.insert(0, folder)
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    name = os.path.splitext(os.path.basename(path))[0].replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def stub_aws(module):
+    if LOCAL_AWS not in sys.path:
+        sys.path.insert(0, LOCAL_AWS)
+    from local_aws import LocalQueue, LocalS3, dynamodb_table
+    if hasattr(module, "sqs"):
+        module.sqs = LocalQueue()
+    if hasattr(module, "s3"):
+        module.s3 = LocalS3()
+    if hasattr(module, "table"):
+        key = "product_id" if "product" in module.__name__ or "crud" in module.__name__ else "order_id"
+        module.table = dynamodb_table(name="local-" + module.__name__, key=key)
+
+
+def compile_routes(routes):
+    """'/products/{product_id}' -> regex with named groups for pathParameters."""
+    compiled = []
+    for route in routes:
+        pattern = re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", route)
+        compiled.append(re.compile(f"^{pattern}$"))
+    return compiled
+
+
+def build_event(handler, method, claims):
+    parts = urllib.parse.urlsplit(handler.path)
+    length = int(handler.headers.get("Content-Length") or 0)
+    body = handler.rfile.read(length).decode() if length else None
+
+    path_params = None
+    for route in handler.server.routes:
+        match = route.match(parts.path)
+        if match:
+            path_params = match.groupdict()
+            break
+
+    query = dict(urllib.parse.parse_qsl(parts.query)) or None
+    return {
+        "httpMethod": method,
+        "path": parts.path,
+        "rawPath": parts.path,
+        "rawQueryString": parts.query,
+        "queryStringParameters": query,
+        "pathParameters": path_params,
+        "headers": dict(handler.headers.items()),
+        "body": body,
+        "isBase64Encoded": False,
+        "requestContext": {
+            "requestId": str(uuid.uuid4()),
+            "authorizer": {"jwt": {"claims": claims}}
+        }
+    }
+
+
+class LambdaShim(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _handle(self):
+        event = build_event(self, self.command, self.server.claims)
+        try:
+            result = self.server.lambda_handler(event, None)
+        except Exception as e:
+            # Lambda would report an invocation error, API Gateway turns it into a 502
+            result = {"statusCode": 502, "body": json.dumps({"error": f"Handler raised: {str(e)}"})}
+
+        body = result.get("body") or ""
+        body = base64.b64decode(body) if result.get("isBase64Encoded") else body.encode()
+        self.send_response(result.get("statusCode", 200))
+        for name, value in (result.get("headers") or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_OPTIONS = do_PATCH = _handle
+
+    def log_message(self, *args):
+        if self.server.verbose:
+            super().log_message(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--handler", required=True, help="path to the handler's .py file")
+    parser.add_argument("--function", default="lambda_handler")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--route", action="append", default=[], help="path template for pathParameters")
+    parser.add_argument("--claims", action="append", default=[], help="authorizer claim key=value")
+    parser.add_argument("--set", action="append", default=[], help="override a module constant NAME=value")
+    parser.add_argument("--stub-aws", action="store_true", help="use in-memory SQS / DynamoDB stand-ins")
+    parser.add_argument("--quiet", action="store_true", help="silence the handler's own logging")
+    parser.add_argument("--verbose", action="store_true", help="log every HTTP request")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus /metrics (metrics_exporter.py) on this port")
+    args = parser.parse_args()
+
+    module = load_handler_module(args.handler)
+    if args.stub_aws:
+        stub_aws(module)
+    for assignment in args.set:
+        name, _, value = assignment.partition("=")
+        setattr(module, name, value)
+    if args.metrics_port and hasattr(module, "metrics"):
+        import metrics_exporter
+        metrics_exporter.attach(module.metrics)
+        metrics_exporter.serve(args.metrics_port, args.host)
+
+    server = ThreadingHTTPServer((args.host, args.port), LambdaShim)
+    server.lambda_handler = getattr(module, args.function)
+    server.routes = compile_routes(args.route)
+    server.claims = dict(claim.split("=", 1) for claim in args.claims)
+    server.verbose = args.verbose
+
+    if args.quiet:
+        import builtins
+        builtins.print = lambda *a, **k: None
+        sys.stderr.write(f"Serving {args.handler}:{args.function} on http://{args.host}:{args.port}\n")
+    else:
+        print(f"🚀 Serving {args.handler}:{args.function} on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""Prometheus /metrics endpoint for the order pipeline handlers.
+
+When ingest_lambda / worker_lambda run as long-running processes (local_shim.py,
+a container), this turns each invocation's lambda_metrics record into
+Prometheus counters and histograms and serves them in the text exposition
+format:
+
+  order_pipeline_orders_total{stage="received|validated|rejected|enqueued|processed|failed"}
+  order_pipeline_invocations_total{service}, order_pipeline_errors_total{service},
+  order_pipeline_cold_starts_total{service}
+  order_pipeline_duplicates_total{source="cache|table"}
+  order_pipeline_invocation_duration_seconds{service}   (histogram)
+  order_pipeline_phase_duration_seconds{service,phase}  (histogram)
+
+In a host process:
+  import metrics_exporter
+  metrics_exporter.attach(ingest_lambda.metrics)
+  metrics_exporter.serve(9108)
+
+Standalone demo (drives both handlers with synthetic orders):
+  python metrics_exporter.py --port 9108 --demo
+"""
+import argparse
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds; covers a sub-millisecond validate phase up to a multi-second worker batch
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# lambda_metrics count name -> order stage
+ORDER_STAGES = {
+    "orders_received": "received",
+    "orders_validated": "validated",
+    "orders_rejected": "rejected",
+    "orders_enqueued": "enqueued",
+    "records_processed": "processed",
+    "records_failed": "failed",
+}
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                     for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ("le",)
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self.series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_labels(names, labels + (_number(bound),))} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class PipelineMetrics:
+    """Registry fed by lambda_metrics listeners."""
+
+    def __init__(self):
+        self.orders = Counter("order_pipeline_orders_total", "Orders seen by the pipeline, by stage", ["stage"])
+        self.invocations = Counter("order_pipeline_invocations_total", "Handler invocations", ["service"])
+        self.errors = Counter("order_pipeline_errors_total", "Invocations that raised or returned a 5xx", ["service"])
+        self.cold_starts = Counter("order_pipeline_cold_starts_total", "First invocations of a process", ["service"])
+        self.write_round_trips = Counter("order_pipeline_write_round_trips_total", "DynamoDB calls to store orders, dedup lookups included", ["service"])
+        self.duplicates = Counter("order_pipeline_duplicates_total",
+                                  "Redelivered orders skipped, by where the duplicate was detected", ["source"])
+        self.duration = Histogram("order_pipeline_invocation_duration_seconds", "Handler duration", ["service"])
+        self.phases = Histogram("order_pipeline_phase_duration_seconds", "Time per handler phase within an invocation",
+                                ["service", "phase"])
+        self.metrics = [self.orders, self.invocations, self.errors, self.cold_starts,
+                        self.write_round_trips, self.duplicates, self.duration, self.phases]
+
+    def record_invocation(self, service, values):
+        labels = (service,)
+        for name, value in values.items():
+            stage = ORDER_STAGES.get(name)
+            if stage is not None:
+                if value:
+                    self.orders.inc((stage,), value)
+            elif name == "duration_ms":
+                self.duration.observe(value / 1000, labels)
+            elif name.endswith("_ms"):
+                self.phases.observe(value / 1000, (service, name[:-3]))
+            elif name == "invocations":
+                self.invocations.inc(labels, value)
+            elif name == "errors":
+                self.errors.inc(labels, value)
+            elif name == "cold_start":
+                self.cold_starts.inc(labels, value)
+            elif name == "write_round_trips":
+                self.write_round_trips.inc(labels, value)
+            elif name.startswith("duplicates_"):
+                self.duplicates.inc((name[len("duplicates_"):],), value)
+
+    def expose(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+registry = PipelineMetrics()
+
+
+def attach(handler_metrics, target=registry):
+    """Feed a handler module's lambda_metrics.Metrics into the registry."""
+    handler_metrics.listeners.append(target.record_invocation)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.registry.expose().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port, host="0.0.0.0", target=registry):
+    """Serve /metrics on a daemon thread; returns the server."""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.registry = target
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_demo(interval):
+    """Push synthetic orders through ingest_lambda -> LocalQueue -> worker_lambda forever."""
+    import builtins
+    import json
+    import os
+    import random
+    import sys
+    import time
+
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared_layer", "python"))
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared_layer"))
+    import ingest_lambda
+    import worker_lambda
+    from local_aws import LocalQueue, dynamodb_table
+
+    queue = LocalQueue()
+    ingest_lambda.sqs = queue
+    worker_lambda.table = dynamodb_table()
+    worker_lambda.PROCESSING_TIME_MIN, worker_lambda.PROCESSING_TIME_MAX = 0.001, 0.02
+    attach(ingest_lambda.metrics)
+    attach(worker_lambda.metrics)
+    builtins.print = lambda *a, **k: None
+
+    while True:
+        for _ in range(random.randint(1, 10)):
+            order = {"email": "demo@test.com", "items": [{"sku": "BOOK-001", "qty": random.randint(0, 3)}]}
+            ingest_lambda.lambda_handler({"body": json.dumps(order)}, None)
+        messages = queue.receive_message(QueueUrl="demo", MaxNumberOfMessages=10).get("Messages", [])
+        if messages:
+            records = [{"messageId": m["MessageId"], "body": m["Body"]} for m in messages]
+            worker_lambda.lambda_handler({"Records": records}, None)
+            queue.delete_message_batch(QueueUrl="demo", Entries=[
+                {"Id": str(i), "ReceiptHandle": m["ReceiptHandle"]} for i, m in enumerate(messages)
+            ])
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9108)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--demo", action="store_true", help="generate traffic through the handlers in-process")
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between demo rounds")
+    args = parser.parse_args()
+
+    server = serve(args.port, args.host)
+    print(f"📈 Serving /metrics on http://{args.host}:{args.port}/metrics")
+    if args.demo:
+        run_demo(args.interval)
+    else:
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
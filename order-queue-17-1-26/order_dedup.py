@@ -0,0 +1,58 @@
+import os
+import threading
+from collections import OrderedDict
+
+# -------------------------
+# Duplicate suppression for worker_lambda
+# -------------------------
+# SQS delivers at least once, so the same order can arrive several times.
+# RecentlySeen remembers the order IDs this container stored lately (module
+# level, survives warm invocations) and a redelivered message is skipped
+# before any processing or DynamoDB call. Duplicates that land on another
+# container are caught by the conditional write in worker_lambda.
+
+SEEN_ORDERS_MAX = int(os.environ.get("SEEN_ORDERS_MAX", "10000"))
+
+CONDITIONAL_CHECK_FAILED = "ConditionalCheckFailedException"
+
+
+class RecentlySeen:
+    """Bounded set of keys, least recently used evicted first."""
+
+    def __init__(self, max_items=SEEN_ORDERS_MAX):
+        self.max_items = max_items
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._keys:
+                self._keys.move_to_end(key)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key):
+        with self._lock:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.max_items:
+                self._keys.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+def is_conditional_check_failure(error):
+    """botocore ClientError (or local_aws's in-memory table) for a failed ConditionExpression."""
+    response = getattr(error, "response", None) or {}
+    return response.get("Error", {}).get("Code") == CONDITIONAL_CHECK_FAILED
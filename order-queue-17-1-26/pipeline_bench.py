@@ -0,0 +1,310 @@
+"""End-to-end benchmark of the order pipeline, run in process.
+
+  ingest_lambda -> LocalQueue (SQS) -> event source pollers -> worker_lambda -> LocalTable (DynamoDB)
+
+Orders are posted to the ingest handler on an open-loop schedule (--rate
+orders/s). Pollers play the Lambda SQS event source mapping: each one
+gathers up to --batch-size messages (waiting at most --batch-window seconds),
+invokes the worker handler and deletes what succeeded. Messages that are not
+deleted come back after --visibility-timeout, and move to the dead-letter
+list once they have been received --max-receive-count times.
+
+Reports end-to-end order latency (accepted by ingest -> stored), sustained
+orders/s, redeliveries and the queue depth over time.
+
+Usage: python pipeline_bench.py [--orders 2000] [--rate 500] [--pollers 5] [--batch-size 10]
+                                [--processing-ms 5,20] [--report-json out.json] [--timeline-csv depth.csv]
+"""
+import argparse
+import builtins
+import csv
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# No real AWS access is needed, the clients are swapped for local stand-ins
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+# validate_order comes from the shared Lambda layer, the in-memory stand-ins sit next to it
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared_layer", "python"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared_layer"))
+
+import ingest_lambda
+import worker_lambda
+from local_aws import LocalQueue, LocalTable
+
+QUEUE_URL = "local-order-queue"
+
+
+class TimedTable(LocalTable):
+    """LocalTable that remembers when each order was first stored."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.first_written_at = {}
+
+    def _write(self, item):
+        super()._write(item)
+        self.first_written_at.setdefault(item[self.key], time.monotonic())
+
+
+def generate_order(i):
+    return {"email": f"user{i}@test.com", "items": [{"sku": "BOOK-001", "qty": random.randint(1, 3)}]}
+
+
+def percentiles_ms(values):
+    if not values:
+        return {}
+    values = sorted(values)
+    pick = lambda p: round(values[min(len(values) - 1, math.ceil(len(values) * p / 100) - 1)] * 1000, 3)
+    return {
+        "mean": round(sum(values) / len(values) * 1000, 3),
+        "p50": pick(50),
+        "p90": pick(90),
+        "p99": pick(99),
+        "max": round(values[-1] * 1000, 3)
+    }
+
+
+# ----------------- Ingest Side -----------------
+
+def post_orders(orders, intended, stats):
+    if len(orders) == 1:
+        event = {"httpMethod": "POST", "path": "/order", "body": json.dumps(orders[0])}
+    else:
+        event = {"httpMethod": "POST", "path": "/order/bulk", "body": json.dumps(orders)}
+
+    response = ingest_lambda.lambda_handler(event, None)
+    stats["ingest_latency"].append(time.monotonic() - intended)
+    body = json.loads(response["body"])
+    if len(orders) == 1:
+        accepted = [body["order_id"]] if response["statusCode"] == 201 else []
+    else:
+        accepted = [r["order_id"] for r in body.get("results", []) if r["status"] == "accepted"]
+
+    with stats["lock"]:
+        for order_id in accepted:
+            stats["accepted_at"][order_id] = intended
+        stats["rejected"] += len(orders) - len(accepted)
+
+
+def produce(args, stats):
+    """Open loop: requests are submitted at their scheduled time, never held back."""
+    per_request = args.orders_per_request
+    interval = per_request / args.rate if args.rate else 0
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.ingest_concurrency) as pool:
+        for n, first in enumerate(range(0, args.orders, per_request)):
+            intended = start + n * interval
+            delay = intended - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            orders = [generate_order(i) for i in range(first, min(first + per_request, args.orders))]
+            pool.submit(post_orders, orders, intended if interval else time.monotonic(), stats)
+    stats["ingest_done_at"] = time.monotonic()
+
+
+# ----------------- Event Source Mapping -----------------
+
+def to_record(message):
+    return {
+        "messageId": message["MessageId"],
+        "receiptHandle": message["ReceiptHandle"],
+        "body": message["Body"],
+        "attributes": message["Attributes"],
+        "messageAttributes": {
+            name: {"stringValue": value.get("StringValue"), "dataType": value["DataType"]}
+            for name, value in message.get("MessageAttributes", {}).items()
+        },
+        "eventSource": "aws:sqs"
+    }
+
+
+def receive_batch(queue, args, stop):
+    """Gather up to --batch-size messages, like the event source mapping's batching window."""
+    messages = []
+    window_end = None
+    while len(messages) < args.batch_size and not stop.is_set():
+        now = time.monotonic()
+        if window_end is not None and now >= window_end:
+            break
+        wait = (window_end - now) if window_end is not None else args.poll_wait
+        response = queue.receive_message(
+            QueueUrl=QUEUE_URL,
+            MaxNumberOfMessages=min(10, args.batch_size - len(messages)),
+            VisibilityTimeout=args.visibility_timeout,
+            WaitTimeSeconds=wait,
+            MessageAttributeNames=["All"]
+        )
+        received = response.get("Messages", [])
+        if not received:
+            if messages or window_end is None:
+                break
+            continue
+        messages.extend(received)
+        if window_end is None:
+            window_end = time.monotonic() + args.batch_window
+    return messages
+
+
+def poller(queue, args, stop, stats):
+    while not stop.is_set():
+        messages = receive_batch(queue, args, stop)
+        if not messages:
+            continue
+
+        try:
+            result = worker_lambda.lambda_handler({"Records": [to_record(m) for m in messages]}, None)
+            failed_ids = {f["itemIdentifier"] for f in result["batchItemFailures"]}
+        except Exception:
+            failed_ids = {m["MessageId"] for m in messages}
+
+        # Failed messages are left to reappear after the visibility timeout
+        done = [m for m in messages if m["MessageId"] not in failed_ids]
+        for i in range(0, len(done), 10):
+            queue.delete_message_batch(QueueUrl=QUEUE_URL, Entries=[
+                {"Id": str(n), "ReceiptHandle": m["ReceiptHandle"]} for n, m in enumerate(done[i:i + 10])
+            ])
+
+        with stats["lock"]:
+            stats["invocations"] += 1
+            stats["records"] += len(messages)
+            stats["failed_records"] += len(failed_ids)
+
+
+def sample_queue(queue, table, args, stop, timeline, start):
+    while not stop.wait(args.sample_interval):
+        timeline.append({
+            "t": round(time.monotonic() - start, 3),
+            "visible": queue.depth,
+            "in_flight": queue.in_flight,
+            "stored": len(table.first_written_at)
+        })
+
+
+# ----------------- Run -----------------
+
+def run(args):
+    queue = LocalQueue(visibility_timeout=args.visibility_timeout, max_receive_count=args.max_receive_count)
+    table = TimedTable(name="order-table-local")
+
+    ingest_lambda.sqs = queue
+    ingest_lambda.QUEUE_URL = QUEUE_URL
+    worker_lambda.table = table
+    worker_lambda.WORKER_CONCURRENCY = args.worker_concurrency
+    worker_lambda.PROCESSING_TIME_MIN, worker_lambda.PROCESSING_TIME_MAX = args.processing_ms
+
+    stats = {
+        "lock": threading.Lock(),
+        "accepted_at": {},
+        "ingest_latency": [],
+        "rejected": 0,
+        "invocations": 0,
+        "records": 0,
+        "failed_records": 0,
+        "ingest_done_at": None
+    }
+    timeline = []
+    stop = threading.Event()
+    start = time.monotonic()
+
+    threads = [threading.Thread(target=poller, args=(queue, args, stop, stats), daemon=True)
+               for _ in range(args.pollers)]
+    threads.append(threading.Thread(target=sample_queue, args=(queue, table, args, stop, timeline, start), daemon=True))
+    for thread in threads:
+        thread.start()
+
+    produce(args, stats)
+
+    # Drained once nothing is visible or in flight
+    deadline = time.monotonic() + args.timeout
+    while time.monotonic() < deadline and (queue.depth or queue.in_flight):
+        time.sleep(0.01)
+    drained = not (queue.depth or queue.in_flight)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    end = time.monotonic()
+
+    accepted_at = stats["accepted_at"]
+    written = table.first_written_at
+    e2e = [written[order_id] - t for order_id, t in accepted_at.items() if order_id in written]
+    last_write = max(written.values(), default=end)
+    ingest_elapsed = stats["ingest_done_at"] - start
+
+    report = {
+        "orders": args.orders,
+        "accepted": len(accepted_at),
+        "rejected": stats["rejected"],
+        "stored": len(written),
+        "dead_lettered": len(queue.dead_letters),
+        "drained": drained,
+        "offered_orders_per_s": args.rate or None,
+        "ingest_orders_per_s": round(len(accepted_at) / ingest_elapsed, 2) if ingest_elapsed else None,
+        "sustained_orders_per_s": round(len(written) / (last_write - start), 2) if written else 0,
+        "e2e_latency_ms": percentiles_ms(e2e),
+        "ingest_latency_ms": percentiles_ms(stats["ingest_latency"]),
+        "worker_invocations": stats["invocations"],
+        "avg_batch_size": round(stats["records"] / stats["invocations"], 2) if stats["invocations"] else 0,
+        "failed_records": stats["failed_records"],
+        "redeliveries": queue.redeliveries,
+        "redundant_writes": table.redundant_writes,
+        "sqs_calls": {"send": queue.send_calls, "receive": queue.receive_calls, "delete": queue.delete_calls},
+        "write_round_trips": table.round_trips,
+        "max_queue_depth": max((s["visible"] for s in timeline), default=0),
+        "max_in_flight": max((s["in_flight"] for s in timeline), default=0),
+        "duration_s": round(end - start, 3)
+    }
+    return report, timeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=500, help="orders/s offered to ingest (0 = as fast as possible)")
+    parser.add_argument("--orders-per-request", type=int, default=1, help="> 1 posts to the bulk endpoint")
+    parser.add_argument("--ingest-concurrency", type=int, default=20, help="concurrent ingest invocations")
+    parser.add_argument("--pollers", type=int, default=5, help="concurrent worker invocations (Lambda concurrency)")
+    parser.add_argument("--batch-size", type=int, default=10, help="event source mapping BatchSize")
+    parser.add_argument("--batch-window", type=float, default=0.0, help="MaximumBatchingWindowInSeconds")
+    parser.add_argument("--poll-wait", type=float, default=0.2, help="long-poll wait per receive (seconds)")
+    parser.add_argument("--visibility-timeout", type=float, default=30)
+    parser.add_argument("--max-receive-count", type=int, default=3)
+    parser.add_argument("--worker-concurrency", type=int, default=worker_lambda.WORKER_CONCURRENCY,
+                        help="records processed side by side inside one worker invocation")
+    parser.add_argument("--processing-ms", default="5,20", help="simulated per-order processing time MIN,MAX")
+    parser.add_argument("--sample-interval", type=float, default=0.25, help="queue depth sampling (seconds)")
+    parser.add_argument("--timeout", type=float, default=60, help="max seconds to wait for the queue to drain")
+    parser.add_argument("--report-json", help="write the report, with the queue depth timeline, to this file")
+    parser.add_argument("--timeline-csv", help="write the queue depth timeline to this file")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    low, high = (float(v) / 1000 for v in args.processing_ms.split(","))
+    args.processing_ms = (low, high)
+    random.seed(args.seed)
+
+    # Handler logging would dominate the numbers
+    real_print = builtins.print
+    builtins.print = lambda *a, **k: None
+    try:
+        report, timeline = run(args)
+    finally:
+        builtins.print = real_print
+
+    if args.report_json:
+        with open(args.report_json, "w") as f:
+            json.dump(dict(report, queue_depth_timeline=timeline), f, indent=2)
+    if args.timeline_csv:
+        with open(args.timeline_csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["t", "visible", "in_flight", "stored"])
+            writer.writeheader()
+            writer.writerows(timeline)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
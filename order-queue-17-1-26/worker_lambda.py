@@ -1,59 +1,101 @@
 import json
+import os
 import time
-import boto3
 import random
+from concurrent.futures import ThreadPoolExecutor
+import aws_clients
+from lambda_metrics import Metrics
+from order_dedup import RecentlySeen, is_conditional_check_failure
+from structured_log import get_logger
 
-dynamodb = boto3.resource("dynamodb")
-table = dynamodb.Table("ORDER_TABLE_NAME")  # Replace with your DynamoDB table name
+ORDER_TABLE_NAME = os.environ.get("ORDER_TABLE_NAME", "ORDER_TABLE_NAME")  # Replace with your DynamoDB table name
+# Point at DynamoDB Local / moto server for local testing, e.g. http://localhost:8000
+DYNAMODB_ENDPOINT_URL = os.environ.get("DYNAMODB_ENDPOINT_URL") or None
 
-def lambda_handler(event, context):
-    print("📥 Received SQS event")
-    
-    total_records = len(event["Records"])
-    success_count = 0
-    failure_count = 0
-    processed_order_ids = []
-
-    for idx, record in enumerate(event["Records"], start=1):
-        try:
-            body = json.loads(record["body"])
-            order_id = body.get("order_id", f"unknown-{idx}")
+# Built on first use and shared with every other lazy DynamoDB table of the container
+table = aws_clients.lazy_table(ORDER_TABLE_NAME, endpoint_url=DYNAMODB_ENDPOINT_URL)
 
-            print(f"\n🧾 [{idx}/{total_records}] Processing order_id: {order_id}")
-            print(json.dumps(body, indent=2))
+# Max records of a batch processed at the same time (1 = one after another)
+WORKER_CONCURRENCY = int(os.environ.get("WORKER_CONCURRENCY", "10"))
 
-            # 🔥 Simulate processing time (important for testing)
-            processing_time = random.randint(2, 5)
-            print(f"⏳ Processing order {order_id} for {processing_time}s")
-            time.sleep(processing_time)
+# Return failed message IDs (needs ReportBatchItemFailures on the SQS trigger)
+# instead of raising and having SQS redeliver the whole batch
+REPORT_BATCH_ITEM_FAILURES = os.environ.get("REPORT_BATCH_ITEM_FAILURES", "true").lower() == "true"
+
+# Collect the processed orders of a batch and write them with BatchWriteItem
+# (25 per call) instead of one put_item round trip per order
+BATCH_WRITES = os.environ.get("BATCH_WRITES", "true").lower() == "true"
+BATCH_WRITE_SIZE = 25
+BATCH_WRITE_MAX_RETRIES = int(os.environ.get("BATCH_WRITE_MAX_RETRIES", "5"))
+BATCH_WRITE_BASE_DELAY = float(os.environ.get("BATCH_WRITE_BASE_DELAY", "0.05"))
+
+# Never overwrite a stored order: conditional put_item (attribute_not_exists),
+# or a BatchGetItem lookup before BatchWriteItem, plus the recently_seen LRU
+IDEMPOTENT_WRITES = os.environ.get("IDEMPOTENT_WRITES", "true").lower() == "true"
+BATCH_GET_SIZE = 100
+
+# Simulated processing time range in seconds
+PROCESSING_TIME_MIN = float(os.environ.get("PROCESSING_TIME_MIN", "2"))
+PROCESSING_TIME_MAX = float(os.environ.get("PROCESSING_TIME_MAX", "5"))
+
+log = get_logger("worker")
+metrics = Metrics("worker")
+
+# Order IDs stored by this container, redeliveries are skipped before any work
+recently_seen = RecentlySeen()
+
+@metrics.instrument
+def lambda_handler(event, context):
+    log.start_invocation(event, context)
+    log.debug("Received SQS event")
 
-            item = {
-                "order_id": order_id,
-                "customer_email": body["customer_email"],
-                "items": body["items"],
-                "status": "PROCESSED",
-                "created_at": body["created_at"],
-                "processed_at": int(time.time())
-            }
+    records = event["Records"]
+    total_records = len(records)
+    batch_start = time.time()
 
-            table.put_item(Item=item)
-            success_count += 1
-            processed_order_ids.append(order_id)
+    # Records run side by side, results come back in the original order
+    concurrency = max(1, min(WORKER_CONCURRENCY, total_records))
+    if concurrency == 1:
+        results = [process_record(idx, record, total_records)
+                   for idx, record in enumerate(records, start=1)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(
+                lambda args: process_record(args[0], args[1], total_records),
+                enumerate(records, start=1)
+            ))
 
-            print(f"✅ Order {order_id} saved to DynamoDB")
+    if BATCH_WRITES:
+        with metrics.phase("downstream"):
+            round_trips = write_orders_in_batches([r for r in results if r["status"] == "READY"])
+        metrics.count("write_round_trips", round_trips)
 
-        except Exception as e:
-            failure_count += 1
-            print(f"❌ Failed to process message [{order_id}]: {str(e)}")
-            # Raising exception tells Lambda this message FAILED (optional)
-            raise e
+    batch_duration = time.time() - batch_start
+    processed_order_ids = [r["order_id"] for r in results if r["status"] == "PROCESSED"]
+    failed = [r for r in results if r["status"] == "FAILED"]
+    success_count = len(processed_order_ids)
+    failure_count = len(failed)
+    duplicate_count = sum(1 for r in results if r["status"] == "DUPLICATE")
+    metrics.count("records_received", total_records)
+    metrics.count("records_processed", success_count)
+    metrics.count("records_failed", failure_count)
 
     # Summary log for the batch
-    print("\n📊 Batch Summary:")
-    print(f"Total messages received: {total_records}")
-    print(f"✅ Successfully processed: {success_count}")
-    print(f"❌ Failed: {failure_count}")
-    print(f"Processed order IDs: {processed_order_ids}")
+    log.info(
+        "Batch summary",
+        total_received=total_records,
+        success_count=success_count,
+        failure_count=failure_count,
+        duplicate_count=duplicate_count,
+        batch_duration_ms=int(batch_duration * 1000),
+        slowest_record_ms=max([r["duration_ms"] for r in results], default=0),
+        concurrency=concurrency
+    )
+    log.debug("Processed order IDs", processed_order_ids=processed_order_ids)
+
+    if failed and not REPORT_BATCH_ITEM_FAILURES:
+        # Raising exception tells Lambda the whole batch FAILED
+        raise failed[0]["exception"]
 
     # Returning summary (can be helpful for testing via Lambda console)
     return {
@@ -61,5 +103,204 @@ def lambda_handler(event, context):
         "total_received": total_records,
         "success_count": success_count,
         "failure_count": failure_count,
-        "processed_order_ids": processed_order_ids
+        "duplicate_count": duplicate_count,
+        "processed_order_ids": processed_order_ids,
+        "batch_duration_ms": int(batch_duration * 1000),
+        "results": [
+            {k: v for k, v in r.items() if k not in ("exception", "item")}
+            for r in results
+        ],
+        # Only these messages go back to the queue, the rest are deleted
+        "batchItemFailures": [
+            {"itemIdentifier": r["message_id"]}
+            for r in failed
+        ]
     }
+
+# ----------------- Helper Functions -----------------
+
+def process_record(idx, record, total_records):
+    """Process one SQS record and return its result instead of raising."""
+    start = time.time()
+    order_id = f"unknown-{idx}"
+    result = {
+        "index": idx,
+        "message_id": record.get("messageId"),
+        "order_id": order_id,
+    }
+
+    # Correlation ID the ingest Lambda attached to the message
+    correlation_id = (record.get("messageAttributes") or {}).get("correlation_id", {}).get("stringValue")
+
+    try:
+        with metrics.phase("parse"):
+            body = json.loads(record["body"])
+        order_id = body.get("order_id", order_id)
+        result["order_id"] = order_id
+
+        if IDEMPOTENT_WRITES and order_id in recently_seen:
+            # Redelivery of an order this container already stored
+            return mark_duplicate(result, "cache")
+
+        # 🔥 Simulate processing time (important for testing)
+        processing_time = random.uniform(PROCESSING_TIME_MIN, PROCESSING_TIME_MAX)
+        log.debug(
+            "Processing order",
+            record=f"{idx}/{total_records}",
+            order_id=order_id,
+            message_id=result["message_id"],
+            correlation_id=correlation_id or log.correlation_id,
+            processing_s=round(processing_time, 3),
+            body=body
+        )
+        with metrics.phase("process"):
+            time.sleep(processing_time)
+
+        item = {
+            "order_id": order_id,
+            "customer_email": body["customer_email"],
+            "items": body["items"],
+            "status": "PROCESSED",
+            "created_at": body["created_at"],
+            "processed_at": int(time.time())
+        }
+
+        if BATCH_WRITES:
+            # Written together with the rest of the batch
+            result["item"] = item
+            result["status"] = "READY"
+        else:
+            with metrics.phase("downstream"):
+                stored = put_order(item)
+            metrics.count("write_round_trips")
+            if not stored:
+                return mark_duplicate(result, "table")
+            result["status"] = "PROCESSED"
+            recently_seen.add(order_id)
+            log.debug("Order saved", order_id=order_id)
+
+    except Exception as e:
+        result["status"] = "FAILED"
+        result["error"] = str(e)
+        result["exception"] = e
+        log.exception(
+            "Failed to process message",
+            e,
+            order_id=order_id,
+            message_id=result["message_id"],
+            correlation_id=correlation_id or log.correlation_id
+        )
+    finally:
+        result["duration_ms"] = int((time.time() - start) * 1000)
+
+    return result
+
+
+def mark_duplicate(result, source):
+    """A record whose order is already stored: nothing to write, the message is deleted."""
+    metrics.count(f"duplicates_{source}")
+    recently_seen.add(result["order_id"])
+    result["status"] = "DUPLICATE"
+    log.info("Duplicate order skipped", order_id=result["order_id"], message_id=result["message_id"], source=source)
+    return result
+
+
+def put_order(item):
+    """put_item that never overwrites a stored order; False when it was a duplicate."""
+    if not IDEMPOTENT_WRITES:
+        table.put_item(Item=item)
+        return True
+    try:
+        table.put_item(Item=item, ConditionExpression="attribute_not_exists(order_id)")
+    except Exception as e:
+        if is_conditional_check_failure(e):
+            return False
+        raise
+    return True
+
+
+def find_stored_orders(order_ids):
+    """Order IDs already in the table (BatchGetItem, key only), and the BatchGetItem calls made.
+
+    BatchWriteItem takes no conditions, so this lookup is what keeps batch
+    writes idempotent. Keys left unprocessed after the retries are treated as
+    not stored: at worst an order is rewritten with the same content.
+    """
+    stored = set()
+    lookups = 0
+    for start in range(0, len(order_ids), BATCH_GET_SIZE):
+        keys = [{"order_id": oid} for oid in order_ids[start:start + BATCH_GET_SIZE]]
+        for attempt in range(BATCH_WRITE_MAX_RETRIES + 1):
+            if attempt:
+                time.sleep(BATCH_WRITE_BASE_DELAY * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+            metrics.count("dedup_lookups")
+            lookups += 1
+            resp = table.meta.client.batch_get_item(RequestItems={
+                table.name: {"Keys": keys, "ProjectionExpression": "order_id"}
+            })
+            stored.update(item["order_id"] for item in resp.get("Responses", {}).get(table.name, []))
+            keys = resp.get("UnprocessedKeys", {}).get(table.name, {}).get("Keys", [])
+            if not keys:
+                break
+    return stored, lookups
+
+
+def write_orders_in_batches(results):
+    """Write the items of processed records with BatchWriteItem.
+
+    UnprocessedItems are retried with exponential backoff; records whose item
+    still could not be written are marked FAILED so their message is retried.
+    Returns the DynamoDB calls made, BatchGetItem dedup lookups included.
+    """
+    # A redelivered message can carry the same order twice in one batch, and
+    # BatchWriteItem rejects duplicate keys, so one write covers both records
+    by_order_id = {}
+    for r in results:
+        by_order_id.setdefault(r["item"]["order_id"], []).append(r)
+
+    order_ids = list(by_order_id)
+    round_trips = 0
+    if IDEMPOTENT_WRITES and order_ids:
+        stored, round_trips = find_stored_orders(order_ids)
+        for oid in stored:
+            for r in by_order_id[oid]:
+                mark_duplicate(r, "table")
+        order_ids = [oid for oid in order_ids if oid not in stored]
+    if not order_ids:
+        return round_trips
+
+    for start in range(0, len(order_ids), BATCH_WRITE_SIZE):
+        chunk = order_ids[start:start + BATCH_WRITE_SIZE]
+        requests = [{"PutRequest": {"Item": by_order_id[oid][-1]["item"]}} for oid in chunk]
+        error = None
+
+        for attempt in range(BATCH_WRITE_MAX_RETRIES + 1):
+            if attempt:
+                time.sleep(BATCH_WRITE_BASE_DELAY * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+            try:
+                round_trips += 1
+                resp = table.meta.client.batch_write_item(RequestItems={table.name: requests})
+            except Exception as e:
+                error = e
+                log.warning("BatchWriteItem failed", attempt=attempt + 1, error=str(e))
+                continue
+            error = None
+            requests = resp.get("UnprocessedItems", {}).get(table.name, [])
+            if not requests:
+                break
+            log.info("Retrying unprocessed items", unprocessed=len(requests), attempt=attempt + 1)
+
+        unwritten = {req["PutRequest"]["Item"]["order_id"] for req in requests}
+        for oid in chunk:
+            for r in by_order_id[oid]:
+                if oid in unwritten:
+                    r["status"] = "FAILED"
+                    r["exception"] = error or Exception(f"Order {oid} left unprocessed by BatchWriteItem")
+                    r["error"] = str(r["exception"])
+                    log.error("Failed to save order", order_id=oid, message_id=r["message_id"], error=r["error"])
+                else:
+                    r["status"] = "PROCESSED"
+                    recently_seen.add(oid)
+
+    log.info("Batch write done", orders=len(order_ids), round_trips=round_trips)
+    return round_trips
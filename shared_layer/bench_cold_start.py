@@ -0,0 +1,123 @@
+"""Measure cold starts of the Python handlers with eager and lazy AWS clients.
+
+Every measurement is a fresh Python process, like a new Lambda container:
+
+  import_ms   importing the handler module (init phase)
+  first_ms    first invocation on a path that needs no AWS call (validation
+              error, malformed record), where there is one
+  client_ms   building the handler's clients afterwards (aws_clients.prewarm),
+              what the first invocation that does call AWS adds with lazy clients
+
+"eager" sets AWS_CLIENTS_EAGER=true, which builds the clients at import like
+the handlers did before aws_clients; "lazy" is the default. Medians of --runs
+processes per handler and mode.
+
+Usage: python bench_cold_start.py [--runs 5] [--handler crud_lambda]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SHARED_LAYER = os.path.join(ROOT, "shared_layer", "python")
+
+MALFORMED_SQS_BATCH = {"Records": [{"messageId": "m-1", "body": "not json", "attributes": {}}]}
+
+# handler -> (folder, event for the first invocation or None)
+HANDLERS = {
+    "crud_lambda": ("CRUD_API", {"httpMethod": "POST", "body": "{}"}),
+    "ingest_lambda": ("order-queue-17-1-26", {"body": "{}"}),
+    "worker_lambda": ("order-queue-17-1-26", MALFORMED_SQS_BATCH),
+    "order_producer": ("Eventbridge-21-1-26/lambda-function-codes", None),
+    "inventory_consumer": ("Eventbridge-21-1-26/lambda-function-codes", None),
+    "analytics": ("Eventbridge-21-1-26/lambda-function-codes", MALFORMED_SQS_BATCH),
+}
+
+
+def child(handler):
+    """Runs in the fresh process: prints one JSON line of timings."""
+    folder, event = HANDLERS[handler]
+    sys.path[:0] = [SHARED_LAYER, os.path.join(ROOT, folder)]
+    import builtins
+    real_print = builtins.print
+    builtins.print = lambda *a, **k: None
+
+    start = time.perf_counter()
+    module = __import__(handler)
+    import_ms = (time.perf_counter() - start) * 1000
+
+    first_ms = None
+    if event is not None:
+        context = type("Context", (), {"aws_request_id": "cold-start", "function_name": handler})()
+        start = time.perf_counter()
+        try:
+            module.lambda_handler(event, context)
+        except Exception:
+            pass  # a failed record raising is still a completed cold invocation
+        first_ms = (time.perf_counter() - start) * 1000
+    boto3_after_first = "boto3" in sys.modules
+
+    import aws_clients
+    start = time.perf_counter()
+    aws_clients.prewarm()
+    client_ms = (time.perf_counter() - start) * 1000
+
+    builtins.print = real_print
+    print(json.dumps({"import_ms": import_ms, "first_ms": first_ms, "client_ms": client_ms,
+                      "boto3_after_first": boto3_after_first}))
+
+
+def measure(handler, eager, runs):
+    env = dict(os.environ, AWS_CLIENTS_EAGER="true" if eager else "false")
+    env.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, __file__, "--child", handler], env=env,
+                             capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+
+    def median(field):
+        values = [s[field] for s in samples if s[field] is not None]
+        return round(statistics.median(values), 1) if values else None
+    return {
+        "handler": handler,
+        "mode": "eager" if eager else "lazy",
+        "import_ms": median("import_ms"),
+        "first_ms": median("first_ms"),
+        "client_ms": median("client_ms"),
+        "boto3_imported_by_first": samples[0]["boto3_after_first"] if samples[0]["first_ms"] is not None else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="processes per handler and mode")
+    parser.add_argument("--handler", choices=sorted(HANDLERS), action="append", help="only these handlers")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    for handler in args.handler or HANDLERS:
+        eager = measure(handler, True, args.runs)
+        lazy = measure(handler, False, args.runs)
+        print(json.dumps(eager))
+        print(json.dumps(lazy))
+        saved = eager["import_ms"] - lazy["import_ms"]
+        if lazy["first_ms"] is not None:
+            print(f"🥶 {handler}: init {eager['import_ms']} -> {lazy['import_ms']} ms; a first request without AWS "
+                  f"calls finishes {round(saved + eager['first_ms'] - lazy['first_ms'], 1)} ms sooner; the first AWS "
+                  f"call pays {lazy['client_ms']} ms for the client instead")
+        else:
+            print(f"🥶 {handler}: init {eager['import_ms']} -> {lazy['import_ms']} ms; every invocation calls AWS, "
+                  f"so the first one pays {lazy['client_ms']} ms for the client instead")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Microbenchmark the compiled schema validators against the old hand-written checks.
+
+Covers valid and invalid products, valid and invalid orders and an order with
+1,000 line items. Prints microseconds per call for both implementations.
+
+Usage: python bench_schema.py [--number 20000]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "python"))
+
+import schema
+
+
+# ---------------- Previous implementations (baseline) ----------------
+
+def legacy_validate_product_data(data, require_all_fields=True):
+    fields = {
+        "product_id": str,
+        "name": str,
+        "price": (int, float, Decimal),
+        "currency": str,
+        "in_stock": (bool, int)
+    }
+    errors = []
+    for key, typ in fields.items():
+        if key not in data:
+            if require_all_fields:
+                errors.append(f"Missing '{key}'")
+            continue
+        if not isinstance(data[key], typ):
+            errors.append(f"Invalid type for '{key}', expected {typ}")
+    return errors
+
+
+def legacy_validate_order(body):
+    if "items" not in body:
+        return "Missing 'items' in order"
+    if "email" not in body:
+        return "Missing 'email' in order"
+    if not isinstance(body["items"], list):
+        return "'items' must be an array"
+    if len(body["items"]) == 0:
+        return "'items' array cannot be empty"
+    for i, item in enumerate(body["items"]):
+        if not isinstance(item, dict):
+            return f"Item at index {i} must be an object"
+        if "sku" not in item:
+            return f"Item at index {i} missing 'sku' field"
+        if "qty" not in item:
+            return f"Item at index {i} missing 'qty' field"
+        if not isinstance(item["qty"], int) or item["qty"] <= 0:
+            return f"Item at index {i} has invalid quantity"
+    return None
+
+
+# ---------------- Payloads ----------------
+
+VALID_PRODUCT = {"product_id": "p-1", "name": "Book", "price": Decimal("19.99"), "currency": "USD", "in_stock": True}
+INVALID_PRODUCT = {"product_id": 1, "price": "free", "in_stock": "yes"}
+VALID_ORDER = {"email": "a@test.com", "items": [{"sku": "BOOK-001", "qty": 2}, {"sku": "PEN-002", "qty": 1}]}
+INVALID_ORDER = {"email": "a@test.com", "items": [{"sku": "BOOK-001", "qty": 0}, {"qty": 1}, "x"]}
+LARGE_ORDER = {"email": "a@test.com", "items": [{"sku": f"SKU-{i}", "qty": 1 + i % 3} for i in range(1000)]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000, help="calls per small-payload case")
+    args = parser.parse_args()
+
+    cases = [
+        ("product valid", lambda: legacy_validate_product_data(VALID_PRODUCT), lambda: schema.validate_product(VALID_PRODUCT), args.number),
+        ("product invalid", lambda: legacy_validate_product_data(INVALID_PRODUCT), lambda: schema.validate_product(INVALID_PRODUCT), args.number),
+        ("product update", lambda: legacy_validate_product_data({"price": 5}, False), lambda: schema.validate_product_update({"price": 5}), args.number),
+        ("order valid", lambda: legacy_validate_order(VALID_ORDER), lambda: schema.validate_order(VALID_ORDER), args.number),
+        ("order invalid", lambda: legacy_validate_order(INVALID_ORDER), lambda: schema.validate_order(INVALID_ORDER), args.number),
+        ("order 1000 items", lambda: legacy_validate_order(LARGE_ORDER), lambda: schema.validate_order(LARGE_ORDER), max(1, args.number // 100)),
+    ]
+
+    for name, legacy, compiled, number in cases:
+        legacy_us = timeit.timeit(legacy, number=number) / number * 1e6
+        compiled_us = timeit.timeit(compiled, number=number) / number * 1e6
+        print(json.dumps({
+            "case": name,
+            "legacy_us": round(legacy_us, 3),
+            "compiled_us": round(compiled_us, 3),
+            "speedup": round(legacy_us / compiled_us, 2)
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,856 @@
+"""Local AWS resources for the harnesses and benchmarks of every service.
+
+Development only: this file sits next to the shared layer, not in its
+python/ folder, so it is never deployed. Scripts add shared_layer/ to
+sys.path and import it from there.
+
+DynamoDB tables come in two backends with the same interface (counters,
+failure injection, an `items` view):
+
+  MotoTable    a table in moto's mock_aws: the real API, expressions and all.
+               Used where a harness checks behaviour (conditions,
+               transactions, filtered scans).
+  LocalTable   an in-memory dict: cheap scans, and conditional writes that
+               are atomic across threads. Used for timings and concurrency.
+               It models the subset of expressions the handlers send; any
+               other expression fails with UnsupportedByStandIn (a
+               ValidationException) that says to use the moto backend.
+
+dynamodb_table() picks the backend: LOCAL_AWS_BACKEND=moto|memory, or the
+script's own default. LocalQueue (SQS, sub-second visibility timeouts) and
+LocalS3 are in-memory only.
+"""
+import bisect
+import hashlib
+import io
+import itertools
+import operator
+import os
+import re
+import threading
+import time
+import zlib
+from collections import defaultdict, deque
+from decimal import Decimal
+from types import SimpleNamespace
+
+from botocore.exceptions import ClientError
+
+# Backend of dynamodb_table() when the caller does not choose one
+LOCAL_AWS_BACKEND = os.environ.get("LOCAL_AWS_BACKEND", "")
+
+
+class InjectedFailure(ClientError):
+    """A write failed on purpose (inject_failures), as DynamoDB throttling would."""
+
+    def __init__(self, key, operation="PutItem"):
+        super().__init__({"Error": {"Code": "ProvisionedThroughputExceededException",
+                                    "Message": f"Injected write failure for {key}"}}, operation)
+
+
+class UnsupportedByStandIn(ClientError):
+    """An expression LocalTable does not model; refused instead of guessed."""
+
+    def __init__(self, what, operation):
+        super().__init__({"Error": {"Code": "ValidationException",
+                                    "Message": f"{what} is not modelled by the in-memory LocalTable, "
+                                               f"run with LOCAL_AWS_BACKEND=moto"}}, operation)
+
+
+class ConditionalCheckFailed(ClientError):
+    """botocore's ClientError for a failed ConditionExpression.
+
+    `item` is the stored item, returned when the call asked for
+    ReturnValuesOnConditionCheckFailure=ALL_OLD (as plain values; DynamoDB
+    sends the low-level format).
+    """
+
+    def __init__(self, message="The conditional request failed", item=None, operation="UpdateItem"):
+        response = {"Error": {"Code": "ConditionalCheckFailedException", "Message": message}}
+        if item is not None:
+            response["Item"] = item
+        super().__init__(response, operation)
+
+
+class TransactionCanceled(ClientError):
+    """botocore's ClientError for a cancelled TransactWriteItems."""
+
+    def __init__(self, reasons):
+        message = f"Transaction cancelled, please refer cancellation reasons for specific reasons [{', '.join(r['Code'] for r in reasons)}]"
+        super().__init__({
+            "Error": {"Code": "TransactionCanceledException", "Message": message},
+            "CancellationReasons": reasons
+        }, "TransactWriteItems")
+
+
+COMPARISONS = {"=": operator.eq, "<>": operator.ne, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+
+def condition_holds(item, expression, names=None, values=None, operation="PutItem"):
+    """ConditionExpression subset: attribute_exists / attribute_not_exists and comparisons, joined with AND."""
+    names = names or {}
+    values = values or {}
+    for clause in re.split(r"\s+AND\s+", expression.strip(), flags=re.IGNORECASE):
+        clause = clause.strip()
+        match = re.fullmatch(r"(attribute_exists|attribute_not_exists)\(\s*([#\w]+)\s*\)", clause)
+        if match:
+            present = item is not None and names.get(match[2], match[2]) in item
+            if present != (match[1] == "attribute_exists"):
+                return False
+            continue
+        match = re.fullmatch(r"([#\w]+)\s*(<>|<=|>=|=|<|>)\s*(:\w+)", clause)
+        if not match:
+            raise UnsupportedByStandIn(f"Condition {clause!r}", operation)
+        current = (item or {}).get(names.get(match[1], match[1]))
+        if current is None or not COMPARISONS[match[2]](current, values[match[3]]):
+            return False
+    return True
+
+
+def _comparable(current, value):
+    """DynamoDB compares like types only: a bool is never equal to a number."""
+    if current is None or isinstance(current, bool) != isinstance(value, bool):
+        return False
+    numbers = (int, float, Decimal)
+    return isinstance(current, numbers) == isinstance(value, numbers)
+
+
+def filter_matches(item, condition, operation="Scan"):
+    """Evaluate a boto3.dynamodb.conditions object (Attr(...).gte(...) & ...) against an item."""
+    expression = condition.get_expression()
+    op, values = expression["operator"], expression["values"]
+    if op in ("AND", "OR"):
+        results = (filter_matches(item, value, operation) for value in values)
+        return all(results) if op == "AND" else any(results)
+    if op == "NOT":
+        return not filter_matches(item, values[0], operation)
+
+    name = getattr(values[0], "name", None)
+    if name is None or "." in name or "[" in name:
+        raise UnsupportedByStandIn(f"Filter operand {values[0]!r}", operation)
+    current = item.get(name)
+    if op == "attribute_exists":
+        return name in item
+    if op == "attribute_not_exists":
+        return name not in item
+    if op == "IN":
+        return any(_comparable(current, v) and current == v for v in values[1])
+    if op == "BETWEEN":
+        return _comparable(current, values[1]) and values[1] <= current <= values[2]
+    if op == "begins_with":
+        return isinstance(current, str) and current.startswith(values[1])
+    if op in COMPARISONS:
+        return _comparable(current, values[1]) and COMPARISONS[op](current, values[1])
+    raise UnsupportedByStandIn(f"Filter operator {op!r}", operation)
+
+
+def _split_top_level(text, separator=","):
+    """Split on `separator` outside parentheses."""
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(text):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == separator and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _operand(item, text, names, values):
+    """:value, attribute, if_not_exists(a, b) or list_append(a, b)."""
+    match = re.fullmatch(r"(if_not_exists|list_append)\s*\((.*)\)", text.strip())
+    if match:
+        first, second = _split_top_level(match[2])
+        if match[1] == "if_not_exists":
+            current = item.get(names.get(first, first))
+            return current if current is not None else _operand(item, second, names, values)
+        return _operand(item, first, names, values) + _operand(item, second, names, values)
+    text = text.strip()
+    if text.startswith(":"):
+        return values[text]
+    current = item.get(names.get(text, text))
+    if current is None:
+        raise ValueError("ValidationException: The provided expression refers to an attribute that does not exist in the item")
+    return current
+
+
+def _value(item, text, names, values):
+    """operand, or operand + / - operand."""
+    depth = 0
+    for i, char in enumerate(text):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char in "+-" and depth == 0 and i > 0:
+            left = _operand(item, text[:i], names, values)
+            right = _operand(item, text[i + 1:], names, values)
+            return left + right if char == "+" else left - right
+    return _operand(item, text, names, values)
+
+
+def apply_update(item, key, UpdateExpression, names=None, values=None):
+    """New item after an UpdateExpression (upserts, like DynamoDB).
+
+    SET with plain values, +/- arithmetic, if_not_exists() and list_append();
+    REMOVE; ADD for numbers and sets; DELETE for sets.
+    """
+    names = names or {}
+    values = values or {}
+    item = dict(item or key)
+    clauses = re.split(r"\b(SET|REMOVE|ADD|DELETE)\b", UpdateExpression, flags=re.IGNORECASE)
+    if clauses[0].strip():
+        raise ValueError(f"ValidationException: Invalid UpdateExpression: {UpdateExpression}")
+    # Right-hand sides see the item as it was before this update
+    before = dict(item)
+    for action, body in zip(clauses[1::2], clauses[2::2]):
+        action = action.upper()
+        for part in _split_top_level(body):
+            if action == "SET":
+                name, _, expression = part.partition("=")
+                item[names.get(name.strip(), name.strip())] = _value(before, expression, names, values)
+            elif action == "REMOVE":
+                item.pop(names.get(part, part), None)
+            elif action == "ADD":
+                name, value = part.split()
+                name = names.get(name, name)
+                current = item.get(name)
+                delta = values[value]
+                item[name] = delta if current is None else (current | delta if isinstance(current, set) else current + delta)
+            else:
+                name, value = part.split()
+                name = names.get(name, name)
+                current = item.get(name)
+                if current is not None and not isinstance(current, set):
+                    raise ValueError("ValidationException: An operand in the update expression has an incorrect data type")
+                remaining = (current or set()) - values[value]
+                # DynamoDB has no empty sets: the attribute goes away
+                if remaining:
+                    item[name] = remaining
+                else:
+                    item.pop(name, None)
+    return item
+
+
+class NoSuchKey(Exception):
+    def __init__(self, key):
+        self.response = {"Error": {"Code": "NoSuchKey", "Message": f"The specified key does not exist: {key}"}}
+        super().__init__(self.response["Error"]["Message"])
+
+
+class LocalDynamoDBClient:
+    """The low-level client behind LocalTable (``table.meta.client``)."""
+
+    def __init__(self):
+        self.tables = {}
+        self.transact_calls = 0
+        self._tokens = set()
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        unprocessed = {}
+        for name, requests in RequestItems.items():
+            table = self.tables[name]
+            if len(requests) > 25:
+                raise ValueError("ValidationException: Too many items requested for the BatchWriteItem call")
+            keys = [req["PutRequest"]["Item"][table.key] for req in requests]
+            if len(set(keys)) != len(keys):
+                raise ValueError("ValidationException: Provided list of item keys contains duplicates")
+
+            with table._lock:
+                table.batch_write_calls += 1
+                for req in requests:
+                    if table._take_failure(req["PutRequest"]["Item"][table.key]):
+                        # Like throttling: handed back for the caller to retry
+                        unprocessed.setdefault(name, []).append(req)
+                    else:
+                        table._write(req["PutRequest"]["Item"])
+        return {"UnprocessedItems": unprocessed}
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        responses = {}
+        for name, request in RequestItems.items():
+            table = self.tables[name]
+            if len(request["Keys"]) > 100:
+                raise ValueError("ValidationException: Too many items requested for the BatchGetItem call")
+            attributes = None
+            if request.get("ProjectionExpression"):
+                names = request.get("ExpressionAttributeNames") or {}
+                attributes = [names.get(a.strip(), a.strip()) for a in request["ProjectionExpression"].split(",")]
+            with table._lock:
+                table.batch_get_calls += 1
+                found = [table.items[k[table.key]] for k in request["Keys"] if k[table.key] in table.items]
+            if attributes is not None:
+                found = [{a: item[a] for a in attributes if a in item} for item in found]
+            responses[name] = found
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    def transact_write_items(self, TransactItems, ClientRequestToken=None, **kwargs):
+        """All-or-nothing Put / Update / Delete / ConditionCheck across tables."""
+        if len(TransactItems) > 100:
+            raise ValueError("ValidationException: Member must have length less than or equal to 100")
+        operations = []
+        for request in TransactItems:
+            (kind, operation), = request.items()
+            table = self.tables[operation["TableName"]]
+            key = operation["Item"][table.key] if kind == "Put" else operation["Key"][table.key]
+            operations.append((kind, operation, table, key))
+        if len({(t.name, k) for _, _, t, k in operations}) != len(operations):
+            raise ValueError("ValidationException: Transaction request cannot include multiple operations on one item")
+
+        tables = sorted({t.name: t for _, _, t, _ in operations}.items())
+        for _, table in tables:
+            table._lock.acquire()
+        try:
+            self.transact_calls += 1
+            # Same token again (within 10 minutes on AWS): already applied, nothing to do
+            if ClientRequestToken is not None and ClientRequestToken in self._tokens:
+                return {}
+            # Throttled before anything is checked or applied
+            for kind, operation, table, key in operations:
+                if kind in ("Put", "Update") and table._take_failure(key):
+                    raise InjectedFailure(key, "TransactWriteItems")
+            reasons = []
+            for kind, operation, table, key in operations:
+                condition = operation.get("ConditionExpression")
+                current = table.items.get(key)
+                holds = condition is None or condition_holds(
+                    current, condition,
+                    operation.get("ExpressionAttributeNames"), operation.get("ExpressionAttributeValues"),
+                    "TransactWriteItems"
+                )
+                if holds:
+                    reasons.append({"Code": "None"})
+                    continue
+                reason = {"Code": "ConditionalCheckFailed", "Message": "The conditional request failed"}
+                if operation.get("ReturnValuesOnConditionCheckFailure") == "ALL_OLD" and current is not None:
+                    reason["Item"] = current
+                reasons.append(reason)
+            if any(r["Code"] != "None" for r in reasons):
+                raise TransactionCanceled(reasons)
+            for kind, operation, table, key in operations:
+                if kind == "Put":
+                    table._write(operation["Item"])
+                elif kind == "Update":
+                    table._write(apply_update(table.items.get(key), operation["Key"], operation["UpdateExpression"],
+                                              operation.get("ExpressionAttributeNames"),
+                                              operation.get("ExpressionAttributeValues")))
+                elif kind == "Delete":
+                    table.items.pop(key, None)
+            if ClientRequestToken is not None:
+                self._tokens.add(ClientRequestToken)
+        finally:
+            for _, table in tables:
+                table._lock.release()
+        return {}
+
+
+class LocalTable:
+    """DynamoDB Table stand-in with write counters and failure injection."""
+
+    def __init__(self, name="order-table-local", key="order_id", client=None):
+        self.name = name
+        self.key = key
+        self.items = {}
+        self.put_calls = 0
+        self.update_calls = 0
+        self.batch_write_calls = 0
+        self.batch_get_calls = 0
+        client = client or LocalDynamoDBClient()
+        client.tables[name] = self
+        self.meta = SimpleNamespace(client=client)
+        self.writes_per_key = defaultdict(int)
+        # key -> number of upcoming writes of that key that should fail
+        self.fail_writes = {}
+        self._lock = threading.Lock()
+
+    def inject_failures(self, key, times=1):
+        self.fail_writes[key] = times
+
+    def load(self, items):
+        """Store items as they are, outside the counters (test setup)."""
+        with self._lock:
+            for item in items:
+                self.items[item[self.key]] = dict(item)
+
+    def _take_failure(self, key):
+        """True when this write of `key` is one of the injected failures."""
+        if self.fail_writes.get(key, 0) > 0:
+            self.fail_writes[key] -= 1
+            return True
+        return False
+
+    def _write(self, item, operation="PutItem"):
+        key = item[self.key]
+        if self._take_failure(key):
+            raise InjectedFailure(key, operation)
+        self.items[key] = item
+        self.writes_per_key[key] += 1
+
+    def _check(self, current, ConditionExpression, names, values, return_on_failure, operation):
+        if ConditionExpression is not None and not condition_holds(current, ConditionExpression, names, values,
+                                                                   operation):
+            raise ConditionalCheckFailed(item=current if return_on_failure == "ALL_OLD" else None,
+                                         operation=operation)
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeNames=None,
+                 ExpressionAttributeValues=None, ReturnValuesOnConditionCheckFailure="NONE", **kwargs):
+        with self._lock:
+            self.put_calls += 1
+            self._check(self.items.get(Item[self.key]), ConditionExpression, ExpressionAttributeNames,
+                        ExpressionAttributeValues, ReturnValuesOnConditionCheckFailure, "PutItem")
+            self._write(Item)
+        return {}
+
+    def get_item(self, Key, **kwargs):
+        item = self.items.get(Key[self.key])
+        return {"Item": item} if item is not None else {}
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues=None, ExpressionAttributeNames=None,
+                    ReturnValues="NONE", ConditionExpression=None, ReturnValuesOnConditionCheckFailure="NONE",
+                    **kwargs):
+        """Upserts like DynamoDB, see apply_update for the supported expressions."""
+        with self._lock:
+            self.update_calls += 1
+            current = self.items.get(Key[self.key])
+            self._check(current, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues,
+                        ReturnValuesOnConditionCheckFailure, "UpdateItem")
+            item = apply_update(current, Key, UpdateExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+            self._write(item, "UpdateItem")
+        return {"Attributes": item} if ReturnValues == "ALL_NEW" else {}
+
+    def delete_item(self, Key, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValuesOnConditionCheckFailure="NONE", **kwargs):
+        with self._lock:
+            self._check(self.items.get(Key[self.key]), ConditionExpression, ExpressionAttributeNames,
+                        ExpressionAttributeValues, ReturnValuesOnConditionCheckFailure, "DeleteItem")
+            self.items.pop(Key[self.key], None)
+        return {}
+
+    def scan(self, Limit=None, ExclusiveStartKey=None, Segment=None, TotalSegments=None,
+             ProjectionExpression=None, ExpressionAttributeNames=None, FilterExpression=None, **kwargs):
+        """Pages in key order; parallel scans split the keys by hash, like DynamoDB's segments.
+
+        Like DynamoDB, Limit counts the items read, FilterExpression (boto3
+        condition objects) then drops items from the page.
+        """
+        if FilterExpression is not None and not hasattr(FilterExpression, "get_expression"):
+            raise UnsupportedByStandIn("A FilterExpression string", "Scan")
+        with self._lock:
+            keys = sorted(self.items)
+        if ExclusiveStartKey:
+            keys = keys[bisect.bisect_right(keys, ExclusiveStartKey[self.key]):]
+        if TotalSegments:
+            keys = (k for k in keys if zlib.crc32(str(k).encode()) % TotalSegments == Segment)
+        # One key past the page tells whether there is more
+        page = list(itertools.islice(keys, Limit + 1)) if Limit else list(keys)
+        more = Limit is not None and len(page) > Limit
+        page = page[:Limit] if more else page
+        items = [self.items[k] for k in page]
+        if FilterExpression is not None:
+            items = [item for item in items if filter_matches(item, FilterExpression)]
+        if ProjectionExpression:
+            names = ExpressionAttributeNames or {}
+            attributes = [names.get(a.strip(), a.strip()) for a in ProjectionExpression.split(",")]
+            items = [{a: item[a] for a in attributes if a in item} for item in items]
+        result = {"Items": items}
+        if more:
+            result["LastEvaluatedKey"] = {self.key: page[-1]}
+        return result
+
+    @property
+    def round_trips(self):
+        """Calls of the worker's write path: writes plus the BatchGetItem dedup lookups."""
+        return self.put_calls + self.batch_write_calls + self.batch_get_calls
+
+    @property
+    def redundant_writes(self):
+        """Writes of an item that was already stored (the cost of redelivery)."""
+        return sum(count - 1 for count in self.writes_per_key.values() if count > 1)
+
+
+def start_moto(region="us-east-1"):
+    """Start moto's mock_aws once for the process; every boto3 client after this is mocked."""
+    global _moto
+    if _moto is None:
+        from moto import mock_aws
+        os.environ.setdefault("AWS_DEFAULT_REGION", region)
+        _moto = mock_aws()
+        _moto.start()
+    return _moto
+
+
+_moto = None
+
+
+class MotoDynamoDBClient:
+    """boto3 DynamoDB client (``table.meta.client``) with the LocalDynamoDBClient counters.
+
+    Failure injection happens here, before a request is sent: moto itself
+    never throttles.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self.tables = {}
+        self.transact_calls = 0
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        sent, unprocessed = {}, {}
+        for name, requests in RequestItems.items():
+            table = self.tables[name]
+            table.batch_write_calls += 1
+            for req in requests:
+                failed = "PutRequest" in req and table._take_failure(req["PutRequest"]["Item"][table.key])
+                (unprocessed if failed else sent).setdefault(name, []).append(req)
+        resp = self._client.batch_write_item(RequestItems=sent, **kwargs) if sent else {}
+        for name, requests in resp.get("UnprocessedItems", {}).items():
+            unprocessed.setdefault(name, []).extend(requests)
+        for name, requests in sent.items():
+            table = self.tables[name]
+            left = {str(req["PutRequest"]["Item"][table.key])
+                    for req in resp.get("UnprocessedItems", {}).get(name, []) if "PutRequest" in req}
+            for req in requests:
+                if "PutRequest" in req and str(req["PutRequest"]["Item"][table.key]) not in left:
+                    table.writes_per_key[req["PutRequest"]["Item"][table.key]] += 1
+        return dict(resp, UnprocessedItems=unprocessed)
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        for name in RequestItems:
+            self.tables[name].batch_get_calls += 1
+        return self._client.batch_get_item(RequestItems=RequestItems, **kwargs)
+
+    def transact_write_items(self, TransactItems, **kwargs):
+        self.transact_calls += 1
+        written = []
+        for request in TransactItems:
+            (kind, operation), = request.items()
+            table = self.tables[operation["TableName"]]
+            key = operation["Item"][table.key] if kind == "Put" else operation["Key"][table.key]
+            if kind in ("Put", "Update"):
+                written.append((table, key))
+        for table, key in written:
+            if table._take_failure(key):
+                raise InjectedFailure(key, "TransactWriteItems")
+        resp = self._client.transact_write_items(TransactItems=TransactItems, **kwargs)
+        for table, key in written:
+            table.writes_per_key[key] += 1
+        return resp
+
+
+class MotoTable(LocalTable):
+    """A table in moto (string hash key `key`) with LocalTable's counters and failure injection.
+
+    Created empty: an existing table of the same name is dropped first.
+    """
+
+    def __init__(self, name="order-table-local", key="order_id", client=None):
+        start_moto()
+        import boto3
+        resource = boto3.resource("dynamodb")
+        client = client or MotoDynamoDBClient(resource.meta.client)
+        if name in client.list_tables()["TableNames"]:
+            client.delete_table(TableName=name)
+        self._table = resource.create_table(
+            TableName=name,
+            KeySchema=[{"AttributeName": key, "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": key, "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST"
+        )
+        self.name = name
+        self.key = key
+        self.put_calls = 0
+        self.update_calls = 0
+        self.batch_write_calls = 0
+        self.batch_get_calls = 0
+        client.tables[name] = self
+        self.meta = SimpleNamespace(client=client)
+        self.writes_per_key = defaultdict(int)
+        self.fail_writes = {}
+        self._lock = threading.Lock()
+
+    @property
+    def items(self):
+        """Snapshot of the stored items by key (a full scan)."""
+        items, kwargs = {}, {}
+        while True:
+            resp = self._table.scan(**kwargs)
+            items.update((item[self.key], item) for item in resp["Items"])
+            if "LastEvaluatedKey" not in resp:
+                return items
+            kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+    def load(self, items):
+        with self._table.batch_writer() as batch:
+            for item in items:
+                batch.put_item(Item=item)
+
+    def put_item(self, Item, **kwargs):
+        with self._lock:
+            self.put_calls += 1
+            if self._take_failure(Item[self.key]):
+                raise InjectedFailure(Item[self.key])
+        resp = self._table.put_item(Item=Item, **kwargs)
+        with self._lock:
+            self.writes_per_key[Item[self.key]] += 1
+        return resp
+
+    def get_item(self, Key, **kwargs):
+        return self._table.get_item(Key=Key, **kwargs)
+
+    def update_item(self, Key, **kwargs):
+        with self._lock:
+            self.update_calls += 1
+            if self._take_failure(Key[self.key]):
+                raise InjectedFailure(Key[self.key], "UpdateItem")
+        resp = self._table.update_item(Key=Key, **kwargs)
+        with self._lock:
+            self.writes_per_key[Key[self.key]] += 1
+        return resp
+
+    def delete_item(self, Key, **kwargs):
+        return self._table.delete_item(Key=Key, **kwargs)
+
+    def scan(self, **kwargs):
+        return self._table.scan(**kwargs)
+
+
+def dynamodb_table(name="order-table-local", key="order_id", client=None, backend=None):
+    """MotoTable or LocalTable: `backend`, else LOCAL_AWS_BACKEND, else the in-memory table."""
+    backend = backend or LOCAL_AWS_BACKEND or "memory"
+    if backend == "moto":
+        return MotoTable(name, key, client)
+    if backend == "memory":
+        return LocalTable(name, key, client)
+    raise ValueError(f"Unknown LOCAL_AWS_BACKEND {backend!r}: use moto or memory")
+
+
+class LocalQueue:
+    """SQS client stand-in for a single standard queue.
+
+    Received messages stay invisible for the visibility timeout and come back
+    (with a higher receive count) unless they are deleted in time. With
+    max_receive_count set, a message received that many times moves to
+    dead_letters instead (the queue's redrive policy).
+    """
+
+    def __init__(self, visibility_timeout=30, max_receive_count=None, clock=time.monotonic):
+        self.visibility_timeout = visibility_timeout
+        self.max_receive_count = max_receive_count
+        self.clock = clock
+        # Every message ever sent, in order
+        self.messages = []
+        self.dead_letters = []
+        self.send_calls = 0
+        self.receive_calls = 0
+        self.delete_calls = 0
+        self.redeliveries = 0
+        self._available = deque()
+        # receipt handle -> (message, visible_at)
+        self._in_flight = {}
+        self._receipts = 0
+        self._lock = threading.Condition()
+
+    def _enqueue(self, body, attributes=None):
+        message = {
+            "messageId": f"local-{len(self.messages)}",
+            "body": body,
+            "attributes": attributes or {},
+            "sent_at": self.clock(),
+            "receive_count": 0
+        }
+        self.messages.append(message)
+        self._available.append(message)
+        return message["messageId"]
+
+    def send_message(self, QueueUrl, MessageBody, MessageAttributes=None, **kwargs):
+        with self._lock:
+            self.send_calls += 1
+            message_id = self._enqueue(MessageBody, MessageAttributes)
+            self._lock.notify()
+        return {"MessageId": message_id}
+
+    def send_message_batch(self, QueueUrl, Entries, **kwargs):
+        if len(Entries) > 10:
+            raise ValueError("AWS.SimpleQueueService.TooManyEntriesInBatchRequest")
+        with self._lock:
+            self.send_calls += 1
+            successful = []
+            for entry in Entries:
+                message_id = self._enqueue(entry["MessageBody"], entry.get("MessageAttributes"))
+                successful.append({"Id": entry["Id"], "MessageId": message_id})
+            self._lock.notify_all()
+        return {"Successful": successful, "Failed": []}
+
+    def _release_expired(self, now):
+        for handle, (message, visible_at) in list(self._in_flight.items()):
+            if visible_at <= now:
+                del self._in_flight[handle]
+                self._available.append(message)
+                self.redeliveries += 1
+
+    def receive_message(self, QueueUrl, MaxNumberOfMessages=1, VisibilityTimeout=None,
+                        WaitTimeSeconds=0, MessageAttributeNames=None, **kwargs):
+        if not 1 <= MaxNumberOfMessages <= 10:
+            raise ValueError("InvalidParameterValue: MaxNumberOfMessages must be between 1 and 10")
+        timeout = self.visibility_timeout if VisibilityTimeout is None else VisibilityTimeout
+        deadline = self.clock() + WaitTimeSeconds
+
+        with self._lock:
+            self.receive_calls += 1
+            while True:
+                now = self.clock()
+                self._release_expired(now)
+                if self._available or now >= deadline:
+                    break
+                # Long polling: wake up on a send or when the next message turns visible
+                wait = deadline - now
+                if self._in_flight:
+                    wait = min(wait, min(v for _, v in self._in_flight.values()) - now)
+                self._lock.wait(max(wait, 0.001))
+
+            received = []
+            while self._available and len(received) < MaxNumberOfMessages:
+                message = self._available.popleft()
+                if self.max_receive_count and message["receive_count"] >= self.max_receive_count:
+                    self.dead_letters.append(message)
+                    continue
+                message["receive_count"] += 1
+                self._receipts += 1
+                handle = f"{message['messageId']}#{self._receipts}"
+                self._in_flight[handle] = (message, now + timeout)
+                entry = {
+                    "MessageId": message["messageId"],
+                    "ReceiptHandle": handle,
+                    "Body": message["body"],
+                    "Attributes": {
+                        "ApproximateReceiveCount": str(message["receive_count"]),
+                        "SentTimestamp": str(int(message["sent_at"] * 1000))
+                    }
+                }
+                # Like SQS, message attributes only come back when asked for
+                if MessageAttributeNames and message["attributes"]:
+                    entry["MessageAttributes"] = message["attributes"]
+                received.append(entry)
+        return {"Messages": received} if received else {}
+
+    def delete_message(self, QueueUrl, ReceiptHandle, **kwargs):
+        with self._lock:
+            self.delete_calls += 1
+            # A stale receipt handle (message already redelivered) is ignored, as in SQS
+            self._in_flight.pop(ReceiptHandle, None)
+        return {}
+
+    def delete_message_batch(self, QueueUrl, Entries, **kwargs):
+        if len(Entries) > 10:
+            raise ValueError("AWS.SimpleQueueService.TooManyEntriesInBatchRequest")
+        with self._lock:
+            self.delete_calls += 1
+            for entry in Entries:
+                self._in_flight.pop(entry["ReceiptHandle"], None)
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries], "Failed": []}
+
+    def change_message_visibility(self, QueueUrl, ReceiptHandle, VisibilityTimeout, **kwargs):
+        with self._lock:
+            entry = self._in_flight.get(ReceiptHandle)
+            if entry is None:
+                raise ValueError("InvalidParameterValue: Message does not exist or is not available for visibility timeout change")
+            self._in_flight[ReceiptHandle] = (entry[0], self.clock() + VisibilityTimeout)
+            self._lock.notify_all()
+        return {}
+
+    def change_message_visibility_batch(self, QueueUrl, Entries, **kwargs):
+        if len(Entries) > 10:
+            raise ValueError("AWS.SimpleQueueService.TooManyEntriesInBatchRequest")
+        successful, failed = [], []
+        for entry in Entries:
+            try:
+                self.change_message_visibility(QueueUrl, entry["ReceiptHandle"], entry["VisibilityTimeout"])
+                successful.append({"Id": entry["Id"]})
+            except ValueError as e:
+                failed.append({"Id": entry["Id"], "Code": "ReceiptHandleIsInvalid", "Message": str(e), "SenderFault": True})
+        return {"Successful": successful, "Failed": failed}
+
+    @property
+    def depth(self):
+        """Visible messages (ApproximateNumberOfMessages)."""
+        with self._lock:
+            return len(self._available)
+
+    @property
+    def in_flight(self):
+        """Received but not yet deleted (ApproximateNumberOfMessagesNotVisible)."""
+        with self._lock:
+            return len(self._in_flight)
+
+
+class LocalS3:
+    """S3 client stand-in: objects kept in memory per bucket, with request counters."""
+
+    def __init__(self):
+        # bucket -> key -> {"Body": bytes, "ContentType", "ContentEncoding", "Metadata"}
+        self.buckets = defaultdict(dict)
+        self.put_calls = 0
+        self.get_calls = 0
+        self.list_calls = 0
+        self.delete_calls = 0
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body, ContentType="binary/octet-stream", ContentEncoding=None,
+                   Metadata=None, **kwargs):
+        if hasattr(Body, "read"):
+            Body = Body.read()
+        if isinstance(Body, str):
+            Body = Body.encode("utf-8")
+        with self._lock:
+            self.put_calls += 1
+            self.buckets[Bucket][Key] = {
+                "Body": bytes(Body),
+                "ContentType": ContentType,
+                "ContentEncoding": ContentEncoding,
+                "Metadata": Metadata or {}
+            }
+        return {"ETag": f'"{hashlib.md5(Body).hexdigest()}"'}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        with self._lock:
+            self.get_calls += 1
+            obj = self.buckets[Bucket].get(Key)
+        if obj is None:
+            raise NoSuchKey(Key)
+        result = {"Body": io.BytesIO(obj["Body"]), "ContentLength": len(obj["Body"]),
+                  "ContentType": obj["ContentType"], "Metadata": obj["Metadata"]}
+        if obj["ContentEncoding"]:
+            result["ContentEncoding"] = obj["ContentEncoding"]
+        return result
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        with self._lock:
+            self.delete_calls += 1
+            self.buckets[Bucket].pop(Key, None)
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix="", MaxKeys=1000, ContinuationToken=None, **kwargs):
+        with self._lock:
+            self.list_calls += 1
+            keys = sorted(k for k in self.buckets[Bucket] if k.startswith(Prefix))
+            if ContinuationToken:
+                keys = [k for k in keys if k > ContinuationToken]
+            page = keys[:MaxKeys]
+            result = {
+                "Contents": [{"Key": k, "Size": len(self.buckets[Bucket][k]["Body"])} for k in page],
+                "KeyCount": len(page),
+                "IsTruncated": len(page) < len(keys)
+            }
+        if result["IsTruncated"]:
+            result["NextContinuationToken"] = page[-1]
+        return result
+
+    def bytes_stored(self, Bucket, Prefix=""):
+        with self._lock:
+            return sum(len(obj["Body"]) for key, obj in self.buckets[Bucket].items() if key.startswith(Prefix))
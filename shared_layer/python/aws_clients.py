@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+
+# -------------------------
+# Lazily built, shared boto3 clients
+# -------------------------
+# `import boto3` and building a client (loading the service model, resolving
+# the endpoint) cost a few hundred ms of every cold start, also for requests
+# that never call AWS (OPTIONS, validation errors, malformed records). Handlers
+# declare their clients at module level as before, but get placeholders that
+# build the real client on first use:
+#
+#   import aws_clients
+#
+#   sqs = aws_clients.lazy_client("sqs")
+#   table = aws_clients.lazy_table(ORDER_TABLE_NAME, endpoint_url=DYNAMODB_ENDPOINT_URL)
+#
+#   sqs.send_message(...)        # boto3 is imported and the client built here, once per container
+#
+# Built clients are kept in a registry keyed by service, endpoint and config,
+# so every module of a container shares one client (and its connection pool)
+# and warm invocations reuse it. All clients get the botocore Config below:
+# a larger keep-alive connection pool, TCP keepalive, short connect timeouts
+# and standard-mode retries.
+#
+# AWS_CLIENTS_EAGER=true builds every declared client at import instead, for
+# provisioned concurrency / SnapStart where init time is free.
+
+AWS_CLIENTS_EAGER = os.environ.get("AWS_CLIENTS_EAGER", "false").lower() == "true"
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", "32"))
+AWS_CONNECT_TIMEOUT = float(os.environ.get("AWS_CONNECT_TIMEOUT", "3"))
+# Long polls (SQS WaitTimeSeconds) need a longer read_timeout, pass it per client
+AWS_READ_TIMEOUT = float(os.environ.get("AWS_READ_TIMEOUT", "10"))
+AWS_MAX_ATTEMPTS = int(os.environ.get("AWS_MAX_ATTEMPTS", "3"))
+AWS_RETRY_MODE = os.environ.get("AWS_RETRY_MODE", "standard")
+
+_registry = {}
+_declared = []
+_lock = threading.RLock()
+# (kind, service, endpoint_url) -> ms spent building it
+build_ms = {}
+
+
+def _config(overrides):
+    from botocore.config import Config
+    settings = {
+        "max_pool_connections": AWS_MAX_POOL_CONNECTIONS,
+        "connect_timeout": AWS_CONNECT_TIMEOUT,
+        "read_timeout": AWS_READ_TIMEOUT,
+        "retries": {"max_attempts": AWS_MAX_ATTEMPTS, "mode": AWS_RETRY_MODE},
+        "tcp_keepalive": True
+    }
+    settings.update(overrides)
+    return Config(**settings)
+
+
+def _build(kind, service, endpoint_url, overrides):
+    key = (kind, service, endpoint_url, tuple(sorted((name, repr(value)) for name, value in overrides.items())))
+    built = _registry.get(key)
+    if built is not None:
+        return built
+    with _lock:
+        built = _registry.get(key)
+        if built is None:
+            start = time.perf_counter()
+            import boto3
+            factory = boto3.client if kind == "client" else boto3.resource
+            built = _registry[key] = factory(service, endpoint_url=endpoint_url, config=_config(overrides))
+            build_ms[key[:3]] = round((time.perf_counter() - start) * 1000, 3)
+    return built
+
+
+def client(service, endpoint_url=None, **config):
+    """The shared boto3 client for the service (built now if it does not exist yet)."""
+    return _build("client", service, endpoint_url, config)
+
+
+def resource(service, endpoint_url=None, **config):
+    """The shared boto3 resource for the service (built now if it does not exist yet)."""
+    return _build("resource", service, endpoint_url, config)
+
+
+class Lazy:
+    """Stands in for a boto3 client / resource object until its first attribute lookup."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._target = None
+        with _lock:
+            _declared.append(self)
+        if AWS_CLIENTS_EAGER:
+            self._resolve()
+
+    def _resolve(self):
+        if self._target is None:
+            self._target = self._factory()
+        return self._target
+
+    def __getattr__(self, name):
+        if name.startswith("__") or name in ("_factory", "_target"):
+            # copy / pickle probing, or lookups before __init__ ran
+            raise AttributeError(name)
+        return getattr(self._resolve(), name)
+
+
+class LazyTable(Lazy):
+    """DynamoDB Table placeholder; `name` is known without building anything."""
+
+    def __init__(self, name, endpoint_url=None, **config):
+        self.name = name
+        super().__init__(lambda: resource("dynamodb", endpoint_url, **config).Table(name))
+
+
+def lazy_client(service, endpoint_url=None, **config):
+    return Lazy(lambda: client(service, endpoint_url, **config))
+
+
+def lazy_table(name, endpoint_url=None, **config):
+    return LazyTable(name, endpoint_url, **config)
+
+
+def prewarm():
+    """Build every declared client now (e.g. from an init hook); returns how many were built."""
+    with _lock:
+        pending = [lazy for lazy in _declared if lazy._target is None]
+    for lazy in pending:
+        lazy._resolve()
+    return len(pending)
@@ -0,0 +1,169 @@
+import functools
+import json
+import os
+import random
+import threading
+import time
+from structured_log import get_logger
+
+# -------------------------
+# Batched EventBridge publishing
+# -------------------------
+# EventPublisher buffers events and sends them with as few PutEvents calls as
+# possible (at most 10 entries and 256 KB per call):
+#
+#   publisher = EventPublisher(aws_clients.lazy_client("events"), "ecommerce-bus-21-1-26", metrics=metrics)
+#
+#   @metrics.instrument
+#   @publisher.flush_on_exit
+#   def lambda_handler(event, context):
+#       publisher.put("com.mycompany.orders", "OrderCreated", detail)
+#
+# PutEvents is not all-or-nothing: FailedEntryCount > 0 means some entries
+# were rejected (throttling, internal errors) while the rest went out. Only
+# those entries are sent again, with jittered exponential backoff. Entries
+# still failing after EVENT_PUBLISH_MAX_RETRIES make flush_on_exit raise
+# PublishError, so the invocation fails and its trigger retries it. When the
+# handler itself raised, its exception is what propagates: the flush still
+# runs, and a failure there is only logged.
+
+EVENT_PUBLISH_MAX_RETRIES = int(os.environ.get("EVENT_PUBLISH_MAX_RETRIES", "3"))
+EVENT_PUBLISH_BASE_DELAY = float(os.environ.get("EVENT_PUBLISH_BASE_DELAY", "0.1"))
+
+MAX_ENTRIES_PER_CALL = 10
+MAX_BYTES_PER_CALL = 256 * 1024
+
+
+class PublishError(Exception):
+    def __init__(self, failed):
+        self.failed = failed
+        codes = sorted({f.get("ErrorCode", "Exception") for f in failed})
+        super().__init__(f"{len(failed)} event(s) not published: {', '.join(codes)}")
+
+
+def entry_size(entry):
+    """Size of a PutEvents entry as EventBridge counts it against the 256 KB limit."""
+    size = 14 if "Time" in entry else 0
+    for field in ("Source", "DetailType", "Detail"):
+        size += len(entry.get(field, "").encode("utf-8"))
+    size += sum(len(r.encode("utf-8")) for r in entry.get("Resources", []))
+    return size
+
+
+class EventPublisher:
+    def __init__(self, client, bus_name, max_retries=EVENT_PUBLISH_MAX_RETRIES,
+                 base_delay=EVENT_PUBLISH_BASE_DELAY, metrics=None, log=None):
+        self.client = client
+        self.bus_name = bus_name
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        # lambda_metrics.Metrics: flush time goes into the downstream phase
+        self.metrics = metrics
+        # Pass the Lambda's logger so flush failures carry its correlation_id
+        self.log = log or get_logger("event-publisher")
+        self._buffer = []
+        self._buffer_bytes = 0
+        # Entries that could not be published since the last flush()
+        self._failed = []
+        self._lock = threading.Lock()
+        self.put_events_calls = 0
+        self.published = 0
+        self.retried = 0
+
+    def put(self, source, detail_type, detail, **fields):
+        """Buffer one event; sends the buffer first when the event would not fit in the same call."""
+        entry = {
+            "Source": source,
+            "DetailType": detail_type,
+            "Detail": detail if isinstance(detail, str) else json.dumps(detail),
+            "EventBusName": self.bus_name
+        }
+        entry.update(fields)
+        size = entry_size(entry)
+        if size > MAX_BYTES_PER_CALL:
+            raise ValueError(f"Event of {size} bytes is over the {MAX_BYTES_PER_CALL} byte PutEvents limit")
+
+        with self._lock:
+            if self._buffer and self._buffer_bytes + size > MAX_BYTES_PER_CALL:
+                self._send_buffer()
+            self._buffer.append(entry)
+            self._buffer_bytes += size
+            if len(self._buffer) == MAX_ENTRIES_PER_CALL:
+                self._send_buffer()
+
+    def flush(self):
+        """Send everything buffered; returns (and forgets) the entries that could not be published."""
+        with self._lock:
+            if self._buffer:
+                self._send_buffer()
+            failed, self._failed = self._failed, []
+        return failed
+
+    def flush_on_exit(self, handler):
+        """Handler decorator: flush when the handler returns or raises.
+
+        PublishError is raised only after a successful handler; otherwise the
+        handler's own exception is re-raised.
+        """
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            try:
+                result = handler(event, context)
+            except BaseException:
+                try:
+                    failed = self.flush()
+                except Exception as e:
+                    self.log.exception("Flush after a failed handler raised", e)
+                else:
+                    if failed:
+                        self.log.error("Events not published after a failed handler", failed=len(failed),
+                                       error=str(PublishError(failed)))
+                raise
+            failed = self.flush()
+            if failed:
+                raise PublishError(failed)
+            return result
+        return wrapper
+
+    def _send_buffer(self):
+        entries, self._buffer, self._buffer_bytes = self._buffer, [], 0
+        start = time.perf_counter()
+        try:
+            failed = self._put_with_retries(entries)
+        finally:
+            if self.metrics is not None:
+                self.metrics.add("downstream_ms", (time.perf_counter() - start) * 1000)
+        self._failed.extend(failed)
+        if self.metrics is not None:
+            self.metrics.count("events_published", len(entries) - len(failed))
+            self.metrics.count("events_failed", len(failed))
+
+    def _put_with_retries(self, entries):
+        """PutEvents, then again for the failed entries only. Returns what never made it."""
+        pending = entries
+        errors = []
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.base_delay * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+                self.retried += len(pending)
+            self.put_events_calls += 1
+            if self.metrics is not None:
+                self.metrics.count("put_events_calls")
+            try:
+                resp = self.client.put_events(Entries=pending)
+            except Exception as e:
+                # Throttled / network error: the whole call is retried
+                errors = [dict(entry, ErrorCode=type(e).__name__, ErrorMessage=str(e)) for entry in pending]
+                continue
+            if not resp.get("FailedEntryCount"):
+                self.published += len(pending)
+                return []
+            # Results line up with the request entries; failed ones carry an ErrorCode
+            errors, retry = [], []
+            for entry, result in zip(pending, resp["Entries"]):
+                if "ErrorCode" in result:
+                    retry.append(entry)
+                    errors.append(dict(entry, ErrorCode=result["ErrorCode"], ErrorMessage=result.get("ErrorMessage")))
+            self.published += len(pending) - len(retry)
+            pending = retry
+        return errors
@@ -0,0 +1,129 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from structured_log import correlation_id_from
+
+# -------------------------
+# Per-invocation metrics in CloudWatch Embedded Metric Format (EMF)
+# -------------------------
+# metrics.instrument wraps a lambda_handler. Phase timings and counts of one
+# invocation are added up in memory and written as a single EMF log line when
+# the handler returns, which CloudWatch turns into metrics (no PutMetricData
+# calls, no extra line per metric):
+#
+#   metrics = Metrics("ingest")
+#
+#   @metrics.instrument
+#   def lambda_handler(event, context):
+#       with metrics.phase("parse"):
+#           body = json.loads(event["body"])
+#       metrics.count("orders_enqueued")
+#
+# Every record has duration_ms, invocations, errors (exception raised or a
+# 5xx statusCode) and cold_start (1 on the first invocation of an execution
+# environment). A phase timed several times in one invocation (per record,
+# per retry) is summed; phase() may be used from worker threads. Like the
+# Lambda runtime, it assumes one invocation at a time per process.
+#
+# Functions in metrics.listeners get (service, {name: value}) after every
+# invocation, even with METRICS_ENABLED=false; a long-running host uses this
+# to feed other backends (order-queue-17-1-26/metrics_exporter.py).
+
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "AWSSeries")
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+
+
+class Metrics:
+    def __init__(self, service, namespace=METRICS_NAMESPACE, enabled=METRICS_ENABLED):
+        self.service = service
+        self.namespace = namespace
+        self.enabled = enabled
+        self.cold_start = True
+        # name -> [value, unit]
+        self._values = {}
+        self._properties = {}
+        self._lock = threading.Lock()
+        self.listeners = []
+        self.emitted = 0
+
+    def add(self, name, value, unit="Milliseconds"):
+        with self._lock:
+            entry = self._values.get(name)
+            if entry is None:
+                self._values[name] = [value, unit]
+            else:
+                entry[0] += value
+
+    def count(self, name, value=1):
+        self.add(name, value, "Count")
+
+    def set_property(self, name, value):
+        """Extra field on the record (searchable in Logs Insights, not a metric)."""
+        self._properties[name] = value
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(f"{name}_ms", (time.perf_counter() - start) * 1000)
+
+    def instrument(self, handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            with self._lock:
+                self._values = {}
+                self._properties = {}
+            cold_start, self.cold_start = self.cold_start, False
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = handler(event, context)
+                status = result.get("statusCode") if isinstance(result, dict) else None
+                failed = isinstance(status, int) and status >= 500
+                return result
+            finally:
+                self.add("duration_ms", (time.perf_counter() - start) * 1000)
+                self.count("invocations")
+                self.count("errors", int(failed))
+                self.count("cold_start", int(cold_start))
+                self.set_property("correlation_id", correlation_id_from(event, context))
+                self.flush()
+        return wrapper
+
+    def record(self):
+        """The EMF document for the current invocation."""
+        with self._lock:
+            values = dict(self._values)
+        document = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": self.namespace,
+                    "Dimensions": [["Service"]],
+                    "Metrics": [{"Name": name, "Unit": unit} for name, (_, unit) in values.items()]
+                }]
+            },
+            "Service": self.service
+        }
+        document.update(self._properties)
+        for name, (value, unit) in values.items():
+            document[name] = round(value, 3) if unit == "Milliseconds" else value
+        return document
+
+    def flush(self):
+        if self.listeners:
+            with self._lock:
+                values = {name: value for name, (value, _) in self._values.items()}
+            for listener in self.listeners:
+                listener(self.service, values)
+        if not self.enabled:
+            return
+        # One write per record, like structured_log
+        print(json.dumps(self.record(), default=str, separators=(",", ":")) + "\n", end="")
+        self.emitted += 1
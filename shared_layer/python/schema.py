@@ -0,0 +1,222 @@
+import re
+from decimal import Decimal
+
+# -------------------------
+# Payload schemas shared by the Lambdas
+# -------------------------
+# Schemas are declared once below and compiled into plain Python validator
+# functions when this module is imported (generated source + exec, so a
+# check costs a few type() comparisons). Validators return a list with every
+# error they find; an empty list means the payload is valid.
+#
+# Each validator first runs a generated pass/fail check that stops at the
+# first problem and builds no messages; only payloads that fail it go through
+# the slower pass that collects every error with its path.
+#
+# Field spec keys:
+#   type       "string" | "integer" | "number" | "boolean" | "array" | "object"
+#              or a tuple of those
+#   required   field must be present (ignored by partial validators)
+#   minimum    lowest allowed value for integer / number
+#   min_items  shortest allowed array
+#   items      spec of the array elements
+#   properties field specs of a nested object
+
+_TYPES = {
+    # Exact type checks: JSON never produces subclasses, and this keeps
+    # True/False from passing as numbers
+    "string": "type({v}) is str",
+    "integer": "type({v}) is int",
+    "number": "type({v}) in _NUMBER_TYPES",
+    "boolean": "type({v}) is bool",
+    "array": "type({v}) is list",
+    "object": "type({v}) is dict",
+}
+
+_FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_:\-]*$")
+
+
+class _Emitter:
+    def __init__(self):
+        self.lines = []
+        self.depth = 0
+
+    def line(self, indent, text):
+        self.lines.append("    " * indent + text)
+
+    def var(self):
+        self.depth += 1
+        return f"v{self.depth}", f"i{self.depth}"
+
+
+def _type_check(spec_type, var):
+    types = spec_type if isinstance(spec_type, tuple) else (spec_type,)
+    check = " or ".join(_TYPES[t].format(v=var) for t in types)
+    expected = " or ".join(types)
+    return check, expected
+
+
+def _append(message):
+    """append() of an error message; an f-string only when the path holds an {index}."""
+    prefix = "f" if "{" in message else ""
+    return f'append({prefix}"{message}")'
+
+
+def _emit_field(em, indent, var, path, spec):
+    """Emit the checks for one value already bound to `var`."""
+    if "type" in spec:
+        check, expected = _type_check(spec["type"], var)
+        em.line(indent, f"if not {check}:" if " or " not in check else f"if not ({check}):")
+        em.line(indent + 1, _append(f"Invalid type for '{path}', expected {expected}"))
+        # Value checks only run once the type is right
+        em.line(indent, "else:")
+        else_at = len(em.lines)
+        _emit_value_checks(em, indent + 1, var, path, spec)
+        if len(em.lines) == else_at:
+            em.lines.pop()
+    else:
+        _emit_value_checks(em, indent, var, path, spec)
+
+
+def _emit_value_checks(em, indent, var, path, spec):
+
+    if "minimum" in spec:
+        em.line(indent, f"if {var} < {spec['minimum']!r}:")
+        em.line(indent + 1, _append(f"'{path}' must be at least {spec['minimum']}"))
+
+    if "min_items" in spec:
+        em.line(indent, f"if len({var}) < {spec['min_items']!r}:")
+        message = "cannot be empty" if spec["min_items"] == 1 else f"must have at least {spec['min_items']} items"
+        em.line(indent + 1, _append(f"'{path}' array {message}"))
+
+    if "items" in spec:
+        item_var, index_var = em.var()
+        em.line(indent, f"for {index_var}, {item_var} in enumerate({var}):")
+        _emit_field(em, indent + 1, item_var, f"{path}[{{{index_var}}}]", spec["items"])
+
+    if "properties" in spec:
+        _emit_properties(em, indent, var, path + ".", spec["properties"], partial=False)
+
+
+def _emit_properties(em, indent, obj_var, prefix, properties, partial):
+    for name, spec in properties.items():
+        if not _FIELD_NAME.match(name):
+            raise ValueError(f"Unsupported field name {name!r}")
+        path = f"{prefix}{name}"
+        value_var, _ = em.var()
+        # One dict lookup per field
+        em.line(indent, f"{value_var} = {obj_var}.get({name!r}, _MISSING)")
+        em.line(indent, f"if {value_var} is not _MISSING:")
+        _emit_field(em, indent + 1, value_var, path, spec)
+        if spec.get("required") and not partial:
+            em.line(indent, "else:")
+            em.line(indent + 1, _append(f"Missing '{path}'"))
+
+
+def _emit_quick_field(em, indent, var, spec):
+    """Emit `return False` checks for one value bound to `var` (no messages)."""
+    if "type" in spec:
+        check, _ = _type_check(spec["type"], var)
+        em.line(indent, f"if {check.replace(' is ', ' is not ').replace(' in ', ' not in ')}:" if " or " not in check
+                else f"if not ({check}):")
+        em.line(indent + 1, "return False")
+    if "minimum" in spec:
+        em.line(indent, f"if {var} < {spec['minimum']!r}:")
+        em.line(indent + 1, "return False")
+    if "min_items" in spec:
+        em.line(indent, f"if len({var}) < {spec['min_items']!r}:")
+        em.line(indent + 1, "return False")
+    if "items" in spec:
+        item_var, _ = em.var()
+        em.line(indent, f"for {item_var} in {var}:")
+        _emit_quick_field(em, indent + 1, item_var, spec["items"])
+    if "properties" in spec:
+        _emit_quick_properties(em, indent, var, spec["properties"], partial=False)
+
+
+def _emit_quick_properties(em, indent, obj_var, properties, partial):
+    for name, spec in properties.items():
+        value_var, _ = em.var()
+        if spec.get("required") and not partial:
+            if "type" in spec:
+                # A missing field comes back as None, which fails any type check
+                em.line(indent, f"{value_var} = {obj_var}.get({name!r})")
+            else:
+                em.line(indent, f"{value_var} = {obj_var}.get({name!r}, _MISSING)")
+                em.line(indent, f"if {value_var} is _MISSING:")
+                em.line(indent + 1, "return False")
+            _emit_quick_field(em, indent, value_var, spec)
+        else:
+            em.line(indent, f"{value_var} = {obj_var}.get({name!r}, _MISSING)")
+            em.line(indent, f"if {value_var} is not _MISSING:")
+            before = len(em.lines)
+            _emit_quick_field(em, indent + 1, value_var, spec)
+            if len(em.lines) == before:
+                em.line(indent + 1, "pass")
+
+
+def compile_validator(name, properties, partial=False, label="Payload"):
+    """Compile an object schema into `validator(data) -> [errors]`."""
+    em = _Emitter()
+    # Names the generated code uses bound as defaults: fast local lookups
+    em.line(0, f"def _is_valid_{name}(data, type=type, len=len, _MISSING=_MISSING, _NUMBER_TYPES=_NUMBER_TYPES):")
+    em.line(1, "if type(data) is not dict:")
+    em.line(2, "return False")
+    _emit_quick_properties(em, 1, "data", properties, partial)
+    em.line(1, "return True")
+    em.line(0, "")
+
+    em.line(0, f"def {name}(data):")
+    em.line(1, f"if _is_valid_{name}(data):")
+    em.line(2, "return []")
+    em.line(1, "if type(data) is not dict:")
+    em.line(2, f"return [{label + ' must be an object'!r}]")
+    em.line(1, "errors = []")
+    em.line(1, "append = errors.append")
+    _emit_properties(em, 1, "data", "", properties, partial)
+    em.line(1, "return errors")
+
+    source = "\n".join(em.lines)
+    # Builtins bound as globals of the generated code skip the builtins lookup
+    namespace = {
+        "_NUMBER_TYPES": (int, float, Decimal),
+        "_MISSING": object(),
+        "type": type, "len": len, "enumerate": enumerate,
+        "str": str, "int": int, "bool": bool, "list": list, "dict": dict,
+    }
+    exec(compile(source, f"<schema {name}>", "exec"), namespace)
+    validator = namespace[name]
+    validator.source = source
+    return validator
+
+
+# ---------------- Schemas ----------------
+
+PRODUCT_FIELDS = {
+    "product_id": {"type": "string", "required": True},
+    "name": {"type": "string", "required": True},
+    "price": {"type": "number", "required": True},
+    "currency": {"type": "string", "required": True},
+    "in_stock": {"type": ("boolean", "integer"), "required": True},
+}
+
+ORDER_FIELDS = {
+    "email": {"type": "string", "required": True},
+    "items": {
+        "type": "array",
+        "required": True,
+        "min_items": 1,
+        "items": {
+            "type": "object",
+            "properties": {
+                "sku": {"type": "string", "required": True},
+                "qty": {"type": "integer", "required": True, "minimum": 1},
+            },
+        },
+    },
+}
+
+# Full product (POST), partial product (PUT) and incoming order (ingest)
+validate_product = compile_validator("validate_product", PRODUCT_FIELDS, label="Product")
+validate_product_update = compile_validator("validate_product_update", PRODUCT_FIELDS, partial=True, label="Product")
+validate_order = compile_validator("validate_order", ORDER_FIELDS, label="Order")
@@ -0,0 +1,131 @@
+import json
+import os
+import random
+import time
+
+# -------------------------
+# Structured logging shared by the Lambdas
+# -------------------------
+# One JSON object per line (CloudWatch Logs Insights can query every field).
+# Records below LOG_LEVEL return before anything is built, and fields are
+# only serialized when a record is actually written, so a disabled
+# log.debug("Parsed body", body=body) costs one comparison. A field value
+# may also be a zero-argument callable, called only when the record is written.
+#
+# Sampling is per level and decided once per invocation, so a sampled
+# request keeps all of its records of that level:
+#   LOG_SAMPLE_RATES="DEBUG=0.01,INFO=0.5"   (levels not listed: 1.0)
+#
+# Every record carries the invocation's correlation_id: the caller's
+# X-Correlation-Id header, else the EventBridge event's
+# detail.metadata.correlationId, else the API Gateway request ID, else the
+# Lambda request ID.
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+LEVEL_NAMES = {number: name for name, number in LEVELS.items()}
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATES = os.environ.get("LOG_SAMPLE_RATES", "")
+
+CORRELATION_HEADER = "x-correlation-id"
+
+
+def parse_level(name):
+    name = name.upper()
+    return LEVELS["WARNING"] if name == "WARN" else LEVELS[name]
+
+
+def parse_sample_rates(text):
+    rates = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        name, _, rate = part.partition("=")
+        rates[parse_level(name)] = float(rate)
+    return rates
+
+
+def correlation_id_from(event, context=None):
+    """Correlation ID for an invocation (see the module comment for the order)."""
+    if isinstance(event, dict):
+        for name, value in (event.get("headers") or {}).items():
+            if name.lower() == CORRELATION_HEADER and value:
+                return value
+        detail = event.get("detail")
+        if isinstance(detail, dict) and (detail.get("metadata") or {}).get("correlationId"):
+            return detail["metadata"]["correlationId"]
+        request_id = (event.get("requestContext") or {}).get("requestId")
+        if request_id:
+            return request_id
+    return getattr(context, "aws_request_id", None)
+
+
+def _default(value):
+    # Decimal (DynamoDB), sets, exceptions, ...
+    return str(value)
+
+
+class Logger:
+    def __init__(self, service, level=LOG_LEVEL, sample_rates=LOG_SAMPLE_RATES):
+        self.service = service
+        self.level = parse_level(level)
+        self.sample_rates = parse_sample_rates(sample_rates) if isinstance(sample_rates, str) else dict(sample_rates)
+        self.context = {}
+        self._draw = 0.0
+        self.written = 0
+
+    def start_invocation(self, event=None, context=None, **fields):
+        """Reset the per-invocation fields and sampling draw; returns the correlation ID."""
+        correlation_id = correlation_id_from(event, context) or f"local-{time.time_ns()}"
+        self.context = {"correlation_id": correlation_id}
+        request_id = getattr(context, "aws_request_id", None)
+        if request_id:
+            self.context["request_id"] = request_id
+        self.context.update(fields)
+        self._draw = random.random()
+        return correlation_id
+
+    def bind(self, **fields):
+        self.context.update(fields)
+
+    @property
+    def correlation_id(self):
+        return self.context.get("correlation_id")
+
+    def enabled(self, level):
+        """Would a record at this level be written? Use it to skip building expensive fields."""
+        level = LEVELS[level] if isinstance(level, str) else level
+        return level >= self.level and self._draw < self.sample_rates.get(level, 1.0)
+
+    def log(self, level, msg, fields):
+        if level < self.level or self._draw >= self.sample_rates.get(level, 1.0):
+            return
+        record = {
+            "ts": round(time.time(), 3),
+            "level": LEVEL_NAMES[level],
+            "service": self.service,
+            "msg": msg
+        }
+        record.update(self.context)
+        for name, value in fields.items():
+            record[name] = value() if callable(value) else value
+        # A single write per record keeps lines whole when threads log together
+        print(json.dumps(record, default=_default, separators=(",", ":")) + "\n", end="")
+        self.written += 1
+
+    def debug(self, msg, **fields):
+        self.log(10, msg, fields)
+
+    def info(self, msg, **fields):
+        self.log(20, msg, fields)
+
+    def warning(self, msg, **fields):
+        self.log(30, msg, fields)
+
+    def error(self, msg, **fields):
+        self.log(40, msg, fields)
+
+    def exception(self, msg, error, **fields):
+        self.log(40, msg, dict(fields, error=str(error), error_type=type(error).__name__))
+
+
+def get_logger(service):
+    return Logger(service)